@@ -0,0 +1,84 @@
+# benchmarks/bench_fdc_index.py
+#
+# Lookup latency of the offline FDC index on a synthetic export the size of
+# SR Legacy + Foundation + FNDDS (about 15k foods, 150 nutrients).
+# Usage: python benchmarks/bench_fdc_index.py --foods 15000
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.fdc_index import LocalFDCIndex, build_fdc_index
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+WORDS = ("chicken beef pork salmon tuna rice brown white oats bread wheat milk yogurt greek cheese egg "
+         "broccoli spinach carrot potato sweet apple banana berries almond peanut butter bean lentil "
+         "raw cooked roasted grilled boiled baked fried dry canned frozen plain nonfat lowfat whole "
+         "breast thigh fillet skinless boneless salted unsalted fortified enriched").split()
+
+def write_synthetic_export(path, n_foods, n_nutrients, seed=0):
+    rng = random.Random(seed)
+    data_types = ["SR Legacy", "Foundation", "Survey (FNDDS)"]
+    foods = []
+    for i in range(n_foods):
+        foods.append({
+            'fdcId': 100000 + i,
+            'dataType': rng.choice(data_types),
+            'description': ", ".join(rng.sample(WORDS, rng.randint(2, 8))).capitalize(),
+            'foodNutrients': [
+                {'nutrient': {'id': 1000 + n, 'name': f"Nutrient {n}", 'unitName': 'g'}, 'amount': rng.random() * 50}
+                for n in rng.sample(range(n_nutrients), rng.randint(10, n_nutrients))
+            ]
+        })
+    with open(path, 'w') as f:
+        json.dump(foods, f)
+
+def per_call_us(fn, args):
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6, sorted(samples)[int(len(samples) * 0.99) - 1] * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline FDC index lookups")
+    parser.add_argument("--foods", type=int, default=15_000)
+    parser.add_argument("--nutrients", type=int, default=150)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        export_path = os.path.join(tmp_dir, "export.json")
+        write_synthetic_export(export_path, args.foods, args.nutrients)
+
+        start = time.perf_counter()
+        build_fdc_index([export_path], os.path.join(tmp_dir, "index"))
+        print(f"Built index for {args.foods:,} foods in {time.perf_counter() - start:.1f}s")
+
+        index = LocalFDCIndex(os.path.join(tmp_dir, "index"))
+        client = USDAApiClient(cache=MemoryCache(), local_index=index)
+        queries = [" ".join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(args.queries)]
+        ids = [100000 + rng.randrange(args.foods) for _ in range(args.queries)]
+
+        print(f"{'operation':<22} {'p50 (us)':>9} {'p99 (us)':>9}")
+        for label, fn, fn_args in [
+            ("search_food", client.search_food, queries),
+            ("get_food_details", client.get_food_details, ids),
+            ("get_nutrition_info", client.get_nutrition_info, queries),
+        ]:
+            p50, p99 = per_call_us(fn, fn_args)
+            print(f"{label:<22} {p50:>9.0f} {p99:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_generation_engine.py
+#
+# Wall-clock benchmark for GenerationEngine: one worker (the old serial
+# scripts) vs a thread pool, against a fake chat client that sleeps like a
+# chat completion. No API key or network needed.
+# Usage: python benchmarks/bench_generation_engine.py --users 200 --latency 0.5 --workers 32
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import GenerationEngine, load_generation_users
+
+MEAL_PLAN = "\n\n".join(
+    f"{meal_type}:\nMeal Name: Oats {meal_type}\nIngredients: oats, milk\n"
+    f"Macros: 400 kcal, 30g protein, 45g carbs, 12g fats\nShort Rationale: balanced"
+    for meal_type in ["Breakfast", "Morning Snack", "Lunch", "Evening Snack", "Dinner"]
+)
+
+class SleepingChatClient:
+    def __init__(self, latency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        time.sleep(self.latency)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=MEAL_PLAN))])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent meal plan generation")
+    parser.add_argument("--mode", default="guided")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per chat completion")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--serial-users", type=int, default=10, help="Users timed with one worker (extrapolated)")
+    args = parser.parse_args()
+
+    users = load_generation_users(user_ids=None).head(args.users)
+    client = SleepingChatClient(args.latency)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "out.csv")
+
+        start = time.perf_counter()
+        GenerationEngine(args.mode, client=client, workers=1).run(users.head(args.serial_users), output)
+        serial_time = (time.perf_counter() - start) * len(users) / args.serial_users
+
+        start = time.perf_counter()
+        summary = GenerationEngine(args.mode, client=client, workers=args.workers).run(users, output)
+        pooled_time = time.perf_counter() - start
+
+    print(f"{len(users)} users, {args.latency}s per call, mode={args.mode}: {summary}")
+    print(f"1 worker:    {serial_time:>7.2f}s (extrapolated from {args.serial_users} users)")
+    print(f"{args.workers} workers: {pooled_time:>7.2f}s  ({serial_time / pooled_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# benchmarks/bench_list_parser.py
+#
+# Micro-benchmark: parse_list_literal vs the ast.literal_eval path it replaces,
+# over the health_conditions / goal values found in the data files.
+# Usage: python benchmarks/bench_list_parser.py --repeat 20
+
+import os
+import sys
+import timeit
+import argparse
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.parsers import legacy_parse_list_field, parse_list_literal
+
+def load_samples():
+    prefs_df = pd.read_csv("data/user_preferences.csv")
+    targets_df = pd.read_csv("data/user_nutrition_targets.csv")
+    return {
+        "bare (user_preferences.csv)": list(prefs_df["health_conditions"]) + list(prefs_df["goal_type"]),
+        "list (user_nutrition_targets.csv)": list(targets_df["health_conditions"]) + list(targets_df["goals"]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark list-literal parsing")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'values':<36} {'count':>7} {'literal_eval (us)':>18} {'fast (us)':>10} {'speedup':>8}")
+    for label, values in load_samples().items():
+        assert [parse_list_literal(v) for v in values] == [legacy_parse_list_field(v) for v in values]
+
+        legacy = min(timeit.repeat(lambda: [legacy_parse_list_field(v) for v in values], number=1, repeat=args.repeat))
+        fast = min(timeit.repeat(lambda: [parse_list_literal(v) for v in values], number=1, repeat=args.repeat))
+        per_legacy = legacy / len(values) * 1e6
+        per_fast = fast / len(values) * 1e6
+        print(f"{label:<36} {len(values):>7} {per_legacy:>18.2f} {per_fast:>10.3f} {legacy / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_meal_parsing.py
+#
+# Micro-benchmark: parsing a five-meal plan from free text (GuardrailsManager,
+# one pass per blank-line block) vs from a structured JSON reply (one pydantic
+# validation per reply).
+# Usage: python benchmarks/bench_meal_parsing.py --replies 1000 --repeat 5
+
+import os
+import sys
+import json
+import timeit
+import argparse
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.guardrails_manager import GuardrailsManager
+
+TEXT_TYPES = ["Breakfast", "Morning Snack", "Lunch", "Evening Snack", "Dinner"]
+JSON_TYPES = ["breakfast", "morning_snack", "lunch", "evening_snack", "dinner"]
+
+def text_reply(i):
+    return "\n\n".join(
+        f"{meal_type}:\nMeal Name: Plan {i} {meal_type}\nIngredients: 60 g oats, 200 ml milk, 1 banana\n"
+        f"Macros: {400 + i % 50} kcal, 30g protein, 45g carbs, 12g fats\nShort Rationale: Balanced start for user {i}"
+        for meal_type in TEXT_TYPES
+    )
+
+def json_reply(i):
+    return json.dumps({"meals": [{
+        "meal_type": meal_type,
+        "meal_name": f"Plan {i} {meal_type}",
+        "ingredients": ["60 g oats", "200 ml milk", "1 banana"],
+        "macros": {"calories": 400 + i % 50, "protein_g": 30, "carbs_g": 45, "fats_g": 12},
+        "rationale": f"Balanced start for user {i}",
+    } for meal_type in JSON_TYPES]})
+
+def parse_text(guardrails, reply):
+    return [meal for meal in map(guardrails.sanitize_and_validate_output, reply.split('\n\n')) if meal]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark free-text vs structured meal plan parsing")
+    parser.add_argument("--replies", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    guardrails = GuardrailsManager()
+    texts = [text_reply(i) for i in range(args.replies)]
+    jsons = [json_reply(i) for i in range(args.replies)]
+    assert all(len(parse_text(guardrails, reply)) == 5 for reply in texts)
+    assert all(len(guardrails.sanitize_and_validate_structured_output(reply)) == 5 for reply in jsons)
+
+    text_time = min(timeit.repeat(lambda: [parse_text(guardrails, reply) for reply in texts],
+                                  number=1, repeat=args.repeat))
+    json_time = min(timeit.repeat(lambda: [guardrails.sanitize_and_validate_structured_output(reply) for reply in jsons],
+                                  number=1, repeat=args.repeat))
+    print(f"{'parser':<12} {'per reply (us)':>15}")
+    print(f"{'free text':<12} {text_time / args.replies * 1e6:>15.1f}")
+    print(f"{'json':<12} {json_time / args.replies * 1e6:>15.1f}")
+    print(f"speedup: {text_time / json_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
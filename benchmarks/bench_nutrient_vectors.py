@@ -0,0 +1,66 @@
+# benchmarks/bench_nutrient_vectors.py
+#
+# Aggregating per-meal and per-day nutrient totals: extract_nutrients dicts
+# summed in Python vs dense nutrient vectors summed as matrices.
+# Usage: python benchmarks/bench_nutrient_vectors.py --meals 20000
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.nutrient_vectors import NUTRIENT_NAMES, food_matrix, scale_vectors, sum_by_group
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+FIXTURE_JSON = os.path.join("data", "test data", "fdc_sample", "fdc_sample_foods.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark meal/day nutrient aggregation")
+    parser.add_argument("--meals", type=int, default=20_000)
+    parser.add_argument("--ingredients", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(FIXTURE_JSON) as f:
+        foods = [food for group in json.load(f).values() for food in group]
+    rng = np.random.default_rng(0)
+    n_rows = args.meals * args.ingredients
+    food_idx = rng.integers(0, len(foods), n_rows)
+    grams = rng.uniform(20, 250, n_rows)
+    meal_ids = np.repeat(np.arange(args.meals), args.ingredients)
+    day_ids = meal_ids // 4
+    client = USDAApiClient(cache=MemoryCache())
+
+    start = time.perf_counter()
+    meal_totals = {}
+    for food_i, portion, meal in zip(food_idx.tolist(), grams.tolist(), meal_ids.tolist()):
+        totals = meal_totals.setdefault(meal, {})
+        for name, data in client.extract_nutrients(foods[food_i]).items():
+            totals[name] = totals.get(name, 0.0) + data['value'] * portion / 100
+    day_totals = {}
+    for meal, totals in meal_totals.items():
+        day = day_totals.setdefault(meal // 4, {})
+        for name, value in totals.items():
+            day[name] = day.get(name, 0.0) + value
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = food_matrix(foods)
+    portions = scale_vectors(matrix[food_idx], grams)
+    _, meal_vectors = sum_by_group(portions, meal_ids)
+    days, day_vectors = sum_by_group(meal_vectors, np.arange(args.meals) // 4)
+    vector_time = time.perf_counter() - start
+
+    protein = NUTRIENT_NAMES.index('Protein')
+    assert np.isclose(day_vectors[0, protein], day_totals[0]['Protein'], rtol=1e-4)
+    print(f"{args.meals:,} meals x {args.ingredients} ingredients, {len(days):,} days")
+    print(f"dicts:   {dict_time:>7.3f}s")
+    print(f"vectors: {vector_time:>7.3f}s  ({dict_time / vector_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
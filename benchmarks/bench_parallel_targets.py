@@ -0,0 +1,73 @@
+# benchmarks/bench_parallel_targets.py
+#
+# Scaling benchmark for nutrition target generation on a process pool.
+# Usage: python benchmarks/bench_parallel_targets.py --users 5000000 --max-workers 8
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic_users import write_synthetic_population
+from services.nutrition_calculation.calculations import load_merged_inputs
+from services.nutrition_calculation.parallel import (
+    compute_nutrition_targets_parallel,
+    generate_nutrition_targets_parallel,
+    default_workers,
+)
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel nutrition target generation")
+    parser.add_argument("--users", type=int, default=5_000_000)
+    parser.add_argument("--max-workers", type=int, default=default_workers())
+    parser.add_argument("--chunksize", type=int, default=250_000)
+    parser.add_argument("--engine", choices=["batch", "rows"], default="batch")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        users_path, preferences_path = write_synthetic_population(tmp_dir, args.users)
+        print(f"Generated {args.users:,} synthetic users in {time.perf_counter() - start:.1f}s")
+
+        merged_df = load_merged_inputs(users_path, preferences_path)
+        output_path = os.path.join(tmp_dir, "targets.csv")
+
+        print(f"{'workers':>8} {'compute (s)':>12} {'speedup':>8} {'end-to-end (s)':>15} {'speedup':>8}")
+        base_compute = base_total = None
+        reference = None
+        for workers in worker_counts(args.max_workers):
+            start = time.perf_counter()
+            targets = compute_nutrition_targets_parallel(merged_df, workers=workers, engine=args.engine)
+            compute_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            generate_nutrition_targets_parallel(users_path, preferences_path, output_path,
+                                                workers=workers, chunksize=args.chunksize)
+            total_time = time.perf_counter() - start
+
+            # Results must not depend on the worker count
+            if reference is None:
+                reference = targets
+            else:
+                pd.testing.assert_frame_equal(targets, reference)
+
+            base_compute = base_compute or compute_time
+            base_total = base_total or total_time
+            print(f"{workers:>8} {compute_time:>12.2f} {base_compute / compute_time:>7.2f}x "
+                  f"{total_time:>15.2f} {base_total / total_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_usda_async.py
+#
+# Wall-clock benchmark: serial USDAApiClient.get_nutrition_info vs
+# AsyncUSDAApiClient.get_nutrition_info_many over the meal names in
+# llm_test_data/usda_comparison_results.csv, against the local FDC stub with
+# simulated server latency.
+# Usage: python benchmarks/bench_usda_async.py --latency 0.15 --concurrency 8
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fdc_stub_server import start_stub_server
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_async import AsyncUSDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk USDA nutrition lookups")
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated seconds per upstream request")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=100, help="Number of distinct meal names to look up")
+    args = parser.parse_args()
+
+    names = list(dict.fromkeys(pd.read_csv("llm_test_data/usda_comparison_results.csv")["meal_name"]))[:args.limit]
+    server, base_url = start_stub_server(latency=args.latency)
+
+    client = USDAApiClient(cache=MemoryCache(), base_url=base_url)
+    start = time.perf_counter()
+    serial = {name: client.get_nutrition_info(name) for name in names}
+    serial_time = time.perf_counter() - start
+    client.close()
+
+    async def run():
+        async with AsyncUSDAApiClient(cache=MemoryCache(), base_url=base_url,
+                                      concurrency=args.concurrency, rate_per_second=None) as async_client:
+            return await async_client.get_nutrition_info_many(names)
+    start = time.perf_counter()
+    concurrent = asyncio.run(run())
+    async_time = time.perf_counter() - start
+
+    assert concurrent == serial
+    print(f"{len(names)} foods, {args.latency * 1000:.0f}ms per request")
+    print(f"serial:                {serial_time:>7.2f}s")
+    print(f"async (concurrency {args.concurrency}): {async_time:>7.2f}s  ({serial_time / async_time:.1f}x)")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
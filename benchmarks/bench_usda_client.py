@@ -0,0 +1,59 @@
+# benchmarks/bench_usda_client.py
+#
+# Latency benchmark: one new connection per request (bare requests.get, the old
+# client behavior) vs the USDA client's pooled keep-alive session.
+# Runs against the local FDC stub, so no API key or network is needed.
+# Usage: python benchmarks/bench_usda_client.py --requests 500
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import requests
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fdc_stub_server import start_stub_server
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+def time_calls(fetch, fdc_ids):
+    latencies = []
+    for fdc_id in fdc_ids:
+        start = time.perf_counter()
+        fetch(fdc_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1e3
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1e3
+    print(f"{label:<28} {p50:>9.2f} {p95:>9.2f} {len(latencies) / sum(latencies):>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark USDA client connection reuse")
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server()
+    fdc_ids = [str(100000 + i) for i in range(args.requests)]
+
+    def bare_get(fdc_id):
+        response = requests.get(f"{base_url}/food/{fdc_id}", params={'api_key': 'DEMO_KEY'})
+        return response.json()
+
+    # A fresh cache per run so every call reaches the server
+    client = USDAApiClient(cache=MemoryCache(), base_url=base_url)
+
+    print(f"{'client':<28} {'p50 (ms)':>9} {'p95 (ms)':>9} {'req/s':>10}")
+    report("requests.get (no pooling)", time_calls(bare_get, fdc_ids))
+    report("USDAApiClient (session)", time_calls(client.get_food_details, fdc_ids))
+
+    client.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
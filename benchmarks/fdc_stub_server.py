@@ -0,0 +1,86 @@
+# benchmarks/fdc_stub_server.py
+#
+# Local stand-in for the FoodData Central API, for benchmarking the USDA client
+# without network access or an API key. Serves /fdc/v1/foods/search,
+# /fdc/v1/food/{fdcId} and /fdc/v1/foods with keep-alive connections.
+# Usage: python benchmarks/fdc_stub_server.py --port 8765
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+def fake_food(fdc_id, description=None):
+    """Food details in the shape of the FDC /food/{fdcId} response."""
+    fdc_id = int(fdc_id)
+    return {
+        'fdcId': fdc_id,
+        'description': description or f"Food {fdc_id}",
+        'dataType': 'SR Legacy',
+        'foodNutrients': [
+            {'nutrient': {'id': 1008, 'name': 'Energy', 'unitName': 'kcal'}, 'amount': float(fdc_id % 500)},
+            {'nutrient': {'id': 1003, 'name': 'Protein', 'unitName': 'g'}, 'amount': (fdc_id % 37) / 1.5},
+            {'nutrient': {'id': 1004, 'name': 'Total lipid (fat)', 'unitName': 'g'}, 'amount': (fdc_id % 23) / 2.0},
+            {'nutrient': {'id': 1005, 'name': 'Carbohydrate, by difference', 'unitName': 'g'}, 'amount': (fdc_id % 61) / 1.2},
+        ]
+    }
+
+def fake_fdc_id(query):
+    return 100000 + sum(ord(c) for c in query.lower()) * 7 % 900000
+
+class FDCStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, keep-alive
+    # connections stall on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/fdc/v1/foods/search":
+            query = params.get('query', [''])[0]
+            self._send_json({'foods': [{'fdcId': fake_fdc_id(query), 'description': query}]})
+        elif url.path.startswith("/fdc/v1/food/"):
+            self._send_json(fake_food(url.path.rsplit("/", 1)[1]))
+        elif url.path == "/fdc/v1/foods":
+            ids = ",".join(params.get('fdcIds', [])).split(",")
+            self._send_json([fake_food(fdc_id) for fdc_id in ids if fdc_id])
+        else:
+            self._send_json({'error': 'not found'}, status=404)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_stub_server(port=0, latency=0.0):
+    """Start the stub in a daemon thread; returns (server, base_url)."""
+    handler = type("Handler", (FDCStubHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/fdc/v1"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local FoodData Central stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of simulated server time per request")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency)
+    print(f"Serving FDC stub at {base_url} (set USDA_API_BASE_URL to use it)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
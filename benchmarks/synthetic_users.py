@@ -0,0 +1,52 @@
+# benchmarks/synthetic_users.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Same vocabularies and ranges as utils/generate_users.py and utils/generate_user_preferences.py
+ACTIVITY_LEVELS = ["Sedentary", "Lightly Active", "Moderately Active", "Very Active", "Super Active"]
+HEALTH_CONDITIONS = ["none", "pre-diabetes", "diabetes", "hypertension", "heart disease", "high cholesterol"]
+HEALTH_CONDITION_WEIGHTS = [0.6, 0.1, 0.1, 0.1, 0.05, 0.05]
+GOAL_TYPES = ["weight_loss", "muscle_gain", "reverse_metabolic_markers", "longevity", "optimize_fitness"]
+MOTIVATIONS = ["appearance", "health", "energy", "sports_performance", "doctor_recommendation"]
+DIETARY_RESTRICTIONS = ["none", "vegetarian", "vegan", "keto", "paleo", "gluten_free", "low_fodmap"]
+CUISINES = ["Italian", "Indian", "Mexican", "Chinese", "Japanese", "Mediterranean", "Thai", "American", "Middle Eastern"]
+
+def make_users(n, seed=0):
+    """Vectorized synthetic users frame with the data/users.csv schema."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "id": ids,
+        "name": np.char.add("User ", ids.astype(str)),
+        "email": np.char.add(ids.astype(str), "@example.com"),
+        "age": rng.integers(18, 71, n),
+        "sex": np.array(["male", "female"])[rng.integers(0, 2, n)],
+        "weight_kg": np.round(rng.uniform(50, 120, n), 1),
+        "height_cm": np.round(rng.uniform(150, 200, n), 1),
+        "activity_level": np.array(ACTIVITY_LEVELS)[rng.integers(0, len(ACTIVITY_LEVELS), n)],
+        "exercise_frequency_per_week": rng.integers(0, 8, n),
+    })
+
+def make_preferences(n, seed=1):
+    """Vectorized synthetic preferences frame with the data/user_preferences.csv schema."""
+    rng = np.random.default_rng(seed)
+    cuisine_pool = np.array(["; ".join(rng.choice(CUISINES, k, replace=False)) for k in (1, 2, 3) for _ in range(50)])
+    return pd.DataFrame({
+        "user_id": np.arange(1, n + 1),
+        "health_conditions": rng.choice(HEALTH_CONDITIONS, n, p=HEALTH_CONDITION_WEIGHTS),
+        "goal_type": rng.choice(GOAL_TYPES, n),
+        "motivation": rng.choice(MOTIVATIONS, n),
+        "dietary_restrictions": rng.choice(DIETARY_RESTRICTIONS, n),
+        "preferred_cuisines": rng.choice(cuisine_pool, n),
+    })
+
+def write_synthetic_population(directory, n, seed=0):
+    """Write users.csv and user_preferences.csv for n synthetic users; returns both paths."""
+    os.makedirs(directory, exist_ok=True)
+    users_path = os.path.join(directory, "users.csv")
+    preferences_path = os.path.join(directory, "user_preferences.csv")
+    make_users(n, seed).to_csv(users_path, index=False)
+    make_preferences(n, seed + 1).to_csv(preferences_path, index=False)
+    return users_path, preferences_path
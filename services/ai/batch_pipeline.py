@@ -0,0 +1,362 @@
+# services/ai/batch_pipeline.py
+
+import os
+import sys
+import csv
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.ai.generation_engine import (
+    DEFAULT_MODEL,
+    OUTPUT_FIELDS,
+    DEFAULT_OUTPUTS,
+    FIXED_USER_IDS,
+    GenerationEngine,
+    default_client,
+    load_generation_users,
+)
+from services.ai.response_cache import response_key
+
+DEFAULT_BATCH_DIR = "llm_test_data/batches"
+DEFAULT_POLL_INTERVAL = 30.0
+DEFAULT_BATCH_TIMEOUT = 24 * 3600
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+# Batch states after which polling stops (OpenAI Batch API names)
+FINISHED_STATES = {"completed", "failed", "expired", "cancelled"}
+
+# ------------------ Batch Files ------------------
+
+def batch_request(model: str, prompt: str, temperature: float, max_tokens: int,
+                  response_format: Optional[Dict[str, Any]] = None, attempt: int = 1) -> Dict[str, Any]:
+    """
+    One Batch API request line. The custom_id is the response-cache key, so
+    identical prompts across users are sent once; retries get their own key so
+    the prompt is sampled again.
+    """
+    messages = [{"role": "user", "content": prompt}]
+    custom_id = response_key(model, messages, temperature, max_tokens)
+    if attempt > 1:
+        custom_id += f"_attempt{attempt}"
+    body = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    if response_format is not None:
+        body["response_format"] = response_format
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_URL,
+        "body": body,
+    }
+
+def write_batch_file(requests: List[Dict[str, Any]], path: str) -> str:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+    return path
+
+def result_content(result: Dict[str, Any]) -> Optional[str]:
+    """Assistant message from one Batch API output line, or None if the request failed."""
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        return None
+    try:
+        return response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+# ------------------ Backends ------------------
+
+class BatchBackend(ABC):
+    """
+    Interface for batch submission services. A backend accepts a JSONL file of
+    chat completion requests and later yields one output line per request.
+    """
+
+    @abstractmethod
+    def submit(self, requests_path: str) -> str:
+        """Upload a request file and start a batch. Returns the batch id."""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Current state, e.g. validating, in_progress, completed, failed."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Output lines ({"custom_id", "response": {"status_code", "body"}, "error"}) of a completed batch."""
+
+class OpenAIBatchBackend(BatchBackend):
+    """The OpenAI Batch API (24h completion window, billed at the batch rate)."""
+
+    def __init__(self, client=None, completion_window: str = "24h"):
+        self.client = client if client is not None else default_client()
+        self.completion_window = completion_window
+
+    def submit(self, requests_path: str) -> str:
+        with open(requests_path, 'rb') as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=CHAT_COMPLETIONS_URL,
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for the Batch API. Each batch gets a directory with the
+    submitted input.jsonl; the first status poll answers every request through
+    `client` (any OpenAI-compatible chat client) and writes output.jsonl in the
+    Batch API output format.
+    """
+
+    def __init__(self, batch_dir: str = DEFAULT_BATCH_DIR, client=None):
+        self.batch_dir = batch_dir
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = default_client()
+        return self._client
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.batch_dir, batch_id, name)
+
+    def submit(self, requests_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(os.path.join(self.batch_dir, batch_id), exist_ok=True)
+        with open(requests_path, 'r') as src, open(self._path(batch_id, "input.jsonl"), 'w') as dst:
+            dst.write(src.read())
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        if not os.path.exists(self._path(batch_id, "input.jsonl")):
+            return "failed"
+        if not os.path.exists(self._path(batch_id, "output.jsonl")):
+            self._process(batch_id)
+        return "completed"
+
+    def _process(self, batch_id: str):
+        tmp_path = self._path(batch_id, "output.jsonl.tmp")
+        with open(self._path(batch_id, "input.jsonl"), 'r') as src, open(tmp_path, 'w') as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    response = self.client.chat.completions.create(**request["body"])
+                    body = {"choices": [{"index": 0, "message": {
+                        "role": "assistant", "content": response.choices[0].message.content}}]}
+                    result = {"custom_id": request["custom_id"],
+                              "response": {"status_code": 200, "body": body}, "error": None}
+                except Exception as e:
+                    result = {"custom_id": request["custom_id"], "response": None,
+                              "error": {"code": type(e).__name__, "message": str(e)}}
+                dst.write(json.dumps(result) + "\n")
+        os.replace(tmp_path, self._path(batch_id, "output.jsonl"))
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        with open(self._path(batch_id, "output.jsonl"), 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def wait_for_batch(backend: BatchBackend, batch_id: str,
+                   poll_interval: float = DEFAULT_POLL_INTERVAL,
+                   timeout: float = DEFAULT_BATCH_TIMEOUT) -> str:
+    """Poll until the batch finishes; returns its final state."""
+    deadline = time.monotonic() + timeout
+    while True:
+        state = backend.status(batch_id)
+        if state in FINISHED_STATES:
+            return state
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch {batch_id} still {state} after {timeout}s")
+        time.sleep(poll_interval)
+
+# ------------------ Pipeline ------------------
+
+class PendingCall(Exception):
+    """Raised inside a mode's generate() when the next prompt has no batch answer yet."""
+
+    def __init__(self, request: Dict[str, Any]):
+        super().__init__(request["custom_id"])
+        self.request = request
+
+class BatchRequestFailed(Exception):
+    pass
+
+class BatchGenerationPipeline:
+    """
+    Runs a prompting mode through a batch backend instead of per-user calls.
+    Each round replays every user's mode.generate() against the answers received
+    so far and collects the prompts still missing into one batch file, so chained
+    modes (agentic: reasoning then meal plan) take one batch per step. Users
+    whose reply fails (too few valid meals or a failed request) are resubmitted
+    in follow-up rounds under new keys, up to the mode's max_attempts like the
+    synchronous engine. Replies are parsed by the engine's guardrails and
+    written in input order.
+
+    Args:
+        mode (str | GenerationMode): Prompting mode, see generation_engine.MODES
+        backend (BatchBackend): Where batches are submitted
+        model (str): Chat model name
+        work_dir (str): Where round request files are written
+        structured (bool): Request JSON replies and validate them against meal_schema
+    """
+
+    def __init__(self, mode, backend: BatchBackend, model: str = DEFAULT_MODEL,
+                 work_dir: str = DEFAULT_BATCH_DIR,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 timeout: float = DEFAULT_BATCH_TIMEOUT, structured: bool = False):
+        self.engine = GenerationEngine(mode, model=model, workers=1, structured=structured)
+        self.mode = self.engine.mode
+        self.backend = backend
+        self.model = model
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.answers: Dict[str, Optional[str]] = {}
+        self.stats = {'rounds': 0, 'requests': 0, 'failed_requests': 0, 'retries': 0}
+        self._attempt = 1
+
+    def _replay_chat(self, prompt: str, temperature: float, max_tokens: int, output: str = "meal_plan") -> str:
+        prompt, response_format = self.engine.structured_prompt(prompt, output)
+        request = batch_request(self.model, prompt, temperature, max_tokens, response_format, self._attempt)
+        key = request["custom_id"]
+        if key not in self.answers:
+            raise PendingCall(request)
+        if self.answers[key] is None:
+            raise BatchRequestFailed(key)
+        return self.answers[key]
+
+    def _replay(self, user, attempt: int = 1):
+        """(raw reply, None), (None, pending request) or (None, None) if a request failed."""
+        self._attempt = attempt
+        try:
+            return self.mode.generate(self._replay_chat, user), None
+        except PendingCall as call:
+            return None, call.request
+        except BatchRequestFailed:
+            return None, None
+
+    def _accepts(self, raw_reply: Optional[str]) -> bool:
+        return raw_reply is not None and len(self.engine.parse_meals(raw_reply)) >= self.mode.min_meals
+
+    def run_rounds(self, users: List[Any]) -> List[Optional[str]]:
+        """Submit batches until every user has an accepted reply or has used up its attempts."""
+        attempts = [1] * len(users)
+        replies: List[Optional[str]] = [None] * len(users)
+        active = list(range(len(users)))
+        while active:
+            pending = {}
+            for i in active:
+                _, request = self._replay(users[i], attempts[i])
+                if request is not None:
+                    pending.setdefault(request["custom_id"], request)
+            if not pending:
+                retry = []
+                for i in active:
+                    replies[i], _ = self._replay(users[i], attempts[i])
+                    if not self._accepts(replies[i]) and attempts[i] < self.mode.max_attempts:
+                        attempts[i] += 1
+                        retry.append(i)
+                if retry:
+                    print(f"⚠️ Resubmitting {len(retry)} users with unusable replies")
+                self.stats['retries'] += len(retry)
+                active = retry
+                continue
+
+            self.stats['rounds'] += 1
+            path = os.path.join(self.work_dir, f"{self.mode.name}_{int(time.time())}_round{self.stats['rounds']}.jsonl")
+            write_batch_file(list(pending.values()), path)
+            batch_id = self.backend.submit(path)
+            print(f"📦 Submitted batch {batch_id} with {len(pending)} requests ({self.mode.name}, round {self.stats['rounds']})")
+            state = wait_for_batch(self.backend, batch_id, self.poll_interval, self.timeout)
+            if state != "completed":
+                print(f"❌ Batch {batch_id} ended as {state}")
+
+            self.stats['requests'] += len(pending)
+            for result in (self.backend.results(batch_id) if state == "completed" else ()):
+                if result.get("custom_id") in pending:
+                    self.answers[result["custom_id"]] = result_content(result)
+            for key in pending:
+                if self.answers.setdefault(key, None) is None:
+                    self.stats['failed_requests'] += 1
+
+        return replies
+
+    def run(self, users, output_path: str) -> Dict[str, int]:
+        """
+        Generate meals for `users` through batches and write them to `output_path`.
+
+        Returns:
+            Dict[str, int]: users, succeeded, failed, rows, rounds, requests, failed_requests and retries
+        """
+        if isinstance(users, pd.DataFrame):
+            users = [user for _, user in users.iterrows()]
+        raw_replies = self.run_rounds(users)
+
+        summary = {'users': len(users), 'succeeded': 0, 'failed': 0, 'rows': 0}
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w', newline='') as output_file:
+            csv_writer = csv.DictWriter(output_file, fieldnames=OUTPUT_FIELDS)
+            csv_writer.writeheader()
+            for user, raw_reply in zip(users, raw_replies):
+                if not self._accepts(raw_reply):
+                    print(f"❌ Could not generate valid meals for user {user['user_id']} from batch results")
+                    summary['failed'] += 1
+                    continue
+                rows = self.engine.to_rows(user, self.engine.parse_meals(raw_reply))
+                csv_writer.writerows(rows)
+                summary['succeeded'] += 1
+                summary['rows'] += len(rows)
+        summary.update(self.stats)
+        return summary
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate meal plans for users through a batch API")
+    parser.add_argument("--mode", choices=list(DEFAULT_OUTPUTS), required=True)
+    parser.add_argument("--backend", choices=["openai", "local"], default="openai")
+    parser.add_argument("--output", default=None, help="Defaults to llm_test_data/outputs_<mode>.csv")
+    parser.add_argument("--work-dir", default=DEFAULT_BATCH_DIR, help="Where batch request files are written")
+    parser.add_argument("--user-ids", nargs="*", default=FIXED_USER_IDS)
+    parser.add_argument("--all-users", action="store_true")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_BATCH_TIMEOUT)
+    parser.add_argument("--structured", action="store_true", help="Request JSON meal plans")
+    args = parser.parse_args()
+
+    backend = OpenAIBatchBackend() if args.backend == "openai" else LocalBatchBackend(args.work_dir)
+    pipeline = BatchGenerationPipeline(args.mode, backend, work_dir=args.work_dir,
+                                       poll_interval=args.poll_interval, timeout=args.timeout,
+                                       structured=args.structured)
+    output_path = args.output or DEFAULT_OUTPUTS[args.mode]
+    users = load_generation_users(user_ids=None if args.all_users else args.user_ids)
+    summary = pipeline.run(users, output_path)
+    print(f"🎯 Completed {args.mode} batch generation! Results saved to {output_path} ({summary})")
@@ -0,0 +1,63 @@
+# services/ai/checkpoint.py
+
+import os
+import json
+from typing import Dict, IO, List, Set
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of users whose output rows are durably written.
+    Each entry records the byte size of every output file after that user's
+    rows, so resuming can cut off rows of a user that was interrupted midway
+    and then append without duplicates.
+
+    Args:
+        journal_path (str): JSON-lines journal file
+        output_paths (List[str]): Output CSVs the journal covers
+    """
+
+    def __init__(self, journal_path: str, output_paths: List[str]):
+        self.journal_path = journal_path
+        self.output_paths = list(output_paths)
+
+    def reset(self):
+        """Start a fresh run: forget every completed user."""
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def load(self) -> Set[str]:
+        """
+        Completed user ids from the journal. Output files are truncated to the
+        sizes recorded by the last entry; anything after it was never committed.
+        """
+        completed = set()
+        last_sizes: Dict[str, int] = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a crash mid-write
+                        break
+                    completed.add(str(entry["user_id"]))
+                    last_sizes = entry["sizes"]
+
+        for path in self.output_paths:
+            if os.path.exists(path) and path in last_sizes and os.path.getsize(path) > last_sizes[path]:
+                with open(path, 'r+b') as f:
+                    f.truncate(last_sizes[path])
+        return completed
+
+    def commit(self, user_id: str, files: Dict[str, IO]):
+        """Flush and fsync the user's rows in `files` (path -> open file), then journal the user."""
+        sizes = {}
+        for path, f in files.items():
+            f.flush()
+            os.fsync(f.fileno())
+            sizes[path] = f.tell()
+        with open(self.journal_path, 'a') as journal:
+            journal.write(json.dumps({"user_id": str(user_id), "sizes": sizes}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
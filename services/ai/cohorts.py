@@ -0,0 +1,244 @@
+# services/ai/cohorts.py
+
+import os
+import sys
+import csv
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.ai.generation_engine import (
+    DEFAULT_WORKERS,
+    OUTPUT_FIELDS,
+    GenerationEngine,
+    load_generation_users,
+)
+from services.ai.response_cache import CACHE_MODES, default_response_cache
+
+# ------------------ Defaults ------------------
+
+DEFAULT_CALORIE_STEP = 250.0
+DEFAULT_MACRO_STEP = 0.05
+# Portion factors stay within these bounds so no meal is halved or doubled beyond reason
+DEFAULT_MIN_SCALE = 0.5
+DEFAULT_MAX_SCALE = 2.0
+# Pull toward one factor for the whole day; keeps meal proportions close to the plan
+DEFAULT_SMOOTHING = 0.05
+
+CUISINE_KEYS = ("set", "primary", "any")
+# Full cuisine sets leave most users in a cohort of their own
+DEFAULT_CUISINE_KEY = "primary"
+MACROS = ["calories", "protein_g", "carbs_g", "fats_g"]
+TARGET_COLUMNS = ["optimal_calories", "protein_g", "carbs_g", "fat_g"]
+KCAL_PER_GRAM = np.array([4.0, 4.0, 9.0])
+
+COHORT_FIELDS = OUTPUT_FIELDS + ["cohort_id", "portion_scale"]
+
+# ------------------ Bucketing ------------------
+
+def cuisine_key(preferred_cuisines, how: str = DEFAULT_CUISINE_KEY) -> str:
+    """
+    Cohort key for a "Italian; Japanese" style cuisine list: the sorted set,
+    only the first listed cuisine, or nothing.
+    """
+    if how not in CUISINE_KEYS:
+        raise ValueError(f"Unknown cuisine key '{how}'. Expected one of: {', '.join(CUISINE_KEYS)}.")
+    if how == "any" or not isinstance(preferred_cuisines, str):
+        return "any"
+    cuisines = [cuisine.strip().lower() for cuisine in preferred_cuisines.split(";") if cuisine.strip()]
+    if not cuisines:
+        return "any"
+    return cuisines[0] if how == "primary" else ";".join(sorted(set(cuisines)))
+
+def assign_cohorts(users_df: pd.DataFrame,
+                   calorie_step: float = DEFAULT_CALORIE_STEP,
+                   macro_step: float = DEFAULT_MACRO_STEP,
+                   cuisines: str = DEFAULT_CUISINE_KEY) -> pd.DataFrame:
+    """
+    Add cohort columns to merged generation users: calories quantized to
+    `calorie_step` kcal, the protein/carbs/fat share of calories to `macro_step`,
+    plus goals, dietary restriction, health condition and cuisine key. Goals are
+    part of the key because the prompts ask for a goal-specific plan.
+    Returns a copy with `calorie_bucket`, `protein_share`, `carbs_share`,
+    `fat_share`, `cuisine_key` and an integer `cohort_id` in first-seen order.
+    """
+    df = users_df.copy()
+    calories = df['optimal_calories'].to_numpy(dtype=float)
+    shares = df[['protein_g', 'carbs_g', 'fat_g']].to_numpy(dtype=float) * KCAL_PER_GRAM / calories[:, None]
+
+    df['calorie_bucket'] = (np.floor(calories / calorie_step) + 0.5) * calorie_step
+    df['protein_share'], df['carbs_share'], df['fat_share'] = (np.round(shares / macro_step) * macro_step).round(4).T
+    df['cuisine_key'] = [cuisine_key(value, cuisines) for value in df['preferred_cuisines']]
+
+    # guided prompts read `goals`, the others `goal_type`
+    goal_keys = [column for column in ('goals', 'goal_type') if column in df.columns]
+    keys = ['calorie_bucket', 'protein_share', 'carbs_share', 'fat_share', *goal_keys,
+            'dietary_restrictions', 'health_conditions', 'cuisine_key']
+    df['cohort_id'] = df.groupby(keys, sort=False, dropna=False).ngroup()
+    return df
+
+def cohort_representatives(cohorts_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    One synthetic user per cohort: the profile of the member closest to the
+    cohort's mean calories, with targets set to the bucket centre.
+    """
+    distance = (cohorts_df['optimal_calories'] - cohorts_df.groupby('cohort_id')['optimal_calories'].transform('mean')).abs()
+    reps = cohorts_df.loc[distance.groupby(cohorts_df['cohort_id']).idxmin()].copy()
+    reps = reps.sort_values('cohort_id').reset_index(drop=True)
+
+    reps['optimal_calories'] = reps['calorie_bucket']
+    grams = reps[['protein_share', 'carbs_share', 'fat_share']].to_numpy() * reps[['calorie_bucket']].to_numpy() / KCAL_PER_GRAM
+    reps['protein_g'], reps['carbs_g'], reps['fat_g'] = grams.round(1).T
+    reps['user_id'] = "cohort_" + reps['cohort_id'].astype(str)
+    return reps
+
+# ------------------ Portion Scaling ------------------
+
+def scale_portions(meal_macros: np.ndarray, targets: np.ndarray,
+                   min_scale: float = DEFAULT_MIN_SCALE,
+                   max_scale: float = DEFAULT_MAX_SCALE,
+                   smoothing: float = DEFAULT_SMOOTHING) -> np.ndarray:
+    """
+    Per-meal portion factors that bring a plan's daily macros to each user's targets.
+    Solves a ridge least-squares problem on relative macro error, pulled toward the
+    single factor that matches calories, for all users at once, then clips.
+
+    Args:
+        meal_macros (np.ndarray): (n_meals, 4) calories, protein, carbs, fats per meal
+        targets (np.ndarray): (n_users, 4) daily targets in the same order
+
+    Returns:
+        np.ndarray: (n_users, n_meals) portion factors
+    """
+    meal_macros = np.asarray(meal_macros, dtype=float)
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    n_meals = meal_macros.shape[0]
+    if n_meals == 0:
+        return np.empty((len(targets), 0))
+
+    # Normalize each macro by the mean target so errors are relative
+    weights = 1.0 / np.maximum(targets.mean(axis=0), 1e-9)
+    design = (meal_macros * weights).T                      # (4, n_meals)
+    rhs = targets * weights                                 # (n_users, 4)
+    uniform = targets[:, 0] / max(meal_macros[:, 0].sum(), 1e-9)
+
+    lam = smoothing * n_meals
+    gram = design.T @ design + lam * np.eye(n_meals)
+    factors = np.linalg.solve(gram, (rhs @ design + lam * uniform[:, None]).T).T
+    return np.clip(factors, min_scale, max_scale)
+
+def macro_errors(achieved: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Absolute percentage error per user and macro."""
+    return np.abs(achieved - targets) / np.maximum(targets, 1e-9) * 100
+
+# ------------------ Pipeline ------------------
+
+def generate_cohort_plans(users_df: pd.DataFrame, engine: GenerationEngine, output_path: str,
+                          calorie_step: float = DEFAULT_CALORIE_STEP,
+                          macro_step: float = DEFAULT_MACRO_STEP,
+                          cuisines: str = DEFAULT_CUISINE_KEY) -> Dict[str, Any]:
+    """
+    Generate one plan per cohort with `engine`, scale it to every member's targets
+    and write member rows (in input order) to `output_path`.
+
+    Returns:
+        Dict: users, cohorts, failed cohorts/users, LLM calls made and avoided, and
+        the mean/max absolute % error per macro before and after portion scaling
+    """
+    cohorts_df = assign_cohorts(users_df, calorie_step, macro_step, cuisines)
+    reps = cohort_representatives(cohorts_df)
+
+    plans: Dict[int, List[Dict[str, Any]]] = {}
+    for rep, rows in engine.iter_results(reps):
+        if rows:
+            plans[rep['cohort_id']] = rows
+
+    errors_before, errors_after = [], []
+    written = failed_users = 0
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w', newline='') as output_file:
+        csv_writer = csv.DictWriter(output_file, fieldnames=COHORT_FIELDS)
+        csv_writer.writeheader()
+        members = cohorts_df.groupby('cohort_id', sort=False).indices
+        factors_by_row = {}
+
+        for cohort_id, positions in members.items():
+            rows = plans.get(cohort_id)
+            if rows is None:
+                failed_users += len(positions)
+                continue
+            meal_macros = np.array([[float(row[macro]) for macro in MACROS] for row in rows])
+            targets = cohorts_df.iloc[positions][TARGET_COLUMNS].to_numpy(dtype=float)
+            factors = scale_portions(meal_macros, targets)
+            errors_before.append(macro_errors(np.tile(meal_macros.sum(axis=0), (len(targets), 1)), targets))
+            errors_after.append(macro_errors(factors @ meal_macros, targets))
+            for position, user_factors in zip(positions, factors):
+                factors_by_row[position] = (cohort_id, user_factors)
+
+        for position in range(len(cohorts_df)):
+            if position not in factors_by_row:
+                continue
+            cohort_id, user_factors = factors_by_row[position]
+            user_id = cohorts_df.iloc[position]['user_id']
+            for row, factor in zip(plans[cohort_id], user_factors):
+                scaled = dict(row, user_id=user_id, mode=f"cohort_{engine.mode.name}",
+                              cohort_id=cohort_id, portion_scale=round(float(factor), 3))
+                for macro in MACROS:
+                    scaled[macro] = round(float(row[macro]) * factor, 1)
+                csv_writer.writerow(scaled)
+                written += 1
+
+    n_users, n_cohorts = len(cohorts_df), len(reps)
+    report = {
+        'users': n_users,
+        'cohorts': n_cohorts,
+        'failed_cohorts': n_cohorts - len(plans),
+        'failed_users': failed_users,
+        'rows': written,
+        'llm_calls': n_cohorts * engine.mode.calls_per_plan,
+        'llm_calls_avoided': (n_users - n_cohorts) * engine.mode.calls_per_plan,
+    }
+    for label, errors in (('unscaled', errors_before), ('scaled', errors_after)):
+        stacked = np.vstack(errors) if errors else np.empty((0, len(MACROS)))
+        for macro, column in zip(MACROS, stacked.T):
+            report[f'{label}_{macro}_mean_error_pct'] = round(float(column.mean()), 2) if len(column) else None
+            report[f'{label}_{macro}_max_error_pct'] = round(float(column.max()), 2) if len(column) else None
+    return report
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Generate one meal plan per cohort and scale it to each user")
+    parser.add_argument("--mode", default="guided")
+    parser.add_argument("--output", default=None, help="Defaults to llm_test_data/outputs_cohort_<mode>.csv")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--calorie-step", type=float, default=DEFAULT_CALORIE_STEP)
+    parser.add_argument("--macro-step", type=float, default=DEFAULT_MACRO_STEP)
+    parser.add_argument("--cuisines", choices=CUISINE_KEYS, default=DEFAULT_CUISINE_KEY,
+                        help="Group by the full cuisine set, the first listed cuisine, or not at all")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default=None)
+    parser.add_argument("--structured", action="store_true", help="Request JSON meal plans")
+    parser.add_argument("--dry-run", action="store_true", help="Only report cohort counts")
+    args = parser.parse_args()
+
+    users = load_generation_users(user_ids=None)
+    if args.dry_run:
+        cohorts_df = assign_cohorts(users, args.calorie_step, args.macro_step, args.cuisines)
+        n_cohorts = cohorts_df['cohort_id'].nunique()
+        print(f"{len(users)} users -> {n_cohorts} cohorts ({len(users) - n_cohorts} plans avoided)")
+    else:
+        response_cache = default_response_cache(args.cache_mode)
+        engine = GenerationEngine(args.mode, workers=args.workers, structured=args.structured,
+                                  response_cache=None if response_cache.mode == "off" else response_cache)
+        output_path = args.output or f"llm_test_data/outputs_cohort_{engine.mode.name}.csv"
+        report = generate_cohort_plans(users, engine, output_path,
+                                       args.calorie_step, args.macro_step, args.cuisines)
+        print(json.dumps(report, indent=2))
+        print(f"🎯 Completed cohort generation! Results saved to {output_path}")
@@ -2,17 +2,17 @@
 
 import csv
 import os
+import sys
 from dotenv import load_dotenv
 from openai import OpenAI
-from services.ai.guardrails_manager import GuardrailsManager
 
-# Load environment
-env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
-load_dotenv(env_path, override=True)
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-guardrails = GuardrailsManager()
+from services.ai.checkpoint import CheckpointJournal
+from services.ai.guardrails_manager import GuardrailsManager
+from services.ai.meal_schema import response_format_for, structured_instructions
+from services.ai.rate_limiter import RateLimitedClient, default_rate_limiter
 
 # Paths
 users_path = "data/users.csv"
@@ -21,49 +21,44 @@ prompt_template_path = "services/prompts/meal_recommendation_prompt.txt"
 output_meals_path = "data/full_day_meal_recommendations.csv"
 output_totals_path = "data/daily_nutrition_totals.csv"
 
-# Load prompt template
-with open(prompt_template_path, 'r') as f:
-    prompt_template = f.read()
-
-# Read users
-users = {}
-with open(users_path, mode='r') as infile:
-    reader = csv.DictReader(infile)
-    for row in reader:
-        users[row["id"]] = row
-
-# Read preferences
-preferences = {}
-with open(preferences_path, mode='r') as infile:
-    reader = csv.DictReader(infile)
-    for row in reader:
-        preferences[row["user_id"]] = row
-
-# Ensure output directory
-os.makedirs('data', exist_ok=True)
-
-# Output files
-meal_writer = csv.writer(open(output_meals_path, 'w', newline=''))
-meal_writer.writerow([
+MEAL_HEADER = [
     "user_id", "meal_type", "meal_name", "ingredients", "calories", "protein_g", "carbs_g", "fats_g", "rationale"
-])
-
-totals_writer = csv.writer(open(output_totals_path, 'w', newline=''))
-totals_writer.writerow([
+]
+TOTALS_HEADER = [
     "user_id", "total_calories", "total_protein_g", "total_carbs_g", "total_fats_g"
-])
+]
+
+MODEL = "gpt-4"
 
 # Meal type mapping
 meal_order = ["breakfast", "morning_snack", "lunch", "evening_snack", "dinner"]
 
-# For each user
-for user_id in users.keys():
-    user = users[user_id]
-    preference = preferences.get(user_id)
-    
-    if not preference:
-        continue
-    
+def default_journal_path(meals_path: str) -> str:
+    return os.path.splitext(meals_path)[0] + ".journal"
+
+def load_inputs(users_path=users_path, preferences_path=preferences_path):
+    # Read users
+    users = {}
+    with open(users_path, mode='r') as infile:
+        reader = csv.DictReader(infile)
+        for row in reader:
+            users[row["id"]] = row
+
+    # Read preferences
+    preferences = {}
+    with open(preferences_path, mode='r') as infile:
+        reader = csv.DictReader(infile)
+        for row in reader:
+            preferences[row["user_id"]] = row
+
+    return users, preferences
+
+def generate_for_user(client, guardrails, prompt_template, user_id, user, preference, meal_writer, totals_writer,
+                      structured=False):
+    """
+    Generate, validate and write one user's full day. Raises on API errors.
+    With `structured=True` the reply is a JSON meal plan validated against meal_schema.
+    """
     # Fill the full-day prompt
     prompt = prompt_template.format(
         age=user["age"],
@@ -79,61 +74,152 @@ for user_id in users.keys():
         preferred_cuisines=preference["preferred_cuisines"]
     )
 
-    try:
-        # LLM call
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7
-        )
-        raw_response = response.choices[0].message.content
-
+    # LLM call
+    request = {"model": MODEL, "messages": [{"role": "user", "content": prompt}], "temperature": 0.7}
+    if structured:
+        request["messages"][0]["content"] += structured_instructions("meal_plan")
+        response_format = response_format_for(MODEL, "meal_plan")
+        if response_format is not None:
+            request["response_format"] = response_format
+    response = client.chat.completions.create(**request)
+    raw_response = response.choices[0].message.content
+
+    if structured:
+        # Meals carry their own meal_type
+        parsed_meals = [(meal["meal_type"], meal)
+                        for meal in guardrails.sanitize_and_validate_structured_output(raw_response)]
+    else:
         # Split the response based on headings
-        meals = raw_response.split('\n\n')
-        
-        daily_totals = {
-            "calories": 0.0,
-            "protein_g": 0.0,
-            "carbs_g": 0.0,
-            "fats_g": 0.0
-        }
-
-        for meal_text, meal_type in zip(meals, meal_order):
-            parsed_meal = guardrails.sanitize_and_validate_output(meal_text)
-            
-            if not parsed_meal:
-                print(f"⚠️ Skipping invalid meal for user {user_id} ({meal_type})")
-                continue
-
-            meal_writer.writerow([
-                user_id,
-                meal_type,
-                parsed_meal["meal_name"],
-                parsed_meal["ingredients"],
-                parsed_meal["calories"],
-                parsed_meal["protein_g"],
-                parsed_meal["carbs_g"],
-                parsed_meal["fats_g"],
-                parsed_meal["rationale"]
-            ])
-
-            # Sum daily totals
-            daily_totals["calories"] += parsed_meal["calories"]
-            daily_totals["protein_g"] += parsed_meal["protein_g"]
-            daily_totals["carbs_g"] += parsed_meal["carbs_g"]
-            daily_totals["fats_g"] += parsed_meal["fats_g"]
-
-        totals_writer.writerow([
+        parsed_meals = [(meal_type, guardrails.sanitize_and_validate_output(meal_text))
+                        for meal_text, meal_type in zip(raw_response.split('\n\n'), meal_order)]
+
+    daily_totals = {
+        "calories": 0.0,
+        "protein_g": 0.0,
+        "carbs_g": 0.0,
+        "fats_g": 0.0
+    }
+
+    for meal_type, parsed_meal in parsed_meals:
+        if not parsed_meal:
+            print(f"⚠️ Skipping invalid meal for user {user_id} ({meal_type})")
+            continue
+
+        meal_writer.writerow([
             user_id,
-            daily_totals["calories"],
-            daily_totals["protein_g"],
-            daily_totals["carbs_g"],
-            daily_totals["fats_g"]
+            meal_type,
+            parsed_meal["meal_name"],
+            parsed_meal["ingredients"],
+            parsed_meal["calories"],
+            parsed_meal["protein_g"],
+            parsed_meal["carbs_g"],
+            parsed_meal["fats_g"],
+            parsed_meal["rationale"]
         ])
 
-        print(f"✅ Generated full day meals for user {user_id}")
+        # Sum daily totals
+        daily_totals["calories"] += parsed_meal["calories"]
+        daily_totals["protein_g"] += parsed_meal["protein_g"]
+        daily_totals["carbs_g"] += parsed_meal["carbs_g"]
+        daily_totals["fats_g"] += parsed_meal["fats_g"]
+
+    totals_writer.writerow([
+        user_id,
+        daily_totals["calories"],
+        daily_totals["protein_g"],
+        daily_totals["carbs_g"],
+        daily_totals["fats_g"]
+    ])
+
+def generate_meal_recommendations(resume=False,
+                                  client=None,
+                                  users_path=users_path,
+                                  preferences_path=preferences_path,
+                                  meals_path=output_meals_path,
+                                  totals_path=output_totals_path,
+                                  journal_path=None,
+                                  structured=False):
+    """
+    Generate a full day of meals for every user with preferences.
+    Each finished user is committed to a journal after its rows are flushed to
+    both CSVs; with `resume=True`, journaled users are skipped and rows are
+    appended, so an interrupted run continues without repeating any LLM calls.
+    `structured=True` requests JSON meal plans instead of free text.
+    Returns the number of users generated in this run.
+    """
+    if client is None:
+        env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+        load_dotenv(env_path, override=True)
+        client = RateLimitedClient(OpenAI(api_key=os.getenv("OPENAI_API_KEY")), default_rate_limiter())
+    guardrails = GuardrailsManager()
+
+    # Load prompt template
+    with open(prompt_template_path, 'r') as f:
+        prompt_template = f.read()
+
+    users, preferences = load_inputs(users_path, preferences_path)
+
+    journal = CheckpointJournal(journal_path or default_journal_path(meals_path), [meals_path, totals_path])
+    completed = journal.load() if resume else set()
+    if completed and not (os.path.exists(meals_path) and os.path.exists(totals_path)):
+        # Appending would leave a CSV without its header and out of step with the other
+        print("⚠️ Journal found but an output file is missing, starting over")
+        completed = set()
+    if not completed:
+        journal.reset()
+    else:
+        print(f"↩️ Resuming: {len(completed)} users already done")
+
+    # Ensure output directory
+    os.makedirs(os.path.dirname(meals_path) or '.', exist_ok=True)
+    os.makedirs(os.path.dirname(totals_path) or '.', exist_ok=True)
+    file_mode = 'a' if completed else 'w'
+
+    generated = 0
+    with open(meals_path, file_mode, newline='') as meals_file, open(totals_path, file_mode, newline='') as totals_file:
+        meal_writer = csv.writer(meals_file)
+        totals_writer = csv.writer(totals_file)
+        if not completed:
+            meal_writer.writerow(MEAL_HEADER)
+            totals_writer.writerow(TOTALS_HEADER)
+
+        # For each user
+        for user_id in users.keys():
+            if user_id in completed:
+                continue
+            preference = preferences.get(user_id)
+            if not preference:
+                continue
 
-    except Exception as e:
-        print(f"⚠️ Failed for user {user_id}: {e}")
+            try:
+                generate_for_user(client, guardrails, prompt_template, user_id, users[user_id], preference,
+                                  meal_writer, totals_writer, structured)
+            except Exception as e:
+                print(f"⚠️ Failed for user {user_id}: {e}")
+                continue
 
-print("🎯 All users processed successfully!")
+            journal.commit(user_id, {meals_path: meals_file, totals_path: totals_file})
+            generated += 1
+            print(f"✅ Generated full day meals for user {user_id}")
+
+    print("🎯 All users processed successfully!")
+    return generated
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate full-day meal recommendations for every user")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip users already in the journal and append to the existing outputs")
+    parser.add_argument("--users", default=users_path)
+    parser.add_argument("--preferences", default=preferences_path)
+    parser.add_argument("--meals-output", default=output_meals_path)
+    parser.add_argument("--totals-output", default=output_totals_path)
+    parser.add_argument("--journal", default=None, help="Defaults to the meals output path with .journal")
+    parser.add_argument("--structured", action="store_true",
+                        help="Request JSON meal plans and validate them against the pydantic schema")
+    args = parser.parse_args()
+
+    generate_meal_recommendations(resume=args.resume, users_path=args.users, preferences_path=args.preferences,
+                                  meals_path=args.meals_output, totals_path=args.totals_output,
+                                  journal_path=args.journal, structured=args.structured)
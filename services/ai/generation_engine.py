@@ -0,0 +1,457 @@
+# services/ai/generation_engine.py
+
+import os
+import sys
+import csv
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+from openai import OpenAI
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.ai.guardrails_manager import GuardrailsManager
+from services.ai.meal_schema import OUTPUT_SCHEMAS, response_format_for, structured_instructions
+from services.ai.meal_stream import StreamingChatClient
+from services.ai.rate_limiter import LLMRateLimiter, RateLimitedClient, DEFAULT_RPM, DEFAULT_TPM
+from services.ai.response_cache import CACHE_MODES, LLMResponseCache, default_response_cache
+from services.nutrition_calculation.columnar import default_columnar_path, load_nutrition_targets
+from services.profile_store.profile_store import open_profile_store
+
+# ------------------ Defaults ------------------
+
+DEFAULT_MODEL = "gpt-4"
+DEFAULT_WORKERS = 16
+
+NUTRITION_TARGETS_PATH = "data/user_nutrition_targets.csv"
+USERS_PATH = "data/users.csv"
+PREFERENCES_PATH = "data/user_preferences.csv"
+PROFILE_STORE_DIR = "data/profile_store"
+PROMPTS_DIR = "services/prompts"
+
+# Meals in a full-day plan (breakfast, morning snack, lunch, evening snack, dinner)
+MEALS_PER_PLAN = 5
+
+# Users compared across modes in llm_test_data/
+FIXED_USER_IDS = ['1861', '354', '1334', '906', '1290', '1274', '939', '1732', '66', '1324']
+
+OUTPUT_FIELDS = [
+    "user_id", "mode", "meal_type", "meal_name",
+    "calories", "protein_g", "carbs_g", "fats_g", "rationale"
+]
+
+# A chat function takes (prompt, temperature, max_tokens, output="meal_plan") and returns the reply text;
+# `output` names the meal_schema.OUTPUT_SCHEMAS entry the reply should match in structured mode
+ChatFn = Callable[..., str]
+
+# ------------------ Data Loading ------------------
+
+def load_generation_users(nutrition_targets_path: str = NUTRITION_TARGETS_PATH,
+                          users_path: str = USERS_PATH,
+                          preferences_path: str = PREFERENCES_PATH,
+                          user_ids: Optional[List[str]] = FIXED_USER_IDS,
+                          profile_store_dir: Optional[str] = PROFILE_STORE_DIR) -> pd.DataFrame:
+    """
+    Merge nutrition targets, users and preferences into one row per user.
+    Health conditions and motivation come from the preferences file.
+    `user_ids=None` keeps every user.
+    Reads the compiled profile store (see profile_store.compile_profile_store) when
+    it is newer than the three files; otherwise merges the CSVs.
+    """
+    if profile_store_dir:
+        sources = [nutrition_targets_path, default_columnar_path(nutrition_targets_path), users_path, preferences_path]
+        store = open_profile_store(profile_store_dir, sources)
+        if store is not None and 'optimal_calories' in store.fields:
+            profiles = store.frame(user_ids)
+            profiles = profiles[profiles['optimal_calories'].notna()]  # users without targets
+            profiles.insert(0, 'user_id', profiles['id'])
+            return profiles.reset_index(drop=True)
+
+    targets_df = load_nutrition_targets(nutrition_targets_path)
+    users_df = pd.read_csv(users_path, dtype={'id': str})
+    prefs_df = pd.read_csv(preferences_path, dtype={'user_id': str})
+
+    merged_df = pd.merge(targets_df, users_df, left_on='user_id', right_on='id', how='inner')
+    merged_df = pd.merge(merged_df, prefs_df, left_on='user_id', right_on='user_id', how='inner')
+
+    merged_df['health_conditions'] = merged_df['health_conditions_y']
+    merged_df['motivation'] = merged_df['motivation_y']
+    merged_df = merged_df.drop(columns=[
+        'health_conditions_x', 'health_conditions_y',
+        'motivation_x', 'motivation_y'
+    ])
+
+    if user_ids is not None:
+        merged_df = merged_df[merged_df['user_id'].isin(user_ids)]
+    return merged_df.reset_index(drop=True)
+
+def profile_fields(user) -> Dict[str, Any]:
+    """Profile placeholders shared by every prompt template."""
+    return {
+        "age": user.get("age", "Unknown"),
+        "sex": user.get("sex", "Unknown"),
+        "weight_kg": user.get("weight_kg", "Unknown"),
+        "height_cm": user.get("height_cm", "Unknown"),
+        "activity_level": user.get("activity_level", "Unknown"),
+        "exercise_frequency_per_week": user.get("exercise_frequency_per_week", "Unknown"),
+        "health_conditions": user.get("health_conditions", "None"),
+        "goal_type": user.get("goal_type", "Unknown"),
+        "motivation": user.get("motivation", "Unknown"),
+        "dietary_restrictions": user.get("dietary_restrictions", "None"),
+        "preferred_cuisines": user.get("preferred_cuisines", "Any"),
+    }
+
+# ------------------ Modes ------------------
+
+class GenerationMode(ABC):
+    """
+    Strategy for one prompting mode: which prompts are rendered for a user and
+    how the calls are chained. The engine handles retries, parsing and output.
+
+    Args:
+        name (str): Value written to the `mode` column
+        min_meals (int): Valid meals needed for an attempt to count as a success
+        max_attempts (int): Attempts per user before giving up
+    """
+
+    # Chat completions per successful attempt
+    calls_per_plan = 1
+
+    def __init__(self, name: str, min_meals: int = 5, max_attempts: int = 3):
+        self.name = name
+        self.min_meals = min_meals
+        self.max_attempts = max_attempts
+        self._templates: Dict[str, str] = {}
+
+    @property
+    def abort_on_invalid_meal(self) -> bool:
+        """
+        Whether a streamed reply is abandoned at its first invalid meal: only when
+        another attempt follows and a plan missing that meal would be rejected anyway.
+        """
+        return self.max_attempts > 1 and self.min_meals >= MEALS_PER_PLAN
+
+    def template(self, filename: str) -> str:
+        """Prompt template from services/prompts, read once."""
+        if filename not in self._templates:
+            with open(os.path.join(PROMPTS_DIR, filename), 'r') as f:
+                self._templates[filename] = f.read()
+        return self._templates[filename]
+
+    @abstractmethod
+    def generate(self, chat: ChatFn, user) -> str:
+        """Run the mode's calls for `user` and return the meal plan text."""
+
+class SinglePromptMode(GenerationMode):
+    """One meal plan call from a single template (guided, unguided, partial_guided)."""
+
+    def __init__(self, name: str, prompt_file: str,
+                 extra_fields: Optional[Callable[[Any], Dict[str, Any]]] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.prompt_file = prompt_file
+        self.extra_fields = extra_fields
+
+    def render(self, user) -> str:
+        fields = profile_fields(user)
+        if self.extra_fields is not None:
+            fields.update(self.extra_fields(user))
+        return self.template(self.prompt_file).format(**fields)
+
+    def generate(self, chat: ChatFn, user) -> str:
+        return chat(self.render(user), 0.7, 1200)
+
+class AgenticMode(GenerationMode):
+    """A reasoning call estimates nutrition targets, then a meal plan call uses them."""
+
+    reasoning_prompt_file = "agentic_reasoning_prompt.txt"
+    meal_prompt_file = "agentic_meal_prompt.txt"
+    calls_per_plan = 2
+
+    def __init__(self, name: str = "agentic", **kwargs):
+        super().__init__(name, **kwargs)
+
+    def generate(self, chat: ChatFn, user) -> str:
+        fields = profile_fields(user)
+        reasoned_nutrition = chat(self.template(self.reasoning_prompt_file).format(**fields), 0.5, 500,
+                                  output="targets").strip()
+        meal_prompt = self.template(self.meal_prompt_file).format(
+            reasoned_nutrition=reasoned_nutrition,
+            dietary_restrictions=fields["dietary_restrictions"],
+            preferred_cuisines=fields["preferred_cuisines"]
+        )
+        return chat(meal_prompt, 0.7, 1200)
+
+def _guided_fields(user) -> Dict[str, Any]:
+    return {
+        "goal_type": user["goals"],
+        "optimal_calories": user["optimal_calories"],
+        "protein_g": user["protein_g"],
+        "carbs_g": user["carbs_g"],
+        "fat_g": user["fat_g"],
+    }
+
+def _partial_guided_fields(user) -> Dict[str, Any]:
+    return {
+        "optimal_calories": user.get("optimal_calories", 2000),
+        "ibw_kg": user.get("ibw_kg", 65),
+    }
+
+MODES: Dict[str, GenerationMode] = {
+    # Guided keeps whatever meals parse on its single attempt
+    "guided": SinglePromptMode("guided", "guided_prompt.txt", _guided_fields, min_meals=0, max_attempts=1),
+    "unguided": SinglePromptMode("unguided", "unguided_prompt.txt"),
+    "partial_guided": SinglePromptMode("partial_guided", "partial_guided_prompt.txt", _partial_guided_fields),
+    "agentic": AgenticMode(),
+}
+
+DEFAULT_OUTPUTS = {mode: f"llm_test_data/outputs_{mode}.csv" for mode in MODES}
+
+def get_mode(mode) -> GenerationMode:
+    """Look up a mode by name; GenerationMode instances pass through."""
+    if isinstance(mode, GenerationMode):
+        return mode
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Expected one of: {', '.join(MODES)}.")
+    return MODES[mode]
+
+# ------------------ Engine ------------------
+
+def default_client() -> OpenAI:
+    """OpenAI client configured from the project .env file."""
+    env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
+    load_dotenv(env_path, override=True)
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+class GenerationEngine:
+    """
+    Generates meal plans for many users with a bounded thread pool.
+    Each user is independent and I/O bound on the chat API, so `workers` calls
+    are in flight at once; rows are still written in input order.
+
+    Args:
+        mode (str | GenerationMode): Prompting mode, see MODES
+        client: OpenAI-compatible client (anything with chat.completions.create)
+        workers (int): Concurrent users
+        model (str): Chat model name
+        guardrails (GuardrailsManager): Meal parser/validator
+        response_cache (LLMResponseCache): Reuses replies for identical prompts; retries bypass it
+        rate_limiter (LLMRateLimiter): Paces API calls from all workers within RPM/TPM budgets
+        stream (bool): Stream replies and validate meals as they arrive, abandoning bad replies early
+        structured (bool): Ask for JSON matching meal_schema and validate it with pydantic instead of
+            scraping free text; response_format enforces the schema on models that support it
+    """
+
+    def __init__(self, mode, client=None, workers: int = DEFAULT_WORKERS,
+                 model: str = DEFAULT_MODEL, guardrails: Optional[GuardrailsManager] = None,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 rate_limiter: Optional[LLMRateLimiter] = None,
+                 stream: bool = False, structured: bool = False):
+        self.mode = get_mode(mode)
+        self._client = client
+        self.workers = max(1, workers)
+        self.model = model
+        self.guardrails = guardrails or GuardrailsManager()
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.stream = stream
+        self.structured = structured
+        self.stream_client: Optional[StreamingChatClient] = None
+        self._local = threading.local()
+
+    @property
+    def client(self):
+        """The chat client, created from .env on first use when none was given."""
+        if self._client is None:
+            self._client = default_client()
+        if self.stream and self.stream_client is None:
+            self.stream_client = StreamingChatClient(self._client, self.guardrails,
+                                                     abort_on_invalid=self.mode.abort_on_invalid_meal,
+                                                     check_blocks=not self.structured)
+            self._client = self.stream_client
+        if self.rate_limiter is not None and not isinstance(self._client, RateLimitedClient):
+            self._client = RateLimitedClient(self._client, self.rate_limiter)
+        return self._client
+
+    def structured_prompt(self, prompt: str, output: str = "meal_plan") -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Prompt and response_format for one call; unchanged prompt and None unless structured."""
+        if not self.structured:
+            return prompt, None
+        if output not in OUTPUT_SCHEMAS:
+            raise ValueError(f"Unknown output '{output}'. Expected one of: {', '.join(OUTPUT_SCHEMAS)}.")
+        return prompt + structured_instructions(output), response_format_for(self.model, output)
+
+    def chat(self, prompt: str, temperature: float, max_tokens: int, output: str = "meal_plan") -> str:
+        """Single chat completion; every mode's calls go through here."""
+        prompt, response_format = self.structured_prompt(prompt, output)
+        messages = [{"role": "user", "content": prompt}]
+        client = self.client
+        # Only meal plan replies are made of meal blocks; reasoning replies stream unchecked
+        checking = (self.stream_client.checking_meals(output == "meal_plan")
+                    if self.stream_client is not None else nullcontext())
+        with checking:
+            if self.response_cache is not None:
+                # A retry means the cached reply did not parse, so fetch and store a new one
+                return self.response_cache.complete(client, self.model, messages, temperature, max_tokens,
+                                                    refresh=getattr(self._local, 'retrying', False),
+                                                    response_format=response_format)
+            request = {"model": self.model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+            if response_format is not None:
+                request["response_format"] = response_format
+            response = client.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+    def parse_meals(self, raw_response: str) -> List[Dict[str, Any]]:
+        """Valid meals from a meal plan reply: the JSON plan, or one per blank-line separated block."""
+        if self.structured:
+            return self.guardrails.sanitize_and_validate_structured_output(raw_response)
+        meals = []
+        for meal_text in raw_response.split('\n\n'):
+            parsed_meal = self.guardrails.sanitize_and_validate_output(meal_text)
+            if parsed_meal:
+                meals.append(parsed_meal)
+        return meals
+
+    def to_rows(self, user, meals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [{
+            "user_id": user["user_id"],
+            "mode": self.mode.name,
+            "meal_type": meal.get('meal_type', 'unknown'),
+            "meal_name": meal["meal_name"],
+            "calories": meal["calories"],
+            "protein_g": meal["protein_g"],
+            "carbs_g": meal["carbs_g"],
+            "fats_g": meal["fats_g"],
+            "rationale": meal["rationale"]
+        } for meal in meals]
+
+    def generate_for_user(self, user) -> Optional[List[Dict[str, Any]]]:
+        """
+        Output rows for one user, retrying until enough meals parse.
+
+        Returns:
+            List[Dict]: CSV rows, or None if every attempt failed
+        """
+        user_id = user["user_id"]
+        for attempt in range(1, self.mode.max_attempts + 1):
+            self._local.retrying = attempt > 1
+            try:
+                meals = self.parse_meals(self.mode.generate(self.chat, user))
+            except Exception as e:
+                print(f"❌ Error during generation for user {user_id} (attempt {attempt}): {e}")
+                continue
+            if len(meals) >= self.mode.min_meals:
+                print(f"✅ Meals generated for user {user_id} ({self.mode.name})")
+                return self.to_rows(user, meals)
+            print(f"⚠️ Parsing failed for user {user_id}, retrying (attempt {attempt})...")
+
+        print(f"❌ Could not generate valid meals for user {user_id} after {self.mode.max_attempts} attempts")
+        return None
+
+    def iter_results(self, users: Iterable):
+        """
+        Yield (user, rows) in input order while up to `workers` users are generated
+        concurrently. At most two users per worker are queued ahead of the writer.
+        """
+        if isinstance(users, pd.DataFrame):
+            users = (user for _, user in users.iterrows())
+        max_in_flight = 2 * self.workers
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for user in users:
+                pending.append((user, executor.submit(self.generate_for_user, user)))
+                if len(pending) >= max_in_flight:
+                    done_user, future = pending.popleft()
+                    yield done_user, future.result()
+            while pending:
+                done_user, future = pending.popleft()
+                yield done_user, future.result()
+
+    def run(self, users: Iterable, output_path: str) -> Dict[str, int]:
+        """
+        Generate meals for `users` and write them to `output_path`.
+
+        Returns:
+            Dict[str, int]: users, succeeded, failed and rows counts
+        """
+        summary = {'users': 0, 'succeeded': 0, 'failed': 0, 'rows': 0}
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        with open(output_path, 'w', newline='') as output_file:
+            csv_writer = csv.DictWriter(output_file, fieldnames=OUTPUT_FIELDS)
+            csv_writer.writeheader()
+            for _, rows in self.iter_results(users):
+                summary['users'] += 1
+                if rows is None:
+                    summary['failed'] += 1
+                    continue
+                summary['succeeded'] += 1
+                summary['rows'] += len(rows)
+                csv_writer.writerows(rows)
+                output_file.flush()
+        return summary
+
+def run_mode(mode: str, output_path: Optional[str] = None, user_ids: Optional[List[str]] = FIXED_USER_IDS,
+             workers: int = DEFAULT_WORKERS, client=None, cache_mode: Optional[str] = None,
+             rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM, stream: bool = False,
+             structured: bool = False, **load_kwargs) -> Dict[str, int]:
+    """
+    Load users, generate meals for one mode and write its outputs CSV.
+    Replies are cached per `cache_mode` (see response_cache.CACHE_MODES, default $LLM_CACHE_MODE or off)
+    and API calls are paced to `rpm` requests and `tpm` tokens per minute.
+    """
+    response_cache = default_response_cache(cache_mode)
+    engine = GenerationEngine(mode, client=client, workers=workers,
+                              response_cache=None if response_cache.mode == "off" else response_cache,
+                              rate_limiter=LLMRateLimiter(rpm, tpm), stream=stream, structured=structured)
+    output_path = output_path or DEFAULT_OUTPUTS[engine.mode.name]
+    users = load_generation_users(user_ids=user_ids, **load_kwargs)
+    summary = engine.run(users, output_path)
+    print(f"🎯 Completed {engine.mode.name} generation! Results saved to {output_path} ({summary})")
+    if engine.response_cache is not None:
+        print(f"LLM response cache: {engine.response_cache.get_stats()}")
+    print(f"Rate limiter: {engine.rate_limiter.get_stats()}")
+    if engine.stream_client is not None:
+        print(f"Streaming: {engine.stream_client.get_stats()}")
+    return summary
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate meal plans for users in one prompting mode")
+    parser.add_argument("--mode", choices=list(MODES), required=True)
+    parser.add_argument("--output", default=None, help="Defaults to llm_test_data/outputs_<mode>.csv")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--user-ids", nargs="*", default=FIXED_USER_IDS)
+    parser.add_argument("--all-users", action="store_true", help="Generate for every user, not the fixed sample")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default=None,
+                        help="LLM response cache mode (default $LLM_CACHE_MODE or off)")
+    parser.add_argument("--rpm", type=float, default=float(os.getenv("LLM_RPM", DEFAULT_RPM)),
+                        help="Requests per minute allowed for the model")
+    parser.add_argument("--tpm", type=float, default=float(os.getenv("LLM_TPM", DEFAULT_TPM)),
+                        help="Tokens per minute allowed for the model")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream replies, validating each meal as it arrives and retrying bad replies early")
+    parser.add_argument("--structured", action="store_true",
+                        help="Request JSON meal plans and validate them against the pydantic schema")
+    parser.add_argument("--targets", default=NUTRITION_TARGETS_PATH)
+    parser.add_argument("--users", default=USERS_PATH)
+    parser.add_argument("--preferences", default=PREFERENCES_PATH)
+    parser.add_argument("--profile-store", default=PROFILE_STORE_DIR,
+                        help="Compiled profile store read instead of the CSVs when up to date ('' to disable)")
+    args = parser.parse_args()
+
+    run_mode(args.mode, args.output, user_ids=None if args.all_users else args.user_ids,
+             workers=args.workers, cache_mode=args.cache_mode,
+             rpm=args.rpm, tpm=args.tpm, stream=args.stream, structured=args.structured,
+             nutrition_targets_path=args.targets,
+             users_path=args.users, preferences_path=args.preferences,
+             profile_store_dir=args.profile_store)
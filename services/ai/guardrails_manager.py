@@ -1,8 +1,15 @@
 # services/ai/guardrails_manager.py
 
+import os
 import re
+import sys
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.ai.meal_schema import parse_meal_plan_json
 
 class GuardrailsManager:
     """
@@ -121,3 +128,17 @@ class GuardrailsManager:
             self.logger.error(f"Error parsing LLM output: {e}")
             return {}
 
+    def sanitize_and_validate_structured_output(self, raw_response: str) -> List[Dict[str, Any]]:
+        """
+        Validated meals from a JSON meal plan reply (see meal_schema.MealPlan).
+        Meals failing the schema are dropped instead of getting fallback macros.
+        """
+        meals = parse_meal_plan_json(raw_response)
+        if not meals:
+            self.logger.warning("Invalid structured meal plan. Skipping.")
+        # Redact after parsing so patterns cannot swallow JSON quotes
+        for meal in meals:
+            for field in ("meal_name", "ingredients", "rationale"):
+                meal[field] = self.sanitize_text(meal[field])
+        return meals
+
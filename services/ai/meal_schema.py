@@ -0,0 +1,143 @@
+# services/ai/meal_schema.py
+
+import json
+from typing import Annotated, Any, Dict, List, Literal, Optional, Type
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, ValidationError
+
+MealType = Literal["breakfast", "morning_snack", "lunch", "evening_snack", "dinner"]
+
+
+def _non_negative(value: float) -> float:
+    if value < 0:
+        raise ValueError("must not be negative")
+    return value
+
+
+def _not_blank(value: str) -> str:
+    if not value.strip():
+        raise ValueError("must not be blank")
+    return value
+
+
+# Checked after parsing rather than as schema "minimum"/"minLength", which strict response formats reject
+Amount = Annotated[float, AfterValidator(_non_negative)]
+Name = Annotated[str, AfterValidator(_not_blank)]
+
+
+class Macros(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+    calories: Amount = Field(description="kcal")
+    protein_g: Amount
+    carbs_g: Amount
+    fats_g: Amount
+
+
+class Meal(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+    meal_type: MealType
+    meal_name: Name
+    ingredients: List[str] = Field(description="Each ingredient with its portion, e.g. '150 g chicken breast'")
+    macros: Macros
+    rationale: str = Field(description="One or two sentences")
+
+
+class MealPlan(BaseModel):
+    """Structured reply for every meal plan template."""
+    model_config = ConfigDict(extra='forbid')
+
+    meals: List[Meal]
+
+
+class NutritionTargets(BaseModel):
+    """Structured reply for agentic_reasoning_prompt.txt."""
+    model_config = ConfigDict(extra='forbid')
+
+    reasoning: str
+    calories: Amount
+    protein_g: Amount
+    carbs_g: Amount
+    fats_g: Amount
+
+
+# Output kinds requested by the generation modes
+OUTPUT_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    "meal_plan": MealPlan,
+    "targets": NutritionTargets,
+}
+
+# Models that accept response_format json_schema (strict) or only json_object; others get neither
+JSON_SCHEMA_MODEL_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+JSON_OBJECT_MODEL_PREFIXES = ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+
+_INSTRUCTIONS = {}
+
+
+def structured_instructions(output: str = "meal_plan") -> str:
+    """Prompt suffix asking for JSON matching the output kind's schema."""
+    if output not in _INSTRUCTIONS:
+        schema = json.dumps(OUTPUT_SCHEMAS[output].model_json_schema(), separators=(",", ":"))
+        _INSTRUCTIONS[output] = (
+            "\n\nIgnore any formatting instructions above. Respond with only a JSON object, "
+            "no markdown, matching this JSON schema:\n" + schema
+        )
+    return _INSTRUCTIONS[output]
+
+
+def response_format_for(model: str, output: str = "meal_plan") -> Optional[Dict[str, Any]]:
+    """response_format request parameter enforcing the schema where the model supports it."""
+    if model.startswith(JSON_SCHEMA_MODEL_PREFIXES):
+        return {"type": "json_schema", "json_schema": {
+            "name": output, "strict": True, "schema": OUTPUT_SCHEMAS[output].model_json_schema()}}
+    if model.startswith(JSON_OBJECT_MODEL_PREFIXES):
+        return {"type": "json_object"}
+    return None
+
+
+def _strip_code_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+
+def _meal_dict(meal: Meal) -> Dict[str, Any]:
+    return {
+        "meal_type": meal.meal_type,
+        "meal_name": meal.meal_name,
+        "ingredients": ", ".join(meal.ingredients),
+        "calories": meal.macros.calories,
+        "protein_g": meal.macros.protein_g,
+        "carbs_g": meal.macros.carbs_g,
+        "fats_g": meal.macros.fats_g,
+        "rationale": meal.rationale,
+    }
+
+
+def parse_meal_plan_json(raw_response: str) -> List[Dict[str, Any]]:
+    """
+    Meals from a structured reply, in the same dict shape as
+    GuardrailsManager.sanitize_and_validate_output. The whole reply is validated
+    in one pass; if that fails, meals that validate on their own are kept.
+    There are no fallback macros: a meal either validates or is dropped.
+    """
+    text = _strip_code_fence(raw_response or "")
+    try:
+        return [_meal_dict(meal) for meal in MealPlan.model_validate_json(text).meals]
+    except ValidationError:
+        pass
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return []
+    meals = data.get("meals") if isinstance(data, dict) else data
+    valid = []
+    for item in meals if isinstance(meals, list) else []:
+        try:
+            valid.append(_meal_dict(Meal.model_validate(item)))
+        except ValidationError:
+            continue
+    return valid
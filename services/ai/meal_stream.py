@@ -0,0 +1,160 @@
+# services/ai/meal_stream.py
+
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.ai.guardrails_manager import GuardrailsManager
+
+# Blocks mentioning these are meal attempts; anything else (preamble, bare headings) is skipped
+MEAL_MARKERS = ("meal name", "macros")
+
+
+class InvalidMealBlock(Exception):
+    """A streamed meal block failed validation and the stream was abandoned."""
+
+    def __init__(self, block: str):
+        super().__init__(f"Invalid meal block: {block[:80]!r}")
+        self.block = block
+
+
+class IncrementalMealParser:
+    """
+    Splits a streamed meal plan into the same blank-line separated blocks as
+    `raw_response.split('\\n\\n')`, yielding each block as soon as it is complete.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text: str) -> Iterator[str]:
+        """Add streamed text; yields blocks completed by it."""
+        self._buffer += text
+        while True:
+            end = self._buffer.find('\n\n')
+            if end < 0:
+                return
+            block, self._buffer = self._buffer[:end], self._buffer[end + 2:]
+            yield block
+
+    def finish(self) -> Iterator[str]:
+        """The final block once the stream has ended."""
+        block, self._buffer = self._buffer, ""
+        yield block
+
+
+def is_meal_attempt(block: str) -> bool:
+    lowered = block.lower()
+    return any(marker in lowered for marker in MEAL_MARKERS)
+
+
+class StreamingChatClient:
+    """
+    Wraps an OpenAI-compatible client so chat.completions.create streams the
+    reply and checks each meal block with GuardrailsManager as it completes.
+    A block that looks like a meal but fails validation closes the stream and
+    raises InvalidMealBlock, so the caller can retry without waiting for (or
+    paying for) the rest of a bad reply. Complete replies are returned in the
+    usual non-streaming response shape.
+
+    Args:
+        client: OpenAI-compatible client supporting stream=True
+        guardrails (GuardrailsManager): Meal validator
+        on_meal (Callable): Called with each valid parsed meal as it arrives
+        abort_on_invalid (bool): Stop at the first invalid meal block
+        check_blocks (bool): Validate text meal blocks; off for JSON replies, which are validated whole
+    """
+
+    def __init__(self, client, guardrails: Optional[GuardrailsManager] = None,
+                 on_meal: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 abort_on_invalid: bool = True, check_blocks: bool = True):
+        self.client = client
+        self.guardrails = guardrails or GuardrailsManager()
+        self.on_meal = on_meal
+        self.abort_on_invalid = abort_on_invalid
+        self.check_blocks = check_blocks
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'streams': 0, 'aborted': 0, 'meals': 0, 'chars_received': 0,
+                      'streams_with_meals': 0, 'first_meal_seconds': 0.0, 'total_seconds': 0.0}
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+    @contextmanager
+    def checking_meals(self, enabled: bool):
+        """Validate meal blocks only for calls made in this block (this thread) when `enabled`."""
+        previous = getattr(self._local, 'check', True)
+        self._local.check = enabled
+        try:
+            yield
+        finally:
+            self._local.check = previous
+
+    def _check(self, block: str, started: float, first_meal: List[float]):
+        if not (self.check_blocks and getattr(self._local, 'check', True)) or not is_meal_attempt(block):
+            return
+        parsed_meal = self.guardrails.sanitize_and_validate_output(block)
+        if not parsed_meal:
+            if self.abort_on_invalid:
+                raise InvalidMealBlock(block)
+            return
+        if not first_meal:
+            first_meal.append(time.perf_counter() - started)
+        self._count(meals=1)
+        if self.on_meal is not None:
+            self.on_meal(parsed_meal)
+
+    def create(self, **request):
+        request = dict(request, stream=True, stream_options={"include_usage": True})
+        started = time.perf_counter()
+        stream = self.client.chat.completions.create(**request)
+        parser = IncrementalMealParser()
+        parts, first_meal, usage = [], [], None
+        self._count(streams=1)
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content or ""
+                parts.append(text)
+                for block in parser.feed(text):
+                    self._check(block, started, first_meal)
+            for block in parser.finish():
+                self._check(block, started, first_meal)
+        except InvalidMealBlock:
+            self._count(aborted=1)
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            self._count(chars_received=sum(len(part) for part in parts),
+                        total_seconds=time.perf_counter() - started)
+            if first_meal:
+                self._count(streams_with_meals=1, first_meal_seconds=first_meal[0])
+
+        message = SimpleNamespace(role="assistant", content="".join(parts))
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], usage=usage)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Counters plus mean seconds to the first valid meal and to the end of each stream."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['mean_first_meal_seconds'] = stats.pop('first_meal_seconds') / max(stats['streams_with_meals'], 1)
+        stats['mean_stream_seconds'] = stats.pop('total_seconds') / max(stats['streams'], 1)
+        return stats
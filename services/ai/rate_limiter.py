@@ -0,0 +1,210 @@
+# services/ai/rate_limiter.py
+
+import os
+import re
+import time
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Mapping, Optional
+
+# Budgets used when none are given (OpenAI usage tier 1 for gpt-4)
+DEFAULT_RPM = 500
+DEFAULT_TPM = 10_000
+# Completion budget assumed for requests without max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+# Rough English average for GPT tokenizers, plus per-message framing
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+DEFAULT_COOLDOWN_SECONDS = 1.0
+MAX_RATE_LIMIT_RETRIES = 6
+
+sleep = time.sleep
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate prompt tokens for `text` without a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_request_tokens(request: Mapping[str, Any]) -> int:
+    """Tokens a chat completion request can consume: its messages plus max_tokens."""
+    prompt = sum(estimate_tokens(message.get("content") or "") + TOKENS_PER_MESSAGE
+                 for message in request.get("messages", []))
+    return prompt + (request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from rate-limit reset headers such as "1s", "6m0s", "120ms" or "0.5"."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class _Budget:
+    """Per-minute allowance refilled continuously."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.per_minute = float(per_minute)
+        self.level = self.per_minute
+        self.updated_at = now
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+    def refill(self, now: float):
+        self.level = min(self.per_minute, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        # A single request larger than the whole budget waits for a full bucket
+        deficit = min(amount, self.per_minute) - self.level
+        return max(0.0, deficit / self.rate)
+
+
+class LLMRateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute budgets for chat completions.
+    Callers reserve the request's estimated tokens before sending; the estimate is
+    corrected with the reported usage afterwards. x-ratelimit-* response headers
+    lower the local budgets to what the server reports, and a 429 pauses every
+    caller until its retry-after/reset time. Waiters are served in arrival order.
+
+    Args:
+        rpm (float): Requests per minute
+        tpm (float): Tokens per minute (prompt + completion)
+    """
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 clock: Callable[[], float] = time.monotonic):
+        if rpm <= 0 or tpm <= 0:
+            raise ValueError("rpm and tpm must be positive")
+        self.clock = clock
+        now = clock()
+        self.requests = _Budget(rpm, now)
+        self.tokens = _Budget(tpm, now)
+        self.cooldown_until = now
+        self._lock = threading.Lock()
+        self._turn = threading.Lock()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'waited_seconds': 0.0,
+                      'tokens_reserved': 0, 'tokens_used': 0}
+
+    def acquire(self, tokens: int) -> int:
+        """Block until one request and `tokens` fit in the budgets, then take them."""
+        with self._turn:
+            while True:
+                with self._lock:
+                    now = self.clock()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    wait = max(self.cooldown_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.level -= 1
+                        self.tokens.level -= tokens
+                        self.stats['requests'] += 1
+                        self.stats['tokens_reserved'] += tokens
+                        return tokens
+                    self.stats['waited_seconds'] += wait
+                sleep(wait)
+
+    def record_usage(self, reserved: int, used: Optional[int]):
+        """Return unused reserved tokens to the budget, or charge the overrun."""
+        if used is None:
+            return
+        with self._lock:
+            self.tokens.level = min(self.tokens.per_minute, self.tokens.level + reserved - used)
+            self.stats['tokens_used'] += used
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]):
+        """Adopt the server's limits and never assume more remaining than it reports."""
+        if not headers:
+            return
+        with self._lock:
+            for kind, budget in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    if limit is not None and float(limit) > 0:
+                        budget.per_minute = float(limit)
+                    if remaining is not None:
+                        budget.level = min(budget.level, float(remaining))
+                except ValueError:
+                    continue
+
+    def on_rate_limited(self, headers: Optional[Mapping[str, str]] = None):
+        """A 429 came back: pause all callers until the server says budgets are refilled."""
+        headers = headers or {}
+        delays = [parse_duration(headers.get("retry-after"))]
+        retry_after_ms = headers.get("retry-after-ms")
+        delays.append(float(retry_after_ms) / 1000 if retry_after_ms else None)
+        delays += [parse_duration(headers.get(f"x-ratelimit-reset-{kind}")) for kind in ("requests", "tokens")]
+        delay = max([d for d in delays if d is not None] or [DEFAULT_COOLDOWN_SECONDS])
+        with self._lock:
+            now = self.clock()
+            self.cooldown_until = max(self.cooldown_until, now + delay)
+            self.requests.level = min(self.requests.level, 0.0)
+            self.stats['rate_limited'] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.stats)
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+class RateLimitedClient:
+    """
+    Wraps an OpenAI-compatible client so chat.completions.create goes through a
+    shared LLMRateLimiter. 429s are retried after the limiter's cooldown and do
+    not reach the caller unless they persist.
+    """
+
+    def __init__(self, client, limiter: LLMRateLimiter, max_rate_limit_retries: int = MAX_RATE_LIMIT_RETRIES):
+        self.client = client
+        self.limiter = limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def __getattr__(self, name):
+        # files, batches, ... pass through unthrottled
+        return getattr(self.client, name)
+
+    def create(self, **request):
+        completions = self.client.chat.completions
+        raw_create = getattr(getattr(completions, "with_raw_response", None), "create", None)
+        for attempt in range(self.max_rate_limit_retries + 1):
+            reserved = self.limiter.acquire(estimate_request_tokens(request))
+            try:
+                if raw_create is not None:
+                    raw = raw_create(**request)
+                    headers, response = raw.headers, raw.parse()
+                else:
+                    headers, response = None, completions.create(**request)
+            except Exception as e:
+                if not _is_rate_limit_error(e) or attempt == self.max_rate_limit_retries:
+                    raise
+                response_headers = getattr(getattr(e, "response", None), "headers", None)
+                self.limiter.on_rate_limited(response_headers)
+                continue
+            self.limiter.update_from_headers(headers)
+            usage = getattr(response, "usage", None)
+            self.limiter.record_usage(reserved, getattr(usage, "total_tokens", None))
+            return response
+
+
+def default_rate_limiter() -> LLMRateLimiter:
+    """Limiter with budgets from $LLM_RPM and $LLM_TPM."""
+    return LLMRateLimiter(float(os.getenv("LLM_RPM", DEFAULT_RPM)), float(os.getenv("LLM_TPM", DEFAULT_TPM)))
@@ -0,0 +1,144 @@
+# services/ai/response_cache.py
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.singleflight import SingleFlight
+from services.usda_nutrition.usda_cache import CacheBackend, MemoryCache, SQLiteCache
+
+DEFAULT_LLM_CACHE_PATH = "data/llm_cache.db"
+DEFAULT_LLM_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_SEED = 42
+# Caching is opt-in: reusing sampled replies changes what a run produces
+DEFAULT_CACHE_MODE = "off"
+
+# off: always call the API
+# replay: reuse any cached reply for the same model, temperature and prompt
+# deterministic: send temperature 0 and a fixed seed, then cache like replay
+# refresh: always call the API and overwrite the cached reply
+CACHE_MODES = ("off", "replay", "deterministic", "refresh")
+
+
+def normalize_prompt(text: str) -> str:
+    """Prompt text with trailing whitespace and blank edges removed, so template whitespace does not split keys."""
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def response_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: Optional[int] = None) -> str:
+    """Content address of a chat completion request."""
+    payload = json.dumps({
+        "model": model,
+        "temperature": round(float(temperature), 4),
+        "max_tokens": max_tokens,
+        "messages": [[message["role"], normalize_prompt(message["content"])] for message in messages],
+    }, sort_keys=True, ensure_ascii=False)
+    return "llm_" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache of chat completion replies, keyed by a hash of the
+    model, temperature, max_tokens and rendered messages. Entries live in any
+    usda_cache backend (SQLite by default) and expire after `ttl` seconds.
+    Concurrent identical requests share one API call.
+
+    Args:
+        backend (CacheBackend): Where replies are stored
+        mode (str): One of CACHE_MODES
+        ttl (float): Seconds a reply stays valid
+        seed (int): Seed sent in deterministic mode
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, mode: str = "replay",
+                 ttl: float = DEFAULT_LLM_TTL_SECONDS, seed: int = DEFAULT_SEED):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}'. Expected one of: {', '.join(CACHE_MODES)}.")
+        self.backend = backend if backend is not None else MemoryCache(ttl=ttl)
+        self.mode = mode
+        self.ttl = ttl
+        self.seed = seed
+        self._inflight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self.stats = {'api_calls': 0, 'hits': 0, 'misses': 0}
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def complete(self, client, model: str, messages: List[Dict[str, str]], temperature: float,
+                 max_tokens: Optional[int] = None, refresh: bool = False,
+                 validate: Optional[Callable[[str], bool]] = None,
+                 response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Reply text for a chat completion, from the cache when possible.
+
+        Args:
+            client: OpenAI-compatible client
+            refresh (bool): Skip the cached reply for this call and overwrite it
+            validate (Callable): Replies failing this check are returned but not cached
+            response_format (Dict): Sent with the request but not keyed; callers derive it from the model and prompt
+
+        Returns:
+            str: The assistant message content
+        """
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        if response_format is not None:
+            request["response_format"] = response_format
+        if self.mode == "off":
+            return self._call(client, request)
+        if self.mode == "deterministic":
+            request["temperature"] = 0
+            request["seed"] = self.seed
+
+        key = response_key(model, messages, request["temperature"], max_tokens)
+        if not refresh and self.mode != "refresh":
+            cached = self.backend.get(key)
+            if cached is not None:
+                self._count('hits')
+                return cached
+        self._count('misses')
+        return self._inflight.do(key, self._fetch, client, request, key, validate)
+
+    def _call(self, client, request: Dict[str, Any]) -> str:
+        self._count('api_calls')
+        response = client.chat.completions.create(**request)
+        return response.choices[0].message.content
+
+    def _fetch(self, client, request: Dict[str, Any], key: str, validate: Optional[Callable[[str], bool]]) -> str:
+        content = self._call(client, request)
+        if content and (validate is None or validate(content)):
+            self.backend.set(key, content, ttl=self.ttl)
+        return content
+
+    def get_stats(self) -> Dict[str, Any]:
+        """API calls made, cache hits/misses, and hit_rate over cacheable requests."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['coalesced'] = self._inflight.get_stats()['coalesced']
+        return stats
+
+
+def default_response_cache(mode: Optional[str] = None) -> LLMResponseCache:
+    """
+    SQLite-backed cache at $LLM_CACHE_PATH (default data/llm_cache.db), in `mode`
+    or $LLM_CACHE_MODE (default off), with TTL $LLM_CACHE_TTL seconds.
+    In off mode nothing is opened on disk.
+    """
+    mode = mode or os.getenv("LLM_CACHE_MODE", DEFAULT_CACHE_MODE)
+    if mode == "off":
+        return LLMResponseCache(mode="off")
+    ttl = float(os.getenv("LLM_CACHE_TTL", DEFAULT_LLM_TTL_SECONDS))
+    backend = SQLiteCache(os.getenv("LLM_CACHE_PATH", DEFAULT_LLM_CACHE_PATH), ttl=ttl)
+    return LLMResponseCache(backend, mode=mode, ttl=ttl)
@@ -1,12 +1,21 @@
 # services/nutrition_calculation/calculations.py
 
 import os
+import sys
 import csv
 import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
-import ast
+import numbers
+from functools import lru_cache
+from types import MappingProxyType
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.nutrition_calculation.parsers import parse_list_literal
+from services.nutrition_calculation.columnar import default_columnar_path, write_columnar_targets
 
 # ------------------ Logger Setup ------------------
 logging.basicConfig(level=logging.INFO)
@@ -41,6 +50,42 @@ MACRO_STRATEGIES = {
 # Default fallback macros if no specific condition or goal applies
 DEFAULT_MACROS = {'protein': 0.30, 'carbs': 0.45, 'fat': 0.25}
 
+# ------------------ Precomputed Strategy Lookup ------------------
+
+# Strategy codes: 0 = no matching strategy, i + 1 = STRATEGY_KEYS[i]
+STRATEGY_KEYS = tuple(MACRO_STRATEGIES)
+_STRATEGY_CODES = {key: code for code, key in enumerate(STRATEGY_KEYS, start=1)}
+
+# Calorie classes implied by goals, and their multipliers
+CALORIE_MAINTAIN, CALORIE_DEFICIT, CALORIE_SURPLUS = 0, 1, 2
+_CALORIE_CLASS_MULTIPLIERS = (1.0, 0.85, 1.15)  # maintain, 15% deficit, 15% surplus
+N_CALORIE_CLASSES = len(_CALORIE_CLASS_MULTIPLIERS)
+
+# Condition code = strategy code of the first condition with a strategy.
+# Goal code = strategy code of the first goal with a strategy * N_CALORIE_CLASSES + calorie class.
+N_CONDITION_CODES = len(STRATEGY_KEYS) + 1
+N_GOAL_CODES = N_CONDITION_CODES * N_CALORIE_CLASSES
+
+def _build_strategy_lookup():
+    """Read-only macro split per (condition code, goal code) plus calorie multiplier per goal code."""
+    splits = [MappingProxyType(dict(DEFAULT_MACROS))]
+    splits += [MappingProxyType(dict(MACRO_STRATEGIES[key])) for key in STRATEGY_KEYS]
+
+    views = tuple(
+        tuple(splits[cond_code] if cond_code else splits[goal_code // N_CALORIE_CLASSES]
+              for goal_code in range(N_GOAL_CODES))
+        for cond_code in range(N_CONDITION_CODES)
+    )
+    table = np.array([[[v['protein'], v['carbs'], v['fat']] for v in row] for row in views])
+    multipliers = np.array([_CALORIE_CLASS_MULTIPLIERS[g % N_CALORIE_CLASSES] for g in range(N_GOAL_CODES)])
+    table.flags.writeable = False
+    multipliers.flags.writeable = False
+    return views, table, multipliers
+
+# MACRO_SPLIT_VIEWS[c][g] -> mapping, MACRO_SPLIT_TABLE[c, g] -> [protein, carbs, fat],
+# GOAL_CALORIE_MULTIPLIERS[g] -> multiplier; the arrays support NumPy gathers on code arrays
+MACRO_SPLIT_VIEWS, MACRO_SPLIT_TABLE, GOAL_CALORIE_MULTIPLIERS = _build_strategy_lookup()
+
 # ------------------ Core Calculation Functions ------------------
 
 def mifflin_st_jeor(sex, weight_kg, height_cm, age):
@@ -83,30 +128,51 @@ def get_activity_multiplier(activity_level):
     """Fetch activity multiplier or default to 'Moderately Active'"""
     return ACTIVITY_MULTIPLIERS.get(activity_level, 1.55)
 
+def _first_strategy_code(values):
+    for value in values:
+        code = _STRATEGY_CODES.get(value.lower())
+        if code:
+            return code
+    return 0
+
+@lru_cache(maxsize=4096)
+def _encode_conditions_cached(health_conditions):
+    return _first_strategy_code(health_conditions)
+
+@lru_cache(maxsize=4096)
+def _encode_goals_cached(goals):
+    lowered = [g.lower() for g in goals]
+    if 'lose_weight' in lowered:
+        calorie_class = CALORIE_DEFICIT
+    elif 'gain_weight' in lowered or 'muscle_gain' in lowered:
+        calorie_class = CALORIE_SURPLUS
+    else:
+        calorie_class = CALORIE_MAINTAIN
+    return _first_strategy_code(goals) * N_CALORIE_CLASSES + calorie_class
+
+def encode_conditions(health_conditions):
+    """Condition code for a list of health conditions (see MACRO_SPLIT_TABLE)"""
+    return _encode_conditions_cached(tuple(health_conditions))
+
+def encode_goals(goals):
+    """Goal code for a list of goals (see MACRO_SPLIT_TABLE and GOAL_CALORIE_MULTIPLIERS)"""
+    return _encode_goals_cached(tuple(goals))
+
+def goal_calorie_multiplier(goals):
+    """Calorie multiplier implied by goals"""
+    return _CALORIE_CLASS_MULTIPLIERS[encode_goals(goals) % N_CALORIE_CLASSES]
+
 def adjust_calories_for_goal(tdee, goals):
     """Apply adjustment based on goals"""
-    goals = [g.lower() for g in goals]
-    if 'lose_weight' in goals:
-        return tdee * 0.85  # 15% deficit
-    elif 'gain_weight' in goals or 'muscle_gain' in goals:
-        return tdee * 1.15  # 15% surplus
-    else:
-        return tdee  # Maintain calories
+    return tdee * goal_calorie_multiplier(goals)
 
 def select_macro_split(health_conditions, goals):
     """
     Select macronutrient distribution based on user's health conditions and goals.
     Priority: Health condition first, then goals, else default.
+    Returns a read-only mapping from the precomputed lookup.
     """
-    for cond in health_conditions:
-        cond_key = cond.lower()
-        if cond_key in MACRO_STRATEGIES:
-            return MACRO_STRATEGIES[cond_key]
-    for goal in goals:
-        goal_key = goal.lower()
-        if goal_key in MACRO_STRATEGIES:
-            return MACRO_STRATEGIES[goal_key]
-    return DEFAULT_MACROS
+    return MACRO_SPLIT_VIEWS[encode_conditions(health_conditions)][encode_goals(goals)]
 
 def calculate_macronutrients(calories, macro_split):
     """Calculate macronutrients in grams from calories"""
@@ -132,6 +198,10 @@ def estimate_body_fat(sex):
     """Default body fat estimate if not provided"""
     return DEFAULT_BODY_FAT_MALE if sex.lower() == 'male' else DEFAULT_BODY_FAT_FEMALE
 
+def parse_list_field(raw_value):
+    """Parse a stringified list (or bare value) from the preferences file into a list"""
+    return parse_list_literal(raw_value)
+
 # ------------------ Main Processing Functions ------------------
 
 def process_user_row(user_row, pref_row):
@@ -163,19 +233,8 @@ def process_user_row(user_row, pref_row):
         health_conditions_raw = pref_row.get('health_conditions', '[]')
         goal_type_raw = pref_row.get('goal_type', '[]')
 
-        try:
-            health_conditions = ast.literal_eval(health_conditions_raw)
-            if not isinstance(health_conditions, list):
-                health_conditions = [str(health_conditions)]
-        except Exception:
-            health_conditions = [str(health_conditions_raw)]
-
-        try:
-            goals = ast.literal_eval(goal_type_raw)
-            if not isinstance(goals, list):
-                goals = [str(goals)]
-        except Exception:
-            goals = [str(goal_type_raw)]
+        health_conditions = parse_list_field(health_conditions_raw)
+        goals = parse_list_field(goal_type_raw)
 
         # Body fat estimate if missing
         body_fat_percent = user_row.get('body_fat_percent')
@@ -206,31 +265,236 @@ def process_user_row(user_row, pref_row):
         logger.error(f"Error processing user {user_row.get('id', 'unknown')}: {e}")
         return None
 
-def generate_nutrition_targets():
+# ------------------ Batch (Columnar) Processing ------------------
+
+# Output columns, in the order produced by process_user_row
+TARGET_COLUMNS = [
+    'user_id', 'optimal_calories', 'protein_g', 'carbs_g', 'fat_g',
+    'ibw_kg', 'health_conditions', 'goals', 'motivation'
+]
+
+_INVALID = object()
+
+def _map_unique(series, func):
     """
-    Main driver function to load user data, compute nutrition targets, and save output.
+    Apply func once per distinct value of series and broadcast the results.
+    func may return _INVALID (or raise) to flag values the per-row path rejects.
+    Returns (values, valid_mask) as NumPy arrays aligned with series.
     """
-    users_path = "data/users.csv"
-    preferences_path = "data/user_preferences.csv"
-    output_path = "data/user_nutrition_targets.csv"
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    ok = np.ones(len(uniques), dtype=bool)
+    for i, value in enumerate(uniques):
+        try:
+            mapped[i] = func(value)
+        except Exception:
+            mapped[i] = _INVALID
+        if mapped[i] is _INVALID:
+            ok[i] = False
+            mapped[i] = None
+    return mapped[codes], ok[codes]
+
+def _float_column(series):
+    """Column converted with float(), as the per-row path does"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float), np.ones(len(series), dtype=bool)
+    values, ok = _map_unique(series, float)
+    return np.where(ok, values, np.nan).astype(float), ok
+
+def _int_column(series):
+    """Column converted with int(), as the per-row path does"""
+    values, ok = _map_unique(series, int)
+    return np.where(ok, values, 0).astype(np.int64), ok
+
+def _age_or_invalid(dob):
+    """Age from a DOB value, flagging values the per-row path would skip"""
+    age = get_age_from_dob(dob) if dob else None
+    return _INVALID if age is None else age
+
+def _body_fat_or_invalid(value):
+    """Provided body fat %, None when it should be estimated"""
+    if not value:
+        return None
+    if not isinstance(value, numbers.Real):
+        return _INVALID
+    return float(value)
+
+def _code_or_invalid(encode, values):
+    """Strategy code for a parsed list, -1 where the per-row path would raise"""
+    try:
+        return encode(values)
+    except Exception:
+        return -1
 
+def _round_like_python(values, ndigits=2):
+    """
+    Vectorized equivalent of the built-in round(value, ndigits).
+    np.round can disagree with round() when the scaled value sits on a .5 boundary,
+    so those few entries are re-rounded with round() itself.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+def compute_nutrition_targets_batch(merged_df):
+    """
+    Columnar equivalent of calling process_user_row(row, row) for every row of
+    the merged users/preferences frame. Produces the same values as the per-row
+    path (which remains the reference implementation) and skips the same users.
+    Categorical fields (sex, conditions, goals, DOB, ...) are evaluated once per
+    distinct value; rows sharing a raw value share the parsed list objects.
+    """
+    required = ['id', 'sex', 'weight_kg', 'height_cm', 'activity_level', 'exercise_frequency_per_week']
+    missing = [col for col in required if col not in merged_df.columns]
+    if missing:
+        logger.error(f"Cannot compute nutrition targets: missing columns {missing}")
+        return pd.DataFrame(columns=TARGET_COLUMNS)
+
+    n = len(merged_df)
+    if n == 0:
+        return pd.DataFrame(columns=TARGET_COLUMNS)
+
+    # Basic user info
+    is_male, sex_ok = _map_unique(
+        merged_df['sex'],
+        lambda s: s.lower() == 'male' if isinstance(s, str) and s else _INVALID
+    )
+    is_male = is_male.astype(bool)
+    weight, weight_ok = _float_column(merged_df['weight_kg'])
+    height, height_ok = _float_column(merged_df['height_cm'])
+    _, exercise_ok = _int_column(merged_df['exercise_frequency_per_week'])
+    activity_mult = merged_df['activity_level'].map(ACTIVITY_MULTIPLIERS).fillna(1.55).to_numpy(dtype=float)
+
+    # Age from DOB or fallback
+    has_dob = np.zeros(n, dtype=bool)
+    age = np.zeros(n, dtype=object)
+    age_ok = np.zeros(n, dtype=bool)
+    if 'date_of_birth' in merged_df.columns:
+        has_dob = _map_unique(merged_df['date_of_birth'], bool)[0].astype(bool)
+        age, age_ok = _map_unique(merged_df['date_of_birth'], _age_or_invalid)
+    if 'age' in merged_df.columns:
+        col_age, col_age_ok = _int_column(merged_df['age'])
+        age = np.where(has_dob, age, col_age)
+        age_ok = np.where(has_dob, age_ok, col_age_ok)
+    age = np.where(age_ok, age, 0).astype(np.int64)
+
+    valid = (
+        sex_ok & weight_ok & height_ok & exercise_ok & age_ok
+        & (weight != 0) & (height != 0) & (age != 0)
+    )
+
+    # Body fat estimate if missing
+    body_fat = np.where(is_male, DEFAULT_BODY_FAT_MALE, DEFAULT_BODY_FAT_FEMALE).astype(float)
+    if 'body_fat_percent' in merged_df.columns:
+        given_bf, bf_ok = _map_unique(merged_df['body_fat_percent'], _body_fat_or_invalid)
+        given = np.not_equal(given_bf, None)
+        body_fat = np.where(given, given_bf, body_fat).astype(float)
+        valid &= bf_ok
+
+    # Health & goals, parsed and encoded once per distinct raw value
+    default_raw = pd.Series('[]', index=merged_df.index)
+    cond_idx, cond_uniques = pd.factorize(merged_df.get('health_conditions', default_raw), use_na_sentinel=False)
+    goal_idx, goal_uniques = pd.factorize(merged_df.get('goal_type', default_raw), use_na_sentinel=False)
+    cond_lists = np.empty(len(cond_uniques), dtype=object)
+    cond_lists[:] = [parse_list_field(v) for v in cond_uniques]
+    goal_lists = np.empty(len(goal_uniques), dtype=object)
+    goal_lists[:] = [parse_list_field(v) for v in goal_uniques]
+    condition_code = np.array([_code_or_invalid(encode_conditions, c) for c in cond_lists], dtype=np.intp)[cond_idx]
+    goal_code = np.array([_code_or_invalid(encode_goals, g) for g in goal_lists], dtype=np.intp)[goal_idx]
+    valid &= (condition_code >= 0) & (goal_code >= 0)
+
+    n_skipped = int(n - valid.sum())
+    if n_skipped:
+        logger.warning(f"Skipping {n_skipped} users: Missing required fields.")
+    df = merged_df[valid]
+    weight, height, age = weight[valid], height[valid], age[valid]
+    is_male, activity_mult, body_fat = is_male[valid], activity_mult[valid], body_fat[valid]
+    condition_code, goal_code = condition_code[valid], goal_code[valid]
+    macro_split = MACRO_SPLIT_TABLE[condition_code, goal_code]
+
+    # Core calculations (same operation order as the scalar functions)
+    base = 10 * weight + 6.25 * height - 5 * age
+    bmr_msj = np.where(is_male, base + 5, base - 161)
+    lean_mass = weight * (1 - body_fat / 100)
+    bmr_kma = 370 + 21.6 * lean_mass
+    bmr = 0.8 * bmr_msj + 0.2 * bmr_kma
+    tdee = bmr * activity_mult
+    optimal_calories = tdee * GOAL_CALORIE_MULTIPLIERS[goal_code]
+
+    height_in = height / 2.54
+    ibw_lbs = np.where(is_male, 106 + 6 * (height_in - 60), 100 + 5 * (height_in - 60))
+    ibw_kg = ibw_lbs / 2.20462
+
+    if 'motivation' in df.columns:
+        motivation = df['motivation'].to_numpy(dtype=object)
+    else:
+        motivation = np.full(len(df), 'Unknown', dtype=object)
+
+    return pd.DataFrame({
+        'user_id': df['id'].to_numpy(),
+        'optimal_calories': _round_like_python(optimal_calories),
+        'protein_g': _round_like_python(optimal_calories * macro_split[:, 0] / 4),
+        'carbs_g': _round_like_python(optimal_calories * macro_split[:, 1] / 4),
+        'fat_g': _round_like_python(optimal_calories * macro_split[:, 2] / 9),
+        'ibw_kg': _round_like_python(ibw_kg),
+        'health_conditions': cond_lists[cond_idx[valid]],
+        'goals': goal_lists[goal_idx[valid]],
+        'motivation': motivation
+    }, columns=TARGET_COLUMNS)
+
+# ------------------ Driver ------------------
+
+def load_merged_inputs(users_path="data/users.csv", preferences_path="data/user_preferences.csv"):
+    """Load users and preferences and inner-join them on user id"""
     users_df = pd.read_csv(users_path)
     prefs_df = pd.read_csv(preferences_path)
+    return pd.merge(users_df, prefs_df, left_on='id', right_on='user_id', how='inner')
 
-    merged_df = pd.merge(users_df, prefs_df, left_on='id', right_on='user_id', how='inner')
-
-    results = []
-    for idx, row in merged_df.iterrows():
-        result = process_user_row(row, row)
-        if result:
-            results.append(result)
+def generate_nutrition_targets(engine="rows",
+                               users_path="data/users.csv",
+                               preferences_path="data/user_preferences.csv",
+                               output_path="data/user_nutrition_targets.csv",
+                               columnar=False):
+    """
+    Main driver function to load user data, compute nutrition targets, and save output.
+    engine: 'rows' runs process_user_row per user, 'batch' uses the columnar engine.
+    columnar: also write a typed .npz copy next to output_path, where
+    columnar.load_nutrition_targets looks for it.
+    """
+    merged_df = load_merged_inputs(users_path, preferences_path)
+
+    if engine == "batch":
+        output_df = compute_nutrition_targets_batch(merged_df)
+    elif engine == "rows":
+        results = []
+        for idx, row in merged_df.iterrows():
+            result = process_user_row(row, row)
+            if result:
+                results.append(result)
+        output_df = pd.DataFrame(results, columns=TARGET_COLUMNS)
+    else:
+        raise ValueError(f"Unknown engine '{engine}'. Expected 'rows' or 'batch'.")
 
-    # output_df = pd.DataFrame(results)
-    # output_df.to_csv(output_path, index=False)
+    output_df.to_csv(output_path, index=False)
+    # Written after the CSV so the loader sees a copy at least as new as it
+    if columnar:
+        write_columnar_targets(output_df, default_columnar_path(output_path))
 
-    logger.info(f"✅ Saved nutrition targets for {len(results)} users to {output_path}")
+    logger.info(f"✅ Saved nutrition targets for {len(output_df)} users to {output_path}")
 
 # ------------------ Entrypoint ------------------
 
 if __name__ == "__main__":
-    generate_nutrition_targets()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate user nutrition targets")
+    parser.add_argument("--engine", choices=["rows", "batch"], default="rows")
+    parser.add_argument("--output", default="data/user_nutrition_targets.csv")
+    parser.add_argument("--columnar", action="store_true", help="Also write a typed .npz copy next to the CSV")
+    args = parser.parse_args()
+
+    generate_nutrition_targets(engine=args.engine, output_path=args.output, columnar=args.columnar)
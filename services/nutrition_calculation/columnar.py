@@ -0,0 +1,86 @@
+# services/nutrition_calculation/columnar.py
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+# ------------------ Logger Setup ------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------ Constants ------------------
+
+FORMAT_VERSION = 1
+
+NUMERIC_COLUMNS = ['optimal_calories', 'protein_g', 'carbs_g', 'fat_g', 'ibw_kg']
+
+# Low-cardinality text columns, stored dictionary-encoded (int32 codes + categories)
+CATEGORICAL_COLUMNS = ['health_conditions', 'goals', 'motivation']
+
+COLUMN_ORDER = ['user_id'] + NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+
+# ------------------ Columnar Format ------------------
+
+def default_columnar_path(csv_path):
+    """Columnar copy lives next to the CSV, e.g. data/user_nutrition_targets.npz"""
+    return os.path.splitext(csv_path)[0] + ".npz"
+
+def write_columnar_targets(targets_df, path):
+    """
+    Write nutrition targets as an uncompressed NumPy .npz archive.
+    user_id is stored as text, numeric columns as float64, and list/text columns
+    as int32 codes into a table of their CSV text (e.g. "['none']").
+    No pickled objects are stored, so the file loads with allow_pickle=False.
+    """
+    arrays = {
+        'format_version': np.array([FORMAT_VERSION], dtype=np.int32),
+        'user_id': targets_df['user_id'].astype(str).to_numpy(dtype=str),
+    }
+    for col in NUMERIC_COLUMNS:
+        arrays[col] = targets_df[col].to_numpy(dtype=np.float64)
+    for col in CATEGORICAL_COLUMNS:
+        series = targets_df[col]
+        as_text = series.astype(str).where(series.notna())
+        codes, categories = pd.factorize(as_text)
+        arrays[f"{col}.codes"] = codes.astype(np.int32)
+        arrays[f"{col}.categories"] = np.asarray(categories, dtype=str)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    logger.info(f"✅ Saved columnar nutrition targets for {len(targets_df)} users to {path}")
+
+def read_columnar_targets(path):
+    """
+    Load a file written by write_columnar_targets.
+    Text columns come back as pandas Categoricals built directly from the stored
+    codes, with the same values pd.read_csv(..., dtype={'user_id': str}) gives.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        version = int(archive['format_version'][0])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar targets format version {version} in {path}")
+
+        columns = {'user_id': archive['user_id'].astype(object)}
+        for col in NUMERIC_COLUMNS:
+            columns[col] = archive[col]
+        for col in CATEGORICAL_COLUMNS:
+            columns[col] = pd.Categorical.from_codes(archive[f"{col}.codes"],
+                                                     categories=archive[f"{col}.categories"].astype(object))
+    return pd.DataFrame(columns, columns=COLUMN_ORDER)
+
+def load_nutrition_targets(csv_path="data/user_nutrition_targets.csv", columnar_path=None):
+    """
+    Load nutrition targets for downstream scripts.
+    Uses the columnar copy (columnar_path, by default next to csv_path) when it
+    exists and is at least as new as the CSV; otherwise parses the CSV with
+    user_id as text.
+    """
+    columnar_path = columnar_path or default_columnar_path(csv_path)
+    if os.path.exists(columnar_path) and (
+        not os.path.exists(csv_path) or os.path.getmtime(columnar_path) >= os.path.getmtime(csv_path)
+    ):
+        return read_columnar_targets(columnar_path)
+    return pd.read_csv(csv_path, dtype={'user_id': str})
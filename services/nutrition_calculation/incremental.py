@@ -0,0 +1,158 @@
+# services/nutrition_calculation/incremental.py
+
+import os
+import sys
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.nutrition_calculation.calculations import (
+    compute_nutrition_targets_batch,
+    load_merged_inputs,
+    TARGET_COLUMNS,
+)
+
+# ------------------ Logger Setup ------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------ Constants ------------------
+
+# Merged input columns that influence a user's nutrition targets
+FINGERPRINT_FIELDS = [
+    'sex', 'weight_kg', 'height_cm', 'date_of_birth', 'age', 'body_fat_percent',
+    'activity_level', 'exercise_frequency_per_week',
+    'health_conditions', 'goal_type', 'motivation'
+]
+
+FINGERPRINT_COLUMNS = ['user_id', 'fingerprint', 'age']
+
+# ------------------ Fingerprints ------------------
+
+def default_fingerprints_path(output_path):
+    """Fingerprints live next to the targets file, e.g. data/user_nutrition_targets.fingerprints.csv"""
+    return os.path.splitext(output_path)[0] + ".fingerprints.csv"
+
+def compute_fingerprints(merged_df):
+    """64-bit hash of each user's input fields, one per row of the merged frame."""
+    fields = [col for col in FINGERPRINT_FIELDS if col in merged_df.columns]
+    return pd.util.hash_pandas_object(merged_df[fields].astype(str), index=False).to_numpy(dtype=np.uint64)
+
+def compute_effective_ages(merged_df, today=None):
+    """
+    Age each user's targets are computed with: from date_of_birth when present
+    (same rule as get_age_from_dob), else the age column. Unknown ages are -1.
+    """
+    today = today or datetime.today()
+    age = pd.Series(-1, index=merged_df.index, dtype='int64')
+    if 'age' in merged_df.columns:
+        age = pd.to_numeric(merged_df['age'], errors='coerce').fillna(-1).astype('int64')
+    if 'date_of_birth' in merged_df.columns:
+        dob = pd.to_datetime(merged_df['date_of_birth'], format="%Y-%m-%d", errors='coerce')
+        dob_age = ((pd.Timestamp(today) - dob).dt.days // 365).fillna(-1).astype('int64')
+        age = dob_age.where(merged_df['date_of_birth'].notna(), age)
+    return age.to_numpy()
+
+def load_fingerprints(fingerprints_path):
+    """Stored fingerprints indexed by user_id, or None if there are none yet."""
+    if not os.path.exists(fingerprints_path):
+        return None
+    stored = pd.read_csv(fingerprints_path, dtype={'fingerprint': np.uint64, 'age': np.int64})
+    return stored.drop_duplicates('user_id', keep='last').set_index('user_id')
+
+def _write_atomically(df, path):
+    """Write a CSV next to its final location and swap it in."""
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+# ------------------ Incremental Update ------------------
+
+def update_nutrition_targets_incremental(users_path="data/users.csv",
+                                         preferences_path="data/user_preferences.csv",
+                                         output_path="data/user_nutrition_targets.csv",
+                                         fingerprints_path=None,
+                                         full=False):
+    """
+    Recompute nutrition targets only for users whose input fields changed, who
+    are new, or whose DOB-derived age rolled over since the last run. Targets for
+    all other users are carried over from the existing output file. Users that
+    disappeared from the inputs are dropped. Output rows follow users-file order.
+
+    Returns a summary dict with total, recomputed, unchanged and removed counts.
+    """
+    fingerprints_path = fingerprints_path or default_fingerprints_path(output_path)
+    merged_df = load_merged_inputs(users_path, preferences_path)
+
+    fingerprints = compute_fingerprints(merged_df)
+    ages = compute_effective_ages(merged_df)
+    user_ids = merged_df['id']
+
+    stored = None if full else load_fingerprints(fingerprints_path)
+    existing = None
+    if stored is not None and os.path.exists(output_path):
+        existing = pd.read_csv(output_path)
+
+    if existing is None or stored.empty:
+        changed = np.ones(len(merged_df), dtype=bool)
+        removed = 0
+    else:
+        positions = stored.index.get_indexer(user_ids)
+        known = positions >= 0
+        same_inputs = stored['fingerprint'].to_numpy()[positions] == fingerprints
+        same_age = stored['age'].to_numpy()[positions] == ages
+        changed = ~(known & same_inputs & same_age)
+        removed = int((~stored.index.isin(user_ids)).sum())
+
+    recomputed = compute_nutrition_targets_batch(merged_df[changed])
+
+    if existing is not None:
+        unchanged_ids = user_ids[~changed]
+        carried = existing[existing['user_id'].isin(unchanged_ids)]
+        targets = pd.concat([carried, recomputed], ignore_index=True)
+        order = pd.Series(np.arange(len(user_ids)), index=user_ids.to_numpy())
+        order = order[~order.index.duplicated()]
+        targets = (targets.assign(_order=targets['user_id'].map(order).to_numpy())
+                   .sort_values('_order', kind='stable')
+                   .drop(columns='_order')
+                   .reset_index(drop=True))
+    else:
+        targets = recomputed
+
+    _write_atomically(targets[TARGET_COLUMNS], output_path)
+    _write_atomically(pd.DataFrame({
+        'user_id': user_ids.to_numpy(),
+        'fingerprint': fingerprints,
+        'age': ages
+    }, columns=FINGERPRINT_COLUMNS), fingerprints_path)
+
+    summary = {
+        'total': len(targets),
+        'recomputed': int(changed.sum()),
+        'unchanged': int(len(merged_df) - changed.sum()),
+        'removed': removed
+    }
+    logger.info(
+        f"✅ Updated nutrition targets in {output_path}: {summary['recomputed']} recomputed, "
+        f"{summary['unchanged']} unchanged, {summary['removed']} removed"
+    )
+    return summary
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Recompute nutrition targets for changed users only")
+    parser.add_argument("--users", default="data/users.csv")
+    parser.add_argument("--preferences", default="data/user_preferences.csv")
+    parser.add_argument("--output", default="data/user_nutrition_targets.csv")
+    parser.add_argument("--fingerprints", default=None)
+    parser.add_argument("--full", action="store_true", help="Ignore stored fingerprints and recompute everyone")
+    args = parser.parse_args()
+
+    update_nutrition_targets_incremental(args.users, args.preferences, args.output, args.fingerprints, args.full)
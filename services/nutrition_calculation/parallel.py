@@ -0,0 +1,123 @@
+# services/nutrition_calculation/parallel.py
+
+import os
+import sys
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.nutrition_calculation.calculations import (
+    process_user_row,
+    compute_nutrition_targets_batch,
+    TARGET_COLUMNS,
+)
+from services.nutrition_calculation.streaming import iter_merged_chunks, DEFAULT_CHUNKSIZE, DEFAULT_PARTITIONS
+
+# ------------------ Logger Setup ------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------ Worker ------------------
+
+def _compute_shard(shard, engine="batch"):
+    """Compute nutrition targets for one shard of the merged users/preferences frame."""
+    if engine == "batch":
+        return compute_nutrition_targets_batch(shard)
+    results = []
+    for _, row in shard.iterrows():
+        result = process_user_row(row, row)
+        if result:
+            results.append(result)
+    return pd.DataFrame(results, columns=TARGET_COLUMNS)
+
+def default_workers():
+    """Worker count used when none is given: one per available CPU."""
+    return os.cpu_count() or 1
+
+# ------------------ Parallel Processing ------------------
+
+def compute_nutrition_targets_parallel(merged_df, workers=None, engine="batch", shards=None):
+    """
+    Shard an in-memory merged frame across a process pool.
+    Shards are contiguous row ranges and results are concatenated in shard
+    order, so the output matches the single-process engines row for row.
+    """
+    if engine not in ("batch", "rows"):
+        raise ValueError(f"Unknown engine '{engine}'. Expected 'rows' or 'batch'.")
+    workers = workers or default_workers()
+    shards = shards or workers
+    if workers == 1 or len(merged_df) == 0:
+        return _compute_shard(merged_df, engine)
+
+    bounds = np.linspace(0, len(merged_df), shards + 1, dtype=int)
+    pieces = [merged_df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_compute_shard, pieces, [engine] * len(pieces)))
+
+    return pd.concat(results, ignore_index=True)
+
+def generate_nutrition_targets_parallel(users_path="data/users.csv",
+                                        preferences_path="data/user_preferences.csv",
+                                        output_path="data/user_nutrition_targets.csv",
+                                        workers=None,
+                                        chunksize=DEFAULT_CHUNKSIZE,
+                                        join="auto",
+                                        partitions=DEFAULT_PARTITIONS):
+    """
+    Stream merged input chunks to a process pool and write results in input order.
+    At most two chunks per worker are in flight, so memory stays bounded as in
+    the streaming pipeline. Returns the number of users written.
+    """
+    workers = workers or default_workers()
+    max_in_flight = 2 * workers
+    total = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(output_path, 'w', newline='') as outfile:
+        pending = deque()
+
+        def write_next():
+            nonlocal total
+            targets = pending.popleft().result()
+            if targets.empty:
+                return
+            targets.to_csv(outfile, index=False, header=(total == 0))
+            outfile.flush()
+            total += len(targets)
+
+        for merged_chunk in iter_merged_chunks(users_path, preferences_path, chunksize, join, partitions):
+            pending.append(executor.submit(_compute_shard, merged_chunk))
+            if len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+
+        if total == 0:
+            pd.DataFrame(columns=TARGET_COLUMNS).to_csv(outfile, index=False)
+
+    logger.info(f"✅ Saved nutrition targets for {total} users to {output_path} using {workers} workers")
+    return total
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate user nutrition targets on a process pool")
+    parser.add_argument("--users", default="data/users.csv")
+    parser.add_argument("--preferences", default="data/user_preferences.csv")
+    parser.add_argument("--output", default="data/user_nutrition_targets.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--join", choices=["auto", "sorted", "hash"], default="auto")
+    args = parser.parse_args()
+
+    generate_nutrition_targets_parallel(
+        args.users, args.preferences, args.output,
+        workers=args.workers, chunksize=args.chunksize, join=args.join
+    )
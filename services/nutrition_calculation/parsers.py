@@ -0,0 +1,83 @@
+# services/nutrition_calculation/parsers.py
+
+import re
+import ast
+import sys
+
+# ------------------ Constants ------------------
+
+# Vocabulary written by utils/generate_user_preferences.py
+KNOWN_HEALTH_CONDITIONS = [
+    "none", "pre-diabetes", "diabetes", "hypertension", "heart disease", "high cholesterol"
+]
+KNOWN_GOAL_TYPES = [
+    "weight_loss", "muscle_gain", "reverse_metabolic_markers", "longevity", "optimize_fitness"
+]
+
+# Upper bound on memoized raw values, so free-text columns cannot grow the memo without limit
+MAX_MEMO_SIZE = 4096
+
+# Bare values such as `none` or `heart disease`: literal_eval rejects these (or, for
+# True/False/None, returns a constant whose str() is the input), so the result is [raw]
+_BARE_VALUE = re.compile(r"[A-Za-z_][A-Za-z0-9_\- ]*")
+
+# Lists of plain quoted strings without escapes, e.g. ['diabetes', 'hypertension']
+_QUOTED_ITEM = r"""(?:'[^'\\\n]*'|"[^"\\\n]*")"""
+_SIMPLE_LIST = re.compile(rf"\[ *(?:{_QUOTED_ITEM}(?: *, *{_QUOTED_ITEM})* *,? *)?\]")
+_ITEM = re.compile(r"""'([^'\\\n]*)'|"([^"\\\n]*)\"""")
+
+_memo = {}
+
+# ------------------ Parsers ------------------
+
+def legacy_parse_list_field(raw_value):
+    """Reference parser: ast.literal_eval with a fallback to the raw value."""
+    try:
+        parsed = ast.literal_eval(raw_value)
+        if not isinstance(parsed, list):
+            parsed = [str(parsed)]
+    except Exception:
+        parsed = [str(raw_value)]
+    return parsed
+
+def _parse_uncached(raw_value):
+    """Parse a string with the fast paths, deferring anything unusual to the reference parser."""
+    if raw_value == raw_value.strip():
+        if _BARE_VALUE.fullmatch(raw_value):
+            return [raw_value]
+        if _SIMPLE_LIST.fullmatch(raw_value):
+            return [single + double for single, double in _ITEM.findall(raw_value)]
+    return legacy_parse_list_field(raw_value)
+
+def parse_list_literal(raw_value):
+    """
+    Parse a stringified list like "['a', 'b']" or a bare value like "none" into a list.
+    Returns the same result as legacy_parse_list_field, without compiling an AST for
+    the common forms. Results for string inputs are memoized with interned items;
+    every call returns a new list.
+    """
+    if not isinstance(raw_value, str):
+        return legacy_parse_list_field(raw_value)
+
+    cached = _memo.get(raw_value)
+    if cached is None:
+        parsed = _parse_uncached(raw_value)
+        if not all(isinstance(item, str) for item in parsed):
+            return parsed
+        cached = tuple(sys.intern(item) for item in parsed)
+        if len(_memo) < MAX_MEMO_SIZE:
+            _memo[raw_value] = cached
+    return list(cached)
+
+def clear_memo():
+    """Drop memoized values (except the preloaded vocabulary)."""
+    _memo.clear()
+    _preload_vocabulary()
+
+def _preload_vocabulary():
+    for value in KNOWN_HEALTH_CONDITIONS + KNOWN_GOAL_TYPES:
+        item = sys.intern(value)
+        _memo[value] = (item,)
+        _memo[f"['{value}']"] = (item,)
+
+_preload_vocabulary()
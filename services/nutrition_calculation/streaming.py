@@ -0,0 +1,206 @@
+# services/nutrition_calculation/streaming.py
+
+import os
+import sys
+import shutil
+import logging
+import tempfile
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.nutrition_calculation.calculations import compute_nutrition_targets_batch, TARGET_COLUMNS
+
+# ------------------ Logger Setup ------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------ Constants ------------------
+
+DEFAULT_CHUNKSIZE = 50_000
+DEFAULT_PARTITIONS = 16
+
+# ------------------ Join Helpers ------------------
+
+def ids_are_sorted(path, id_column, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Check whether a CSV is sorted (non-decreasing) on id_column.
+    Only the id column is read, one chunk at a time.
+    """
+    previous = None
+    try:
+        for chunk in pd.read_csv(path, usecols=[id_column], chunksize=chunksize):
+            ids = chunk[id_column]
+            if ids.empty:
+                continue
+            if ids.isna().any() or not ids.is_monotonic_increasing:
+                return False
+            if previous is not None and ids.iloc[0] < previous:
+                return False
+            previous = ids.iloc[-1]
+    except TypeError:
+        # Mixed id types across chunks cannot be merge-joined
+        return False
+    return True
+
+def _sorted_merge_join(users_path, preferences_path, chunksize):
+    """
+    Merge-join two CSVs that are both sorted on id / user_id.
+    Yields merged chunks in users-file order; only one users chunk and the
+    overlapping window of preferences are held in memory at a time.
+    """
+    prefs_reader = pd.read_csv(preferences_path, chunksize=chunksize)
+    prefs_buffer = None
+    prefs_exhausted = False
+
+    for users_chunk in pd.read_csv(users_path, chunksize=chunksize):
+        if users_chunk.empty:
+            continue
+        min_id = users_chunk['id'].iloc[0]
+        max_id = users_chunk['id'].iloc[-1]
+
+        # Pull preferences until the buffer covers every id in this users chunk,
+        # dropping preferences for ids that sort before it as we go
+        while not prefs_exhausted and (prefs_buffer is None or prefs_buffer.empty
+                                       or prefs_buffer['user_id'].iloc[-1] <= max_id):
+            try:
+                next_chunk = next(prefs_reader)
+            except StopIteration:
+                prefs_exhausted = True
+                break
+            if prefs_buffer is not None:
+                next_chunk = pd.concat([prefs_buffer, next_chunk], ignore_index=True)
+            prefs_buffer = next_chunk[next_chunk['user_id'] >= min_id].reset_index(drop=True)
+
+        if prefs_buffer is None or (prefs_exhausted and prefs_buffer.empty):
+            return
+
+        yield pd.merge(users_chunk, prefs_buffer, left_on='id', right_on='user_id', how='inner')
+
+        # Keep ids equal to max_id: duplicates may continue in the next users chunk
+        prefs_buffer = prefs_buffer[prefs_buffer['user_id'] >= max_id].reset_index(drop=True)
+
+def _normalize_ids(ids):
+    """Ids as text, with numeric ids in one spelling ("1", " 1" and "1.0" are the same user)."""
+    return ids.str.strip().str.replace(r'^(-?\d+)\.0*$', r'\1', regex=True)
+
+def _partition_csv(path, id_column, partition_dir, prefix, partitions, chunksize):
+    """Split a CSV into hash partitions on its normalized id_column, streaming chunk by chunk."""
+    paths = [os.path.join(partition_dir, f"{prefix}_{i}.csv") for i in range(partitions)]
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype={id_column: str}):
+        chunk[id_column] = _normalize_ids(chunk[id_column])
+        keys = pd.util.hash_pandas_object(chunk[id_column], index=False) % partitions
+        for part, group in chunk.groupby(keys.to_numpy(), sort=False):
+            part_path = paths[part]
+            group.to_csv(part_path, mode='a', index=False, header=not os.path.exists(part_path))
+    return paths
+
+def _hash_partitioned_join(users_path, preferences_path, chunksize, partitions):
+    """
+    Hash-partition both CSVs on the user id into temporary files, then join
+    each partition pair independently: the preferences partition is loaded whole
+    and the users partition is streamed against it in chunks. Peak memory is
+    about 1/partitions of the preferences file plus one chunk; output is grouped
+    by partition rather than in users-file order.
+    """
+    partition_dir = tempfile.mkdtemp(prefix="nutrition_targets_")
+    try:
+        users_parts = _partition_csv(users_path, 'id', partition_dir, 'users', partitions, chunksize)
+        prefs_parts = _partition_csv(preferences_path, 'user_id', partition_dir, 'prefs', partitions, chunksize)
+
+        for users_part, prefs_part in zip(users_parts, prefs_parts):
+            if not (os.path.exists(users_part) and os.path.exists(prefs_part)):
+                continue
+            prefs_df = pd.read_csv(prefs_part, dtype={'user_id': str})
+            for users_chunk in pd.read_csv(users_part, dtype={'id': str}, chunksize=chunksize):
+                yield pd.merge(users_chunk, prefs_df, left_on='id', right_on='user_id', how='inner')
+    finally:
+        shutil.rmtree(partition_dir, ignore_errors=True)
+
+# ------------------ Streaming Pipeline ------------------
+
+def iter_merged_chunks(users_path="data/users.csv",
+                       preferences_path="data/user_preferences.csv",
+                       chunksize=DEFAULT_CHUNKSIZE,
+                       join="auto",
+                       partitions=DEFAULT_PARTITIONS):
+    """
+    Stream the users/preferences inner join as DataFrames of ~chunksize users.
+
+    join:
+        'sorted' - merge-join, requires both files sorted on the user id
+        'hash'   - hash-partitioned join through temporary files
+        'auto'   - 'sorted' when both files are sorted, else 'hash'
+    """
+    if join == "auto":
+        sorted_inputs = (ids_are_sorted(users_path, 'id', chunksize)
+                         and ids_are_sorted(preferences_path, 'user_id', chunksize))
+        join = "sorted" if sorted_inputs else "hash"
+        logger.info(f"Using {join} join for streaming nutrition targets")
+
+    if join == "sorted":
+        merged_chunks = _sorted_merge_join(users_path, preferences_path, chunksize)
+    elif join == "hash":
+        merged_chunks = _hash_partitioned_join(users_path, preferences_path, chunksize, partitions)
+    else:
+        raise ValueError(f"Unknown join '{join}'. Expected 'auto', 'sorted' or 'hash'.")
+
+    for merged_chunk in merged_chunks:
+        if not merged_chunk.empty:
+            yield merged_chunk
+
+def iter_nutrition_target_chunks(users_path="data/users.csv",
+                                 preferences_path="data/user_preferences.csv",
+                                 chunksize=DEFAULT_CHUNKSIZE,
+                                 join="auto",
+                                 partitions=DEFAULT_PARTITIONS):
+    """Stream nutrition targets as DataFrames, one per merged input chunk."""
+    for merged_chunk in iter_merged_chunks(users_path, preferences_path, chunksize, join, partitions):
+        targets = compute_nutrition_targets_batch(merged_chunk)
+        if not targets.empty:
+            yield targets
+
+def generate_nutrition_targets_streaming(users_path="data/users.csv",
+                                         preferences_path="data/user_preferences.csv",
+                                         output_path="data/user_nutrition_targets.csv",
+                                         chunksize=DEFAULT_CHUNKSIZE,
+                                         join="auto",
+                                         partitions=DEFAULT_PARTITIONS):
+    """
+    Compute nutrition targets chunk by chunk and append each chunk to output_path
+    as soon as it is ready. The sorted join holds about one chunk of each input;
+    the hash join also holds one preferences partition (see _hash_partitioned_join),
+    so raise `partitions` for very large preference files.
+    Returns the number of users written.
+    """
+    total = 0
+    with open(output_path, 'w', newline='') as outfile:
+        for targets in iter_nutrition_target_chunks(users_path, preferences_path, chunksize, join, partitions):
+            targets.to_csv(outfile, index=False, header=(total == 0))
+            outfile.flush()
+            total += len(targets)
+        if total == 0:
+            pd.DataFrame(columns=TARGET_COLUMNS).to_csv(outfile, index=False)
+
+    logger.info(f"✅ Saved nutrition targets for {total} users to {output_path}")
+    return total
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate user nutrition targets in bounded memory")
+    parser.add_argument("--users", default="data/users.csv")
+    parser.add_argument("--preferences", default="data/user_preferences.csv")
+    parser.add_argument("--output", default="data/user_nutrition_targets.csv")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--join", choices=["auto", "sorted", "hash"], default="auto")
+    parser.add_argument("--partitions", type=int, default=DEFAULT_PARTITIONS)
+    args = parser.parse_args()
+
+    generate_nutrition_targets_streaming(
+        args.users, args.preferences, args.output,
+        chunksize=args.chunksize, join=args.join, partitions=args.partitions
+    )
@@ -0,0 +1,228 @@
+# services/profile_store/profile_store.py
+
+import os
+import sys
+import json
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Iterable
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.nutrition_calculation.columnar import load_nutrition_targets
+
+# ------------------ Logger Setup ------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ------------------ Constants ------------------
+
+FORMAT_VERSION = 1
+RECORDS_FILE = "records.npy"
+INDEX_FILE = "index.npy"
+META_FILE = "meta.json"
+
+# Columns taken from the nutrition targets file (the rest come from users/preferences)
+TARGET_FIELDS = ['optimal_calories', 'protein_g', 'carbs_g', 'fat_g', 'ibw_kg', 'goals']
+
+EMPTY_SLOT = -1
+
+# ------------------ Helpers ------------------
+
+def _key_bytes(user_id) -> bytes:
+    return str(user_id).encode('utf-8')
+
+def _slot_hash(key: bytes) -> int:
+    """Process-independent hash (Python's str hash is randomized per process)."""
+    return zlib.crc32(key)
+
+def _field_dtype(series: pd.Series):
+    """Fixed-width NumPy dtype for a column: int64, float64 or UTF-8 bytes."""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return np.int64
+    if pd.api.types.is_float_dtype(series):
+        return np.float64
+    encoded = series.fillna('').astype(str).str.encode('utf-8')
+    width = max(int(encoded.str.len().max() or 0), 1)
+    return f"S{width}"
+
+def _build_index(keys: np.ndarray) -> np.ndarray:
+    """Open-addressing hash table (linear probing) mapping key -> record position."""
+    size = 1
+    while size < 2 * max(len(keys), 1):
+        size *= 2
+    mask = size - 1
+    table = np.full(size, EMPTY_SLOT, dtype=np.int64)
+    for position, key in enumerate(keys):
+        slot = _slot_hash(key) & mask
+        while table[slot] != EMPTY_SLOT:
+            if keys[table[slot]] == key:
+                raise ValueError(f"Duplicate user id {key.decode('utf-8')!r} in profile store input")
+            slot = (slot + 1) & mask
+        table[slot] = position
+    return table
+
+# ------------------ Compilation ------------------
+
+def build_profiles_frame(users_path="data/users.csv",
+                         preferences_path="data/user_preferences.csv",
+                         targets_path="data/user_nutrition_targets.csv") -> pd.DataFrame:
+    """Merge users, preferences and (when available) nutrition targets into one row per user."""
+    users_df = pd.read_csv(users_path, dtype={'id': str})
+    prefs_df = pd.read_csv(preferences_path, dtype={'user_id': str})
+    profiles = pd.merge(users_df, prefs_df, left_on='id', right_on='user_id', how='inner').drop(columns=['user_id'])
+
+    if targets_path and (os.path.exists(targets_path) or os.path.exists(os.path.splitext(targets_path)[0] + ".npz")):
+        targets_df = load_nutrition_targets(targets_path)
+        targets_df = targets_df[['user_id'] + [col for col in TARGET_FIELDS if col in targets_df.columns]]
+        targets_df = targets_df.astype({col: object for col in targets_df.columns if isinstance(targets_df[col].dtype, pd.CategoricalDtype)})
+        profiles = pd.merge(profiles, targets_df, left_on='id', right_on='user_id', how='left').drop(columns=['user_id'])
+
+    return profiles
+
+def compile_profile_store(users_path="data/users.csv",
+                          preferences_path="data/user_preferences.csv",
+                          targets_path="data/user_nutrition_targets.csv",
+                          store_dir="data/profile_store") -> int:
+    """
+    Compile users, preferences and nutrition targets into a fixed-width record
+    file plus an id -> record hash index, both loadable with mmap.
+    Returns the number of profiles written.
+    """
+    profiles = build_profiles_frame(users_path, preferences_path, targets_path)
+
+    fields = [(col, _field_dtype(profiles[col])) for col in profiles.columns]
+    records = np.zeros(len(profiles), dtype=fields)
+    for col, dtype in fields:
+        if dtype in (np.int64, np.float64):
+            records[col] = profiles[col].to_numpy(dtype=dtype)
+        else:
+            records[col] = profiles[col].fillna('').astype(str).str.encode('utf-8').to_numpy(dtype=dtype)
+
+    index = _build_index(records['id'])
+
+    os.makedirs(store_dir, exist_ok=True)
+    for name, array in ((RECORDS_FILE, records), (INDEX_FILE, index)):
+        tmp_path = os.path.join(store_dir, f"{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array, allow_pickle=False)
+        os.replace(tmp_path, os.path.join(store_dir, name))
+    with open(os.path.join(store_dir, META_FILE), 'w') as f:
+        json.dump({'format_version': FORMAT_VERSION, 'count': len(records), 'fields': [col for col, _ in fields]}, f)
+
+    logger.info(f"✅ Compiled {len(records)} user profiles into {store_dir}")
+    return len(records)
+
+# ------------------ Store ------------------
+
+class ProfileStore:
+    """
+    Read-only, memory-mapped user profile store with O(1) lookup by user id.
+    Pages are shared by every process that opens the same store.
+    """
+
+    def __init__(self, store_dir: str = "data/profile_store"):
+        """Open a store produced by compile_profile_store."""
+        with open(os.path.join(store_dir, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported profile store format {meta.get('format_version')} in {store_dir}")
+
+        self.records = np.load(os.path.join(store_dir, RECORDS_FILE), mmap_mode='r', allow_pickle=False)
+        self.index = np.load(os.path.join(store_dir, INDEX_FILE), mmap_mode='r', allow_pickle=False)
+        self.fields = self.records.dtype.names
+        self._ids = self.records['id']
+        self._mask = len(self.index) - 1
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, user_id) -> bool:
+        return self._position(user_id) is not None
+
+    def _position(self, user_id) -> Optional[int]:
+        key = _key_bytes(user_id)
+        slot = _slot_hash(key) & self._mask
+        while True:
+            position = int(self.index[slot])
+            if position == EMPTY_SLOT:
+                return None
+            if self._ids[position] == key:
+                return position
+            slot = (slot + 1) & self._mask
+
+    def _to_dict(self, position: int) -> Dict[str, Any]:
+        profile = {}
+        for name, value in zip(self.fields, self.records[position].item()):
+            if isinstance(value, bytes):
+                value = value.decode('utf-8')
+            elif isinstance(value, float) and value != value:
+                value = None  # NaN: no nutrition targets for this user
+            profile[name] = value
+        return profile
+
+    def get(self, user_id) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one user profile.
+
+        Args:
+            user_id: User id (int or str)
+
+        Returns:
+            Dict: Profile fields, or None if the user is not in the store
+        """
+        position = self._position(user_id)
+        if position is None:
+            return None
+        return self._to_dict(position)
+
+    def get_many(self, user_ids: Iterable) -> List[Optional[Dict[str, Any]]]:
+        """Fetch several profiles, None for unknown ids."""
+        return [self.get(user_id) for user_id in user_ids]
+
+    def ids(self) -> List[str]:
+        """All user ids in record order."""
+        return [value.decode('utf-8') for value in self.records['id']]
+
+    def frame(self, user_ids: Optional[Iterable] = None) -> pd.DataFrame:
+        """
+        Profiles as a DataFrame in record order, with the value types the source
+        CSVs load with. `user_ids=None` keeps every profile; unknown ids are skipped.
+        """
+        if user_ids is None:
+            positions = range(len(self.records))
+        else:
+            positions = sorted(position for position in map(self._position, dict.fromkeys(user_ids))
+                               if position is not None)
+        return pd.DataFrame([self._to_dict(position) for position in positions], columns=list(self.fields))
+
+def open_profile_store(store_dir: str = "data/profile_store", sources: Iterable[str] = ()) -> Optional[ProfileStore]:
+    """
+    Open the store when it exists and was compiled after every existing source
+    file was last modified; otherwise return None so callers read the CSVs.
+    """
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    compiled_at = os.path.getmtime(meta_path)
+    if any(os.path.exists(path) and os.path.getmtime(path) > compiled_at for path in sources):
+        logger.info(f"Profile store {store_dir} is older than its sources; reading CSVs")
+        return None
+    return ProfileStore(store_dir)
+
+# ------------------ Entrypoint ------------------
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile the memory-mapped user profile store")
+    parser.add_argument("--users", default="data/users.csv")
+    parser.add_argument("--preferences", default="data/user_preferences.csv")
+    parser.add_argument("--targets", default="data/user_nutrition_targets.csv")
+    parser.add_argument("--store", default="data/profile_store")
+    args = parser.parse_args()
+
+    compile_profile_store(args.users, args.preferences, args.targets, args.store)
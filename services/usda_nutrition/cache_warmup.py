@@ -0,0 +1,177 @@
+import os
+import re
+import sys
+import glob
+import asyncio
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.name_matching import normalize_food_name
+from services.usda_nutrition.usda_async import AsyncUSDAApiClient, DEFAULT_CONCURRENCY, DEFAULT_RATE_PER_SECOND
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_GLOB = "llm_test_data/outputs_*.csv"
+DEFAULT_MEAL_LOGS = ["data/test data/test_meal_logs.csv"]
+
+# Hourly quota left untouched for live traffic
+DEFAULT_QUOTA_RESERVE = 100
+
+# Same splitting rules as the USDA validation notebook, plus "w/" and "/"
+_MEAL_SEPARATORS = re.compile(r"\s+(?:served with|with|w/|and|on)\s+|[,;&/+]", re.IGNORECASE)
+_MODIFIERS = re.compile(r"\b(?:gluten[- ]free|low[- ]fat|organic|homemade|fresh)\b", re.IGNORECASE)
+# Leading amounts such as "150g", "1 cup", "2 tbsp" and parenthesized notes like "(150 g)"
+_QUANTITY = re.compile(r"^\s*[\d./½¼¾]+\s*(?:g|kg|ml|l|oz|cups?|tbsp|tsp|slices?|pieces?)?\b\s*(?:of\s+)?",
+                       re.IGNORECASE)
+_PARENTHESIZED = re.compile(r"\([^)]*\)")
+
+
+def split_meal_name(meal_name: str) -> List[str]:
+    """Split a meal name like "Grilled Fish with Quinoa and Steamed Vegetables" into food names."""
+    if not isinstance(meal_name, str):
+        return []
+    parts = _MEAL_SEPARATORS.split(_MODIFIERS.sub(" ", _PARENTHESIZED.sub(" ", meal_name)))
+    return [" ".join(part.split()) for part in parts if part.strip()]
+
+
+def split_ingredients(ingredients: str) -> List[str]:
+    """Split an ingredients field like "chicken breast (150g), 1 cup brown rice" into food names."""
+    if not isinstance(ingredients, str):
+        return []
+    names = []
+    for part in re.split(r"[,;\n]", _PARENTHESIZED.sub(" ", ingredients)):
+        name = " ".join(_QUANTITY.sub("", part).split())
+        if name:
+            names.append(name)
+    return names
+
+
+def mine_food_names(output_glob: str = DEFAULT_OUTPUT_GLOB,
+                    meal_log_paths: Optional[List[str]] = None) -> List[Tuple[str, int]]:
+    """
+    Count food names in generated meal outputs (ingredients and meal_name columns)
+    and meal logs (meal_name). Names with the same normalized form are counted
+    together under their most common spelling.
+
+    Returns:
+        List[Tuple[str, int]]: (name, count), most frequent first
+    """
+    meal_log_paths = DEFAULT_MEAL_LOGS if meal_log_paths is None else meal_log_paths
+    counts = Counter()
+    for path in sorted(glob.glob(output_glob)) + [path for path in meal_log_paths if os.path.exists(path)]:
+        df = pd.read_csv(path)
+        if 'ingredients' in df.columns:
+            for ingredients in df['ingredients'].dropna():
+                counts.update(split_ingredients(ingredients))
+        if 'meal_name' in df.columns:
+            for meal_name in df['meal_name'].dropna():
+                counts.update(split_meal_name(meal_name))
+
+    grouped: Dict[str, Counter] = {}
+    for name, count in counts.items():
+        key = normalize_food_name(name)
+        if key:
+            grouped.setdefault(key, Counter())[name] += count
+    ranked = [(spellings.most_common(1)[0][0], sum(spellings.values())) for spellings in grouped.values()]
+    return sorted(ranked, key=lambda item: (-item[1], item[0]))
+
+
+async def warm_cache_async(names: List[str],
+                           client: AsyncUSDAApiClient,
+                           batch_size: int = 50,
+                           quota_reserve: int = DEFAULT_QUOTA_RESERVE,
+                           stop_event: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    Look up `names` in order through the async client so results land in its cache.
+    Names already cached cost nothing; the client's token bucket paces the rest.
+    Stops early when the API reports fewer than `quota_reserve` requests left this
+    hour, or when `stop_event` is set.
+
+    Returns:
+        Dict[str, int]: requested, already_cached, warmed, not_found and skipped counts
+    """
+    summary = {'requested': len(names), 'already_cached': 0, 'warmed': 0, 'not_found': 0, 'skipped': 0}
+    for start in range(0, len(names), batch_size):
+        remaining = client.client.rate_limit_remaining
+        if (stop_event is not None and stop_event.is_set()) or (remaining is not None and remaining < quota_reserve):
+            summary['skipped'] = len(names) - start
+            logger.warning(f"Stopping cache warm-up with {summary['skipped']} names left "
+                           f"(quota remaining: {remaining})")
+            break
+
+        batch = names[start:start + batch_size]
+        cached = set()
+        results = await client.get_nutrition_info_many(batch, cached_names=cached)
+        for name, info in results.items():
+            if name in cached:
+                summary['already_cached'] += 1
+            elif info:
+                summary['warmed'] += 1
+            else:
+                summary['not_found'] += 1
+        logger.info(f"Warmed {start + len(batch)}/{len(names)} names")
+
+    logger.info(f"✅ USDA cache warm-up done: {summary}")
+    return summary
+
+
+def warm_cache(names: List[str],
+               concurrency: int = DEFAULT_CONCURRENCY,
+               rate_per_second: Optional[float] = DEFAULT_RATE_PER_SECOND,
+               stop_event: Optional[threading.Event] = None,
+               **kwargs) -> Dict[str, int]:
+    """Blocking warm-up on a fresh event loop; kwargs go to warm_cache_async or the client."""
+    warm_kwargs = {key: kwargs.pop(key) for key in ('batch_size', 'quota_reserve') if key in kwargs}
+
+    async def run():
+        async with AsyncUSDAApiClient(concurrency=concurrency, rate_per_second=rate_per_second, **kwargs) as client:
+            return await warm_cache_async(names, client, stop_event=stop_event, **warm_kwargs)
+    return asyncio.run(run())
+
+
+def start_background_warmup(limit: Optional[int] = None, **kwargs) -> Tuple[threading.Thread, threading.Event]:
+    """
+    Mine and warm the most common food names on a daemon thread, e.g. at service start.
+
+    Returns:
+        Tuple[Thread, Event]: The worker thread, and an event that stops it after the current batch
+    """
+    stop_event = threading.Event()
+
+    def run():
+        names = [name for name, _ in mine_food_names()][:limit]
+        warm_cache(names, stop_event=stop_event, **kwargs)
+
+    thread = threading.Thread(target=run, name="usda-cache-warmup", daemon=True)
+    thread.start()
+    return thread, stop_event
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-populate the USDA cache with common food names")
+    parser.add_argument("--outputs", default=DEFAULT_OUTPUT_GLOB, help="Glob of generated meal output CSVs")
+    parser.add_argument("--meal-logs", nargs="*", default=DEFAULT_MEAL_LOGS)
+    parser.add_argument("--limit", type=int, default=None, help="Warm only the N most frequent names")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_SECOND, help="Upstream requests per second")
+    parser.add_argument("--quota-reserve", type=int, default=DEFAULT_QUOTA_RESERVE)
+    parser.add_argument("--dry-run", action="store_true", help="Only print the ranked names")
+    args = parser.parse_args()
+
+    ranked = mine_food_names(args.outputs, args.meal_logs)[:args.limit]
+    if args.dry_run:
+        for name, count in ranked:
+            print(f"{count:>5}  {name}")
+    else:
+        warm_cache([name for name, _ in ranked], concurrency=args.concurrency,
+                   rate_per_second=args.rate, quota_reserve=args.quota_reserve)
@@ -0,0 +1,345 @@
+import os
+import re
+import sys
+import json
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Iterable
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.nutrient_vectors import NUTRIENTS, N_NUTRIENTS, unit_factor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_INDEX_DIR = "data/fdc_index"
+META_FILE = "meta.json"
+
+# Data types the live client searches, as named by the API / JSON exports
+DATA_TYPES = ["Foundation", "SR Legacy", "Survey (FNDDS)"]
+
+# Top-level keys of the FDC bulk JSON downloads
+JSON_FOOD_KEYS = {
+    "FoundationFoods": "Foundation",
+    "SRLegacyFoods": "SR Legacy",
+    "SurveyFoods": "Survey (FNDDS)",
+}
+
+# data_type values in the FDC bulk CSV download (food.csv)
+CSV_DATA_TYPES = {
+    "foundation_food": "Foundation",
+    "sr_legacy_food": "SR Legacy",
+    "survey_fndds_food": "Survey (FNDDS)",
+}
+
+# CSV unit names are upper case; the API and JSON exports use these spellings
+CSV_UNITS = {"UG": "µg", "IU": "IU", "KJ": "kJ"}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens with a naive plural strip (eggs -> egg)."""
+    tokens = []
+    for token in _TOKEN.findall(str(text).lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+# ------------------ Ingest ------------------
+
+def _foods_from_json(path: str) -> Iterable[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        yield from data
+        return
+    for key, data_type in JSON_FOOD_KEYS.items():
+        for food in data.get(key, []):
+            food.setdefault("dataType", data_type)
+            yield food
+
+
+def _load_json_exports(paths: List[str]):
+    """Flatten JSON exports to (foods, nutrients, amounts) frames."""
+    foods, nutrients, amounts = [], {}, []
+    for path in paths:
+        for food in _foods_from_json(path):
+            fdc_id = int(food["fdcId"])
+            foods.append((fdc_id, food.get("dataType", ""), food.get("description", "")))
+            for entry in food.get("foodNutrients", []):
+                nutrient = entry.get("nutrient") or {}
+                if "id" not in nutrient or entry.get("amount") is None:
+                    continue
+                nutrients[int(nutrient["id"])] = (nutrient.get("name", ""), nutrient.get("unitName", ""))
+                amounts.append((fdc_id, int(nutrient["id"]), float(entry["amount"])))
+
+    foods_df = pd.DataFrame(foods, columns=["fdc_id", "data_type", "description"])
+    nutrients_df = pd.DataFrame([(nid, name, unit) for nid, (name, unit) in nutrients.items()],
+                                columns=["nutrient_id", "name", "unit"])
+    amounts_df = pd.DataFrame(amounts, columns=["fdc_id", "nutrient_id", "amount"])
+    return foods_df, nutrients_df, amounts_df
+
+
+def _load_csv_export(directory: str):
+    """Read food.csv, nutrient.csv and food_nutrient.csv from an FDC CSV download."""
+    foods_df = pd.read_csv(os.path.join(directory, "food.csv"),
+                           usecols=["fdc_id", "data_type", "description"])
+    foods_df["data_type"] = foods_df["data_type"].map(CSV_DATA_TYPES).fillna(foods_df["data_type"])
+
+    nutrients_df = pd.read_csv(os.path.join(directory, "nutrient.csv"), usecols=["id", "name", "unit_name"])
+    nutrients_df = nutrients_df.rename(columns={"id": "nutrient_id", "unit_name": "unit"})
+    nutrients_df["unit"] = nutrients_df["unit"].map(lambda unit: CSV_UNITS.get(unit, str(unit).lower()))
+
+    amounts_df = pd.read_csv(os.path.join(directory, "food_nutrient.csv"),
+                             usecols=["fdc_id", "nutrient_id", "amount"]).dropna(subset=["amount"])
+    return foods_df, nutrients_df, amounts_df
+
+
+def build_fdc_index(sources: List[str],
+                    index_dir: str = DEFAULT_INDEX_DIR,
+                    data_types: Optional[List[str]] = None) -> int:
+    """
+    Build the offline index from FDC bulk exports.
+
+    Args:
+        sources (List[str]): JSON export files and/or CSV download directories
+        index_dir (str): Output directory
+        data_types (List[str]): Data types to keep; defaults to DATA_TYPES
+
+    Returns:
+        int: Number of foods indexed
+    """
+    data_types = data_types or DATA_TYPES
+    parts = [_load_csv_export(source) if os.path.isdir(source) else _load_json_exports([source])
+             for source in sources]
+    foods_df = pd.concat([part[0] for part in parts], ignore_index=True)
+    nutrients_df = pd.concat([part[1] for part in parts], ignore_index=True)
+    amounts_df = pd.concat([part[2] for part in parts], ignore_index=True)
+
+    foods_df = (foods_df[foods_df["data_type"].isin(data_types)]
+                .drop_duplicates("fdc_id", keep="last")
+                .sort_values("fdc_id", kind="stable")
+                .reset_index(drop=True))
+    foods_df["description"] = foods_df["description"].fillna("").astype(str)
+
+    # Only nutrients reported for at least one kept food get a matrix column
+    amounts_df = amounts_df[amounts_df["fdc_id"].isin(foods_df["fdc_id"])]
+    nutrients_df = (nutrients_df.drop_duplicates("nutrient_id", keep="last")
+                    .loc[lambda df: df["nutrient_id"].isin(amounts_df["nutrient_id"])]
+                    .sort_values("nutrient_id")
+                    .reset_index(drop=True))
+
+    # Dense nutrient matrix: one row per food, one column per nutrient, NaN where not reported
+    rows = pd.Index(foods_df["fdc_id"]).get_indexer(amounts_df["fdc_id"])
+    cols = pd.Index(nutrients_df["nutrient_id"]).get_indexer(amounts_df["nutrient_id"])
+    matrix = np.full((len(foods_df), len(nutrients_df)), np.nan, dtype=np.float32)
+    matrix[rows, cols] = amounts_df["amount"].to_numpy(dtype=np.float32)
+
+    # Inverted index over description tokens, stored as CSR postings
+    food_tokens = [sorted(set(tokenize(description))) for description in foods_df["description"]]
+    token_counts = np.array([len(tokenize(description)) for description in foods_df["description"]], dtype=np.int32)
+    postings_df = pd.DataFrame(
+        [(token, position) for position, tokens in enumerate(food_tokens) for token in tokens],
+        columns=["token", "position"]
+    ).sort_values(["token", "position"], kind="stable")
+    vocabulary, starts = np.unique(postings_df["token"].to_numpy(dtype=str), return_index=True)
+    offsets = np.append(starts, len(postings_df)).astype(np.int64)
+
+    os.makedirs(index_dir, exist_ok=True)
+    arrays = {
+        "fdc_ids": foods_df["fdc_id"].to_numpy(dtype=np.int64),
+        "descriptions": foods_df["description"].to_numpy(dtype=str),
+        "data_types": foods_df["data_type"].to_numpy(dtype=str),
+        "token_counts": token_counts,
+        "nutrient_ids": nutrients_df["nutrient_id"].to_numpy(dtype=np.int64),
+        "nutrient_names": nutrients_df["name"].fillna("").to_numpy(dtype=str),
+        "nutrient_units": nutrients_df["unit"].fillna("").to_numpy(dtype=str),
+        "amounts": matrix,
+        "vocabulary": vocabulary,
+        "postings_offsets": offsets,
+        "postings": postings_df["position"].to_numpy(dtype=np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(index_dir, f"{name}.npy"), array, allow_pickle=False)
+    with open(os.path.join(index_dir, META_FILE), "w") as f:
+        json.dump({"format_version": FORMAT_VERSION, "foods": len(foods_df),
+                   "nutrients": len(nutrients_df), "sources": list(sources)}, f, indent=2)
+
+    logger.info(f"✅ Indexed {len(foods_df)} foods and {len(nutrients_df)} nutrients into {index_dir}")
+    return len(foods_df)
+
+
+# ------------------ Lookup ------------------
+
+class LocalFDCIndex:
+    """
+    Read-only offline FoodData Central index built by build_fdc_index.
+    Arrays are memory-mapped, so opening is cheap and pages are shared between processes.
+    Results have the same shape as the live API responses.
+    """
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR):
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported FDC index format version {self.meta.get('format_version')} in {index_dir}")
+
+        def load(name):
+            # Plain ndarray views of the mapping: same pages, without np.memmap's per-access overhead
+            return np.asarray(np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r", allow_pickle=False))
+
+        self.index_dir = index_dir
+        self.fdc_ids = load("fdc_ids")
+        self.descriptions = load("descriptions")
+        self.data_types = load("data_types")
+        self.token_counts = load("token_counts")
+        self.nutrient_ids = load("nutrient_ids").tolist()
+        self.nutrient_names = load("nutrient_names").tolist()
+        self.nutrient_units = load("nutrient_units").tolist()
+        self.amounts = load("amounts")
+        self.vocabulary = load("vocabulary")
+        self.postings_offsets = load("postings_offsets")
+        self.postings = load("postings")
+
+        # Tie-break key for equally relevant matches, packed into one int64 per food:
+        # description length, then data type (in DATA_TYPES order), then position (= fdcId order)
+        type_rank = {data_type: rank for rank, data_type in enumerate(DATA_TYPES)}
+        type_ranks = np.array([type_rank.get(str(t), len(DATA_TYPES)) for t in self.data_types], dtype=np.int64)
+        self._tiebreak = ((np.minimum(self.token_counts, 2**14 - 1).astype(np.int64) << 34)
+                          | (type_ranks << 32)
+                          | np.arange(len(self.fdc_ids), dtype=np.int64))
+
+        # Matrix column and unit factor for each fixed nutrient vector slot (-1: not in this index)
+        columns = {nutrient_id: col for col, nutrient_id in enumerate(self.nutrient_ids)}
+        self._vector_cols = np.array([columns.get(nutrient_id, -1) for nutrient_id, _, _ in NUTRIENTS], dtype=np.int64)
+        self._vector_factors = np.array([
+            (unit_factor(self.nutrient_units[columns[nutrient_id]], unit, nutrient_id) or 0.0)
+            if nutrient_id in columns else 0.0
+            for nutrient_id, _, unit in NUTRIENTS
+        ], dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.fdc_ids)
+
+    def __contains__(self, fdc_id) -> bool:
+        return self._position(fdc_id) is not None
+
+    def _position(self, fdc_id) -> Optional[int]:
+        try:
+            fdc_id = int(fdc_id)
+        except (TypeError, ValueError):
+            return None
+        position = int(np.searchsorted(self.fdc_ids, fdc_id))
+        if position < len(self.fdc_ids) and self.fdc_ids[position] == fdc_id:
+            return position
+        return None
+
+    def _postings(self, token: str) -> np.ndarray:
+        slot = int(np.searchsorted(self.vocabulary, token))
+        if slot < len(self.vocabulary) and self.vocabulary[slot] == token:
+            return self.postings[self.postings_offsets[slot]:self.postings_offsets[slot + 1]]
+        return self.postings[:0]
+
+    def _nutrient_entries(self, position: int):
+        """(column, amount) pairs for the nutrients reported for a food."""
+        row = self.amounts[position]
+        cols = np.flatnonzero(~np.isnan(row))
+        return zip(cols.tolist(), row[cols].astype(np.float64).tolist())
+
+    def food_vectors(self, fdc_ids: Iterable) -> np.ndarray:
+        """
+        Dense nutrient vectors (see nutrient_vectors.NUTRIENTS) for many foods in one gather.
+
+        Returns:
+            np.ndarray: float32 (len(fdc_ids), N_NUTRIENTS) per 100 g, in canonical units;
+                unreported nutrients are 0 and rows of unknown ids are NaN
+        """
+        positions = [self._position(fdc_id) for fdc_id in fdc_ids]
+        wanted = np.array([-1 if position is None else position for position in positions], dtype=np.int64)
+        if len(self.fdc_ids) == 0:
+            return np.full((len(wanted), N_NUTRIENTS), np.nan, dtype=np.float32)
+        gathered = self.amounts[np.maximum(wanted, 0)][:, np.maximum(self._vector_cols, 0)]
+        vectors = np.nan_to_num(gathered, nan=0.0) * self._vector_factors
+        vectors[:, self._vector_cols < 0] = 0.0
+        vectors[wanted < 0] = np.nan
+        return vectors.astype(np.float32, copy=False)
+
+    def search(self, query: str, page_size: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank foods by the number of query tokens in their description, then by
+        shorter (more specific) descriptions, data type and fdcId.
+
+        Returns:
+            List[Dict]: Search hits shaped like /foods/search 'foods' entries
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        matches = np.concatenate([self._postings(token) for token in tokens])
+        if len(matches) == 0:
+            return []
+        scores = np.bincount(matches, minlength=len(self.fdc_ids))
+        positions = np.flatnonzero(scores)
+        keys = ((len(tokens) - scores[positions]).astype(np.int64) << 48) | self._tiebreak[positions]
+        if len(keys) > page_size:
+            keys = keys[np.argpartition(keys, page_size)[:page_size]]
+        keys.sort()
+
+        results = []
+        for position in (keys & 0xFFFFFFFF).tolist():
+            results.append({
+                "fdcId": int(self.fdc_ids[position]),
+                "description": str(self.descriptions[position]),
+                "dataType": str(self.data_types[position]),
+                "foodNutrients": [
+                    {"nutrientId": self.nutrient_ids[col], "nutrientName": self.nutrient_names[col],
+                     "unitName": self.nutrient_units[col], "value": amount}
+                    for col, amount in self._nutrient_entries(position)
+                ]
+            })
+        return results
+
+    def food_details(self, fdc_id) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            Dict: Food shaped like the /food/{fdcId} response, or None if not indexed
+        """
+        position = self._position(fdc_id)
+        if position is None:
+            return None
+        return {
+            "fdcId": int(self.fdc_ids[position]),
+            "description": str(self.descriptions[position]),
+            "dataType": str(self.data_types[position]),
+            "foodNutrients": [
+                {"nutrient": {"id": self.nutrient_ids[col], "name": self.nutrient_names[col],
+                              "unitName": self.nutrient_units[col]},
+                 "amount": amount}
+                for col, amount in self._nutrient_entries(position)
+            ]
+        }
+
+
+def default_local_index() -> Optional[LocalFDCIndex]:
+    """Index at $USDA_LOCAL_INDEX, or None when offline mode is not configured."""
+    index_dir = os.getenv("USDA_LOCAL_INDEX")
+    return LocalFDCIndex(index_dir) if index_dir else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build an offline FoodData Central index from bulk exports")
+    parser.add_argument("sources", nargs="+", help="FDC JSON export files or CSV download directories")
+    parser.add_argument("--output", default=DEFAULT_INDEX_DIR)
+    parser.add_argument("--data-types", nargs="+", default=DATA_TYPES)
+    args = parser.parse_args()
+
+    build_fdc_index(args.sources, args.output, args.data_types)
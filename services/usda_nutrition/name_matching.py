@@ -0,0 +1,175 @@
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.fdc_index import tokenize
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+# Typos tolerated per token: none below 5 characters (bean/bear, ham/jam), then one, then two from 9
+TOKEN_EDIT_STEPS = ((9, 2), (5, 1))
+
+# Words that do not change which food is meant
+STOP_WORDS = {
+    "a", "an", "the", "and", "with", "of", "in", "on", "for", "to", "some", "fresh",
+    "g", "gram", "oz", "ounce", "cup", "tbsp", "tsp", "slice", "piece", "serving", "portion",
+}
+
+
+def normalize_food_name(name: str) -> str:
+    """
+    Order-insensitive key for a food name: lower-cased tokens with plurals,
+    quantities and stop words removed, sorted.
+    e.g. "Grilled Chicken Breasts" and "chicken breast, grilled" -> "breast chicken grilled"
+    """
+    tokens = {token for token in tokenize(name) if token not in STOP_WORDS and not token.isdigit()}
+    return " ".join(sorted(tokens))
+
+
+def name_trigrams(normalized: str) -> Set[str]:
+    """Character trigrams of each token, padded so word starts weigh more than word ends."""
+    trigrams = set()
+    for token in normalized.split():
+        padded = f"  {token} "
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def max_token_edits(token: str) -> int:
+    for length, edits in TOKEN_EDIT_STEPS:
+        if len(token) >= length:
+            return edits
+    return 0
+
+
+def within_edits(a: str, b: str, max_edits: int) -> bool:
+    """Whether the Levenshtein distance between `a` and `b` is at most `max_edits`."""
+    if abs(len(a) - len(b)) > max_edits:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_edits:
+            return False
+        previous = current
+    return previous[-1] <= max_edits
+
+
+def same_tokens(query: List[str], candidate: List[str]) -> bool:
+    """
+    Whether two normalized names have the same words up to small typos: every
+    token pairs with exactly one token of the other name, so an added or missing
+    word ("black bean" vs "black bean soup") never matches.
+    """
+    if len(query) != len(candidate):
+        return False
+    unmatched = list(candidate)
+    for token in sorted(query, key=lambda t: t not in unmatched):
+        pair = next((other for other in unmatched
+                     if other == token or within_edits(token, other, min(max_token_edits(token),
+                                                                         max_token_edits(other)))), None)
+        if pair is None:
+            return False
+        unmatched.remove(pair)
+    return True
+
+
+class FoodNameMatcher:
+    """
+    Resolves food names to FDC ids already found for the same or a similar name.
+    Exact matches on the normalized name are looked up directly; otherwise the
+    closest previously resolved name by trigram Dice similarity is used if it
+    reaches `threshold` and has the same words up to small typos (see same_tokens).
+    """
+
+    def __init__(self, threshold: float = DEFAULT_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._ids_by_name: Dict[str, int] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._postings: Dict[str, List[int]] = {}
+        self.stats = {'lookups': 0, 'exact_hits': 0, 'fuzzy_hits': 0, 'misses': 0}
+
+    def __len__(self) -> int:
+        return len(self._ids_by_name)
+
+    def add(self, name: str, fdc_id: int):
+        """Remember that `name` resolved to `fdc_id`."""
+        normalized = normalize_food_name(name)
+        if not normalized:
+            return
+        with self._lock:
+            if normalized in self._ids_by_name:
+                self._ids_by_name[normalized] = fdc_id
+                return
+            self._ids_by_name[normalized] = fdc_id
+            entry = len(self._names)
+            trigrams = name_trigrams(normalized)
+            self._names.append((normalized, len(trigrams)))
+            for trigram in trigrams:
+                self._postings.setdefault(trigram, []).append(entry)
+
+    def match(self, name: str) -> Optional[Tuple[str, int, float]]:
+        """
+        Closest known name without counting a lookup.
+
+        Returns:
+            Tuple[str, int, float]: (normalized name, fdc id, similarity), or None below threshold
+        """
+        normalized = normalize_food_name(name)
+        if not normalized:
+            return None
+        with self._lock:
+            fdc_id = self._ids_by_name.get(normalized)
+            if fdc_id is not None:
+                return normalized, fdc_id, 1.0
+
+            trigrams = name_trigrams(normalized)
+            shared = Counter(entry for trigram in trigrams for entry in self._postings.get(trigram, ()))
+            tokens = normalized.split()
+            best = None
+            for entry, count in shared.items():
+                candidate, size = self._names[entry]
+                similarity = 2 * count / (len(trigrams) + size)
+                if similarity < self.threshold or (best is not None and similarity <= best[2]):
+                    continue
+                if same_tokens(tokens, candidate.split()):
+                    best = (candidate, self._ids_by_name[candidate], similarity)
+        return best
+
+    def resolve(self, name: str, fallback: Optional[Callable[[str], Optional[int]]] = None) -> Optional[int]:
+        """
+        FDC id for `name` from an exact or fuzzy match, counting hits and misses.
+        `fallback(normalized_name)` is consulted before a miss, e.g. a persistent store
+        of earlier resolutions; what it finds is remembered and counts as an exact hit.
+        """
+        found = self.match(name)
+        if found is None and fallback is not None:
+            normalized = normalize_food_name(name)
+            fdc_id = fallback(normalized) if normalized else None
+            if fdc_id is not None:
+                self.add(name, fdc_id)
+                found = (normalized, fdc_id, 1.0)
+        with self._lock:
+            self.stats['lookups'] += 1
+            if found is None:
+                self.stats['misses'] += 1
+            elif found[2] == 1.0:
+                self.stats['exact_hits'] += 1
+            else:
+                self.stats['fuzzy_hits'] += 1
+        return None if found is None else found[1]
+
+    def get_stats(self) -> Dict[str, float]:
+        """Lookup counters plus hit_rate (exact and fuzzy hits over lookups)."""
+        with self._lock:
+            stats = dict(self.stats)
+        hits = stats['exact_hits'] + stats['fuzzy_hits']
+        stats['hit_rate'] = hits / stats['lookups'] if stats['lookups'] else 0.0
+        return stats
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+# Fixed nutrient index: (FDC nutrient id, display name, canonical unit).
+# Vector position k always holds NUTRIENTS[k], in its canonical unit, per 100 g of food.
+NUTRIENTS = [
+    (1003, 'Protein', 'g'),
+    (1004, 'Total Fat', 'g'),
+    (1005, 'Carbohydrates', 'g'),
+    (1008, 'Energy (kcal)', 'kcal'),
+    (1018, 'Alcohol', 'g'),
+    (1051, 'Water', 'g'),
+    (1079, 'Fiber', 'g'),
+    (1087, 'Calcium', 'mg'),
+    (1089, 'Iron', 'mg'),
+    (1090, 'Magnesium', 'mg'),
+    (1092, 'Potassium', 'mg'),
+    (1093, 'Sodium', 'mg'),
+    (1095, 'Zinc', 'mg'),
+    (1106, 'Vitamin A', 'µg'),
+    (1114, 'Vitamin D', 'µg'),
+    (1162, 'Vitamin C', 'mg'),
+    (1165, 'Vitamin E', 'mg'),
+    (1166, 'Vitamin K', 'µg'),
+    (1175, 'Vitamin B6', 'mg'),
+    (1177, 'Vitamin B12', 'µg'),
+    (1178, 'Vitamin B1 (Thiamin)', 'mg'),
+    (1180, 'Vitamin B2 (Riboflavin)', 'mg'),
+    (1185, 'Vitamin B3 (Niacin)', 'mg'),
+    (1186, 'Vitamin B9 (Folate)', 'µg'),
+    (1258, 'Saturated Fat', 'g'),
+    (1292, 'Monounsaturated Fat', 'g'),
+    (1293, 'Polyunsaturated Fat', 'g'),
+    (2000, 'Sugars', 'g'),
+]
+
+NUTRIENT_MAP = {nutrient_id: name for nutrient_id, name, _ in NUTRIENTS}
+NUTRIENT_INDEX = {nutrient_id: position for position, (nutrient_id, _, _) in enumerate(NUTRIENTS)}
+NUTRIENT_NAMES = [name for _, name, _ in NUTRIENTS]
+NUTRIENT_UNITS = [unit for _, _, unit in NUTRIENTS]
+N_NUTRIENTS = len(NUTRIENTS)
+
+# Mass units in grams and energy units in kcal
+_MASS_UNITS = {'g': 1.0, 'mg': 1e-3, 'µg': 1e-6, 'μg': 1e-6, 'ug': 1e-6, 'mcg': 1e-6, 'kg': 1e3}
+_ENERGY_UNITS = {'kcal': 1.0, 'kj': 1 / 4.184}
+
+# IU -> µg where the conversion is fixed (vitamin A IU depends on the source compound)
+_IU_TO_UG = {1114: 0.025}
+
+
+def unit_factor(unit: str, canonical_unit: str, nutrient_id: Optional[int] = None) -> Optional[float]:
+    """Multiplier from `unit` to `canonical_unit`, or None if they cannot be converted."""
+    unit, canonical = str(unit).strip().lower(), canonical_unit.lower()
+    if unit == canonical:
+        return 1.0
+    if unit == 'iu' and nutrient_id in _IU_TO_UG:
+        unit, scale = 'µg', _IU_TO_UG[nutrient_id]
+    else:
+        scale = 1.0
+    for table in (_MASS_UNITS, _ENERGY_UNITS):
+        if unit in table and canonical in table:
+            return scale * table[unit] / table[canonical]
+    return None
+
+
+def food_vector(food_details: Dict[str, Any]) -> np.ndarray:
+    """
+    Nutrients of an FDC food (as returned by /food/{fdcId}) as a float32 vector
+    over NUTRIENTS, per 100 g, in canonical units. Unreported nutrients are 0.
+    """
+    vector = np.zeros(N_NUTRIENTS, dtype=np.float32)
+    for entry in (food_details or {}).get('foodNutrients', []):
+        nutrient = entry.get('nutrient') or {}
+        position = NUTRIENT_INDEX.get(nutrient.get('id'))
+        if position is None or entry.get('amount') is None:
+            continue
+        factor = unit_factor(nutrient.get('unitName', NUTRIENT_UNITS[position]),
+                             NUTRIENT_UNITS[position], nutrient['id'])
+        if factor is not None:
+            vector[position] = entry['amount'] * factor
+    return vector
+
+
+def food_matrix(foods: Iterable[Dict[str, Any]]) -> np.ndarray:
+    """Stack food_vector rows into an (n_foods, N_NUTRIENTS) float32 matrix."""
+    vectors = [food_vector(food) for food in foods]
+    return np.vstack(vectors) if vectors else np.zeros((0, N_NUTRIENTS), dtype=np.float32)
+
+
+def scale_vectors(vectors: np.ndarray, grams) -> np.ndarray:
+    """Per-100 g vectors (one per row) scaled to portions of `grams` each."""
+    grams = np.asarray(grams, dtype=np.float32)
+    if vectors.ndim == 1:
+        return vectors * (grams / 100)
+    return vectors * (grams / 100)[:, None]
+
+
+def meal_vector(vectors: np.ndarray, grams=None) -> np.ndarray:
+    """Total nutrients of a meal: the sum of its ingredients' vectors, optionally portioned."""
+    if grams is not None:
+        return np.asarray(grams, dtype=np.float32) / 100 @ vectors
+    return vectors.sum(axis=0, dtype=np.float32)
+
+
+def sum_by_group(vectors: np.ndarray, groups) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum rows that share a group label, e.g. ingredient rows by meal, or meals by day.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (group labels in first-seen order, one summed row per group)
+    """
+    codes, labels = pd.factorize(np.asarray(groups))
+    totals = np.zeros((len(labels), vectors.shape[1]), dtype=np.float32)
+    np.add.at(totals, codes, vectors)
+    return np.asarray(labels), totals
+
+
+def vector_to_nutrients(vector: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """Vector back to the {'Name': {'value', 'unit'}} shape of extract_nutrients, skipping zeros."""
+    return {
+        NUTRIENT_NAMES[position]: {'value': value, 'unit': NUTRIENT_UNITS[position]}
+        for position, value in enumerate(vector.astype(np.float64).tolist()) if value
+    }
+
+
+def vector_to_nutrition_info(vector: np.ndarray) -> List[Dict[str, Any]]:
+    """Vector as {'Nutrient', 'Value', 'Unit'} rows, like get_nutrition_info."""
+    return [{'Nutrient': name, 'Value': data['value'], 'Unit': data['unit']}
+            for name, data in vector_to_nutrients(vector).items()]
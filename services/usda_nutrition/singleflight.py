@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key in threaded code: the first caller
+    runs the function, callers arriving while it runs wait and share its result
+    (or exception). Nothing is remembered once the call finishes; that is the cache's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key: str, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+                self.stats['executed'] += 1
+                leader = True
+            else:
+                self.stats['coalesced'] += 1
+                leader = False
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn(*args)
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+    def get_stats(self) -> Dict[str, int]:
+        """executed: calls that ran; coalesced: duplicate calls that waited instead."""
+        with self._lock:
+            return dict(self.stats)
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for asyncio: concurrent awaits for the same key share one task.
+    The shared task is shielded, so a cancelled caller does not cancel the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {'executed': 0, 'coalesced': 0}
+
+    async def do(self, key: str, coro_fn: Callable[..., Any], *args) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key) if self._calls.get(key) is done else None)
+            self.stats['executed'] += 1
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, int]:
+        """executed: calls that ran; coalesced: duplicate calls that waited instead."""
+        return dict(self.stats)
@@ -1,10 +1,25 @@
 import requests
 import json
+import numpy as np
 import pandas as pd
 import os
+import sys
+import random
 import logging
 from time import sleep
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
+from requests.adapters import HTTPAdapter
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.usda_cache import CacheBackend, MemoryCache, default_cache
+from services.usda_nutrition.singleflight import SingleFlight
+from services.usda_nutrition.fdc_index import LocalFDCIndex, default_local_index
+from services.usda_nutrition.nutrient_vectors import NUTRIENT_MAP, food_vector
+from services.usda_nutrition.name_matching import FoodNameMatcher, normalize_food_name
 
 class USDAApiClient:
     """
@@ -12,14 +27,148 @@ class USDAApiClient:
     nutritional information for food items.
     """
     
-    def __init__(self):
-        """Initialize the USDA API client with API key and base URL."""
+    # Responses worth retrying: rate limiting and transient server errors
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    # Most ids the multi-id /foods endpoint accepts per request
+    MAX_IDS_PER_REQUEST = 20
+    
+    def __init__(self,
+                 cache: Optional[CacheBackend] = None,
+                 base_url: Optional[str] = None,
+                 timeout: Union[float, Tuple[float, float]] = (3.05, 15),
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 max_retry_after: float = 60.0,
+                 pool_maxsize: int = 10,
+                 local_index: Optional[LocalFDCIndex] = None,
+                 name_matcher: Optional[FoodNameMatcher] = None):
+        """
+        Initialize the USDA API client with API key and base URL.
+        
+        Args:
+            cache (CacheBackend): Cache backend; defaults to the shared SQLite cache, or to an
+                in-memory cache when a local index answers lookups
+            base_url (str): API root; defaults to $USDA_API_BASE_URL or the public FDC API
+            timeout (float or tuple): Requests timeout, or (connect, read) timeouts in seconds
+            max_retries (int): Retries after a 429/5xx response or a connection error
+            backoff_base (float): First backoff window in seconds, doubled per retry
+            backoff_max (float): Upper bound of the backoff window in seconds
+            max_retry_after (float): Longest Retry-After wait honored before giving up
+            pool_maxsize (int): Keep-alive connections kept per host
+            local_index (LocalFDCIndex): Offline FDC index; defaults to $USDA_LOCAL_INDEX if set.
+                When present, lookups are answered locally and never reach the API or cache.
+            name_matcher (FoodNameMatcher): Resolves near-duplicate food names to an already
+                found fdcId; defaults to FoodNameMatcher() with its default similarity threshold
+        """
         self.api_key = os.getenv("USDA_API_KEY", "DEMO_KEY")
-        self.base_url = "https://api.nal.usda.gov/fdc/v1"
+        self.base_url = base_url or os.getenv("USDA_API_BASE_URL", "https://api.nal.usda.gov/fdc/v1")
         self.logger = logging.getLogger(__name__)
         
-        # Cache to avoid repeated API calls
-        self.cache = {}
+        # Offline mode: answer from a local FDC bulk-export index
+        self.local_index = local_index if local_index is not None else default_local_index()
+        
+        # Cache to avoid repeated API calls, persisted across runs by default (not needed offline)
+        if cache is None:
+            cache = MemoryCache() if self.local_index is not None else default_cache()
+        self.cache = cache
+        
+        # Near-duplicate names ("grilled chicken breast" / "chicken breast, grilled") reuse one search
+        self.name_matcher = name_matcher if name_matcher is not None else FoodNameMatcher()
+        
+        # Concurrent misses for the same cache key share one upstream request
+        self._inflight = SingleFlight()
+        
+        # Pooled keep-alive session, so repeated calls skip the TCP/TLS handshake
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.session = requests.Session()
+        self.rate_limit_remaining: Optional[int] = None
+        # Called before every request attempt, retries included (e.g. to take a rate-limit token)
+        self.before_request: Optional[Callable[[], None]] = None
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def close(self):
+        """Close pooled connections."""
+        self.session.close()
+    
+    def _retry_after_seconds(self, response: requests.Response) -> Optional[float]:
+        """Parse a Retry-After header given as seconds or as an HTTP date."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+    
+    def _backoff_seconds(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+    
+    def _record_rate_limit(self, response: requests.Response):
+        """Remember the hourly quota left, as reported by the API's X-RateLimit-Remaining header."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if isinstance(remaining, str) and remaining.isdigit():
+            self.rate_limit_remaining = int(remaining)
+    
+    def _get(self, endpoint: str, params: Dict[str, Any]) -> requests.Response:
+        """
+        GET through the pooled session, retrying 429/5xx responses and connection
+        errors with jittered exponential backoff (or the server's Retry-After).
+        
+        Returns:
+            Response: The first non-retryable response, or the last one received
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.before_request is not None:
+                self.before_request()
+            try:
+                response = self.session.get(endpoint, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff_seconds(attempt)
+                self.logger.warning(f"Request to {endpoint} failed ({str(e)}), retrying in {delay:.2f}s")
+                sleep(delay)
+                continue
+            
+            self._record_rate_limit(response)
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                return response
+            
+            retry_after = self._retry_after_seconds(response)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                self.logger.warning(f"Retry-After of {retry_after:.0f}s from {endpoint} exceeds limit, giving up")
+                return response
+            delay = retry_after if retry_after is not None else self._backoff_seconds(attempt)
+            self.logger.warning(f"Got {response.status_code} from {endpoint}, retrying in {delay:.2f}s")
+            sleep(delay)
+        
+        return response
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the cache backend."""
+        return self.cache.get_stats()
+    
+    def match_stats(self) -> Dict[str, float]:
+        """Exact/fuzzy food-name resolution counters and hit rate."""
+        return self.name_matcher.get_stats()
+    
+    def coalesce_stats(self) -> Dict[str, int]:
+        """Lookups that went upstream (executed) vs joined one already in flight (coalesced)."""
+        return self._inflight.get_stats()
     
     def search_food(self, query: str, page_size: int = 5) -> List[Dict[str, Any]]:
         """
@@ -33,42 +182,50 @@ class USDAApiClient:
             List[Dict]: List of food items matching the query
         """
         try:
+            if self.local_index is not None:
+                return self.local_index.search(query, page_size)
+            
             # Check cache first
             cache_key = f"search_{query}_{page_size}"
-            if cache_key in self.cache:
-                return self.cache[cache_key]
-            
-            # Construct the API endpoint
-            endpoint = f"{self.base_url}/foods/search"
-            
-            # Set up parameters
-            params = {
-                "api_key": self.api_key,
-                "query": query,
-                "pageSize": page_size,
-                "dataType": ["Foundation", "SR Legacy", "Survey (FNDDS)"]
-            }
-            
-            # Make the request
-            response = requests.get(endpoint, params=params)
-            
-            # Check if the request was successful
-            if response.status_code == 200:
-                data = response.json()
-                foods = data.get('foods', [])
-                
-                # Cache the result
-                self.cache[cache_key] = foods
-                
-                return foods
-            else:
-                self.logger.error(f"Error searching for food: {response.status_code} - {response.text}")
-                return []
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            return self._inflight.do(cache_key, self._fetch_search, query, page_size)
                 
         except Exception as e:
             self.logger.error(f"Error in search_food: {str(e)}")
             return []
     
+    def _fetch_search(self, query: str, page_size: int = 5) -> List[Dict[str, Any]]:
+        """Query the search endpoint and cache the result, bypassing the cache read."""
+        # Construct the API endpoint
+        endpoint = f"{self.base_url}/foods/search"
+        
+        # Set up parameters
+        params = {
+            "api_key": self.api_key,
+            "query": query,
+            "pageSize": page_size,
+            "dataType": ["Foundation", "SR Legacy", "Survey (FNDDS)"]
+        }
+        
+        # Make the request
+        response = self._get(endpoint, params)
+        
+        # Check if the request was successful
+        if response.status_code == 200:
+            data = response.json()
+            foods = data.get('foods', [])
+            
+            # Cache the result (empty results with the shorter negative TTL)
+            self.cache.set(f"search_{query}_{page_size}", foods, negative=not foods)
+            
+            return foods
+        else:
+            self.logger.error(f"Error searching for food: {response.status_code} - {response.text}")
+            return []
+    
     def get_food_details(self, fdc_id: str) -> Optional[Dict[str, Any]]:
         """
         Get detailed nutritional information for a specific food item.
@@ -80,38 +237,98 @@ class USDAApiClient:
             Dict: Detailed nutritional information
         """
         try:
+            if self.local_index is not None:
+                return self.local_index.food_details(fdc_id)
+            
             # Check cache first
             cache_key = f"details_{fdc_id}"
-            if cache_key in self.cache:
-                return self.cache[cache_key]
-            
-            # Construct the API endpoint
-            endpoint = f"{self.base_url}/food/{fdc_id}"
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
-            # Set up parameters
-            params = {
-                "api_key": self.api_key
-            }
-            
-            # Make the request
-            response = requests.get(endpoint, params=params)
-            
-            # Check if the request was successful
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Cache the result
-                self.cache[cache_key] = data
-                
-                return data
-            else:
-                self.logger.error(f"Error getting food details: {response.status_code} - {response.text}")
-                return None
+            return self._inflight.do(cache_key, self._fetch_details, fdc_id)
                 
         except Exception as e:
             self.logger.error(f"Error in get_food_details: {str(e)}")
             return None
     
+    def _fetch_details(self, fdc_id: str) -> Optional[Dict[str, Any]]:
+        """Query the food details endpoint and cache the result, bypassing the cache read."""
+        # Construct the API endpoint
+        endpoint = f"{self.base_url}/food/{fdc_id}"
+        
+        # Set up parameters
+        params = {
+            "api_key": self.api_key
+        }
+        
+        # Make the request
+        response = self._get(endpoint, params)
+        
+        # Check if the request was successful
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Cache the result
+            self.cache.set(f"details_{fdc_id}", data)
+            
+            return data
+        else:
+            self.logger.error(f"Error getting food details: {response.status_code} - {response.text}")
+            return None
+    
+    def get_food_details_many(self, fdc_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get detailed nutritional information for many food items.
+        Cached ids are served from the cache; the rest are fetched through the
+        multi-id /foods endpoint, MAX_IDS_PER_REQUEST at a time, and cached per id.
+        
+        Args:
+            fdc_ids (List[str]): FDC IDs of the food items
+            
+        Returns:
+            Dict[str, Dict]: Details keyed by FDC ID as a string, None where not found
+        """
+        if self.local_index is not None:
+            return {fdc_id: self.local_index.food_details(fdc_id) for fdc_id in dict.fromkeys(map(str, fdc_ids))}
+        
+        results = {}
+        missing = []
+        for fdc_id in dict.fromkeys(str(fdc_id) for fdc_id in fdc_ids):
+            cached = self.cache.get(f"details_{fdc_id}")
+            results[fdc_id] = cached
+            if cached is None:
+                missing.append(fdc_id)
+        
+        for start in range(0, len(missing), self.MAX_IDS_PER_REQUEST):
+            try:
+                results.update(self._fetch_details_chunk(missing[start:start + self.MAX_IDS_PER_REQUEST]))
+            except Exception as e:
+                self.logger.error(f"Error in get_food_details_many: {str(e)}")
+        
+        return results
+    
+    def _fetch_details_chunk(self, fdc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch up to MAX_IDS_PER_REQUEST ids in one request and cache each food."""
+        endpoint = f"{self.base_url}/foods"
+        params = {
+            "api_key": self.api_key,
+            "fdcIds": ",".join(fdc_ids)
+        }
+        
+        response = self._get(endpoint, params)
+        
+        if response.status_code != 200:
+            self.logger.error(f"Error getting food details: {response.status_code} - {response.text}")
+            return {}
+        
+        found = {}
+        for food in response.json():
+            fdc_id = str(food.get('fdcId'))
+            self.cache.set(f"details_{fdc_id}", food)
+            found[fdc_id] = food
+        return found
+    
     def extract_nutrients(self, food_details: Dict[str, Any]) -> Dict[str, float]:
         """
         Extract key nutrients from food details.
@@ -128,45 +345,13 @@ class USDAApiClient:
             if not food_details or 'foodNutrients' not in food_details:
                 return nutrients
             
-            # Map of nutrient IDs to names (common nutrients)
-            nutrient_map = {
-                1003: 'Protein',
-                1004: 'Total Fat',
-                1005: 'Carbohydrates',
-                1008: 'Energy (kcal)',
-                1018: 'Alcohol',
-                1051: 'Water',
-                1079: 'Fiber',
-                1087: 'Calcium',
-                1089: 'Iron',
-                1090: 'Magnesium',
-                1092: 'Potassium',
-                1093: 'Sodium',
-                1095: 'Zinc',
-                1106: 'Vitamin A',
-                1114: 'Vitamin D',
-                1162: 'Vitamin C',
-                1165: 'Vitamin E',
-                1166: 'Vitamin K',
-                1175: 'Vitamin B6',
-                1177: 'Vitamin B12',
-                1178: 'Vitamin B1 (Thiamin)',
-                1180: 'Vitamin B2 (Riboflavin)',
-                1185: 'Vitamin B3 (Niacin)',
-                1186: 'Vitamin B9 (Folate)',
-                1258: 'Saturated Fat',
-                1292: 'Monounsaturated Fat',
-                1293: 'Polyunsaturated Fat',
-                2000: 'Sugars'
-            }
-            
             # Extract nutrients
             for nutrient in food_details['foodNutrients']:
                 if 'nutrient' in nutrient and 'id' in nutrient['nutrient']:
                     nutrient_id = nutrient['nutrient']['id']
                     
-                    if nutrient_id in nutrient_map:
-                        nutrient_name = nutrient_map[nutrient_id]
+                    if nutrient_id in NUTRIENT_MAP:
+                        nutrient_name = NUTRIENT_MAP[nutrient_id]
                         nutrient_value = nutrient.get('amount', 0)
                         nutrient_unit = nutrient.get('nutrient', {}).get('unitName', '')
                         
@@ -181,6 +366,56 @@ class USDAApiClient:
             self.logger.error(f"Error extracting nutrients: {str(e)}")
             return nutrients
     
+    def format_nutrition_info(self, food_details: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Format extracted nutrients as display rows.
+        
+        Args:
+            food_details (Dict): Detailed food information
+            
+        Returns:
+            List[Dict]: One {'Nutrient', 'Value', 'Unit'} row per nutrient
+        """
+        nutrition_info = []
+        for nutrient_name, nutrient_data in self.extract_nutrients(food_details).items():
+            nutrition_info.append({
+                'Nutrient': nutrient_name,
+                'Value': nutrient_data['value'],
+                'Unit': nutrient_data['unit']
+            })
+        return nutrition_info
+    
+    def get_nutrient_vector(self, food_name: str) -> Optional[np.ndarray]:
+        """
+        Nutrients of the top match for a food name as a dense vector.
+        
+        Args:
+            food_name (str): Name of the food item
+            
+        Returns:
+            np.ndarray: float32 vector over nutrient_vectors.NUTRIENTS per 100 g, or None if not found
+        """
+        try:
+            if self.local_index is not None:
+                search_results = self.local_index.search(food_name, page_size=1)
+                if not search_results:
+                    return None
+                return self.local_index.food_vectors([search_results[0]['fdcId']])[0]
+
+            fdc_id = self._resolve_food_id(food_name)
+            if fdc_id is None:
+                search_results = self.search_food(food_name)
+                if not search_results:
+                    return None
+                fdc_id = search_results[0]['fdcId']
+                self._remember_food_id(food_name, fdc_id)
+            food_details = self.get_food_details(fdc_id)
+            return food_vector(food_details) if food_details else None
+        
+        except Exception as e:
+            self.logger.error(f"Error getting nutrient vector: {str(e)}")
+            return None
+    
     def get_nutrition_info(self, food_name: str) -> List[Dict[str, Any]]:
         """
         Get nutritional information for a food item by name.
@@ -192,11 +427,29 @@ class USDAApiClient:
             List[Dict]: Nutritional information
         """
         try:
+            if self.local_index is not None:
+                search_results = self.local_index.search(food_name, page_size=1)
+                if not search_results:
+                    return []
+                return self.format_nutrition_info(self.local_index.food_details(search_results[0]['fdcId']))
+            
             # Check cache first
             cache_key = f"nutrition_{food_name}"
-            if cache_key in self.cache:
-                return self.cache[cache_key]
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
             
+            return self._inflight.do(cache_key, self._fetch_nutrition_info, food_name)
+            
+        except Exception as e:
+            self.logger.error(f"Error getting nutrition info: {str(e)}")
+            return []
+    
+    def _fetch_nutrition_info(self, food_name: str) -> List[Dict[str, Any]]:
+        """Search (unless a similar name was resolved before), fetch details and cache the formatted nutrients."""
+        food_id = self._resolve_food_id(food_name)
+        
+        if food_id is None:
             # Search for the food
             search_results = self.search_food(food_name)
             
@@ -205,30 +458,29 @@ class USDAApiClient:
             
             # Get the first result (most relevant)
             food_id = search_results[0]['fdcId']
-            
-            # Get detailed information
-            food_details = self.get_food_details(food_id)
-            
-            if not food_details:
-                return []
-            
-            # Extract nutrients
-            nutrients = self.extract_nutrients(food_details)
-            
-            # Format for display
-            nutrition_info = []
-            for nutrient_name, nutrient_data in nutrients.items():
-                nutrition_info.append({
-                    'Nutrient': nutrient_name,
-                    'Value': nutrient_data['value'],
-                    'Unit': nutrient_data['unit']
-                })
-            
-            # Cache the result
-            self.cache[cache_key] = nutrition_info
-            
-            return nutrition_info
-            
-        except Exception as e:
-            self.logger.error(f"Error getting nutrition info: {str(e)}")
+            self._remember_food_id(food_name, food_id)
+        
+        # Get detailed information
+        food_details = self.get_food_details(food_id)
+        
+        if not food_details:
             return []
+        
+        # Extract nutrients and format for display
+        nutrition_info = self.format_nutrition_info(food_details)
+        
+        # Cache the result
+        self.cache.set(f"nutrition_{food_name}", nutrition_info)
+        
+        return nutrition_info
+    
+    def _resolve_food_id(self, food_name: str) -> Optional[int]:
+        """fdcId previously found for this or a similar name (in memory or persisted in the cache)."""
+        return self.name_matcher.resolve(food_name, lambda normalized: self.cache.get(f"resolved_{normalized}"))
+    
+    def _remember_food_id(self, food_name: str, food_id: int):
+        """Record a search result for name matching in this process and in the cache."""
+        normalized = normalize_food_name(food_name)
+        if normalized:
+            self.name_matcher.add(food_name, food_id)
+            self.cache.set(f"resolved_{normalized}", food_id)
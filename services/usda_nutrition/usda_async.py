@@ -0,0 +1,276 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Iterable, Set
+
+# Add root project directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import CacheBackend
+from services.usda_nutrition.singleflight import AsyncSingleFlight
+
+# FDC allows 1,000 requests per hour per key; DEMO_KEY is far stricter
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE_PER_SECOND = 1000 / 3600
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: allows `burst` calls at once, refilled at `rate` tokens per second.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available and take them. Waiters are served in order."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+class AsyncUSDAApiClient:
+    """
+    Asyncio front end to USDAApiClient for bulk lookups.
+    Cache reads and writes run in worker threads so a slow (SQLite) cache never
+    blocks the event loop; cache misses run on the sync client's pooled session in
+    a thread pool, at most `concurrency` at a time and no faster than the token
+    bucket allows, each retry taking its own token. Results are shared through the
+    same cache backend.
+    """
+
+    def __init__(self,
+                 cache: Optional[CacheBackend] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 rate_per_second: Optional[float] = DEFAULT_RATE_PER_SECOND,
+                 burst: Optional[float] = None,
+                 client: Optional[USDAApiClient] = None,
+                 **client_kwargs):
+        """
+        Initialize the async client.
+
+        Args:
+            cache (CacheBackend): Cache backend; defaults to the shared SQLite cache
+            concurrency (int): Maximum upstream requests in flight
+            rate_per_second (float): Sustained upstream request rate; None disables the limit
+            burst (float): Token bucket size; defaults to max(1, rate_per_second)
+            client (USDAApiClient): Sync client to wrap instead of building one
+            **client_kwargs: Passed to USDAApiClient (base_url, timeout, max_retries, ...)
+        """
+        self.client = client or USDAApiClient(cache=cache, pool_maxsize=concurrency, **client_kwargs)
+        self.cache = self.client.cache
+        self.concurrency = concurrency
+        self.rate_limiter = TokenBucket(rate_per_second, burst) if rate_per_second else None
+        self.logger = logging.getLogger(__name__)
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight = AsyncSingleFlight()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="usda")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Token requests fetch threads are blocked on; cancelled on close so threads can exit
+        self._waiting = set()
+        self._waiting_lock = threading.Lock()
+        self._closing = False
+        if self.rate_limiter is not None:
+            self.client.before_request = self._acquire_from_thread
+
+    def _acquire_from_thread(self):
+        """Block a fetch thread until the event loop's token bucket grants a request."""
+        if self._loop is None or self._loop.is_closed():
+            return  # the wrapped client used synchronously, outside this async client
+        future = asyncio.run_coroutine_threadsafe(self.rate_limiter.acquire(), self._loop)
+        with self._waiting_lock:
+            self._waiting.add(future)
+            if self._closing:
+                future.cancel()
+        try:
+            future.result()
+        except concurrent.futures.CancelledError:
+            raise RuntimeError("AsyncUSDAApiClient closed while waiting for a rate-limit token") from None
+        finally:
+            with self._waiting_lock:
+                self._waiting.discard(future)
+
+    async def _upstream(self, fetch, *args):
+        """Run a blocking fetch under the concurrency limit; every attempt it makes takes a rate-limit token."""
+        async with self._semaphore:
+            self._loop = asyncio.get_running_loop()
+            return await self._loop.run_in_executor(self._executor, fetch, *args)
+
+    async def _cache_get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def _cache_get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Several cache reads in one worker thread hop."""
+        return await asyncio.to_thread(lambda: [self.cache.get(key) for key in keys])
+
+    async def search_food(self, query: str, page_size: int = 5) -> List[Dict[str, Any]]:
+        """Async USDAApiClient.search_food."""
+        if self.client.local_index is not None:
+            return self.client.search_food(query, page_size)
+        try:
+            cached = await self._cache_get(f"search_{query}_{page_size}")
+            if cached is not None:
+                return cached
+            return await self._inflight.do(f"search_{query}_{page_size}",
+                                           self._upstream, self.client._fetch_search, query, page_size)
+        except Exception as e:
+            self.logger.error(f"Error in search_food: {str(e)}")
+            return []
+
+    async def get_food_details(self, fdc_id: str) -> Optional[Dict[str, Any]]:
+        """Async USDAApiClient.get_food_details."""
+        if self.client.local_index is not None:
+            return self.client.get_food_details(fdc_id)
+        try:
+            cached = await self._cache_get(f"details_{fdc_id}")
+            if cached is not None:
+                return cached
+            return await self._inflight.do(f"details_{fdc_id}", self._upstream, self.client._fetch_details, fdc_id)
+        except Exception as e:
+            self.logger.error(f"Error in get_food_details: {str(e)}")
+            return None
+
+    async def get_food_details_many(self, fdc_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Async USDAApiClient.get_food_details_many: uncached ids are fetched in concurrent chunks."""
+        if self.client.local_index is not None:
+            return self.client.get_food_details_many(fdc_ids)
+        ids = list(dict.fromkeys(str(fdc_id) for fdc_id in fdc_ids))
+        results = dict(zip(ids, await self._cache_get_many([f"details_{fdc_id}" for fdc_id in ids])))
+        missing = [fdc_id for fdc_id in ids if results[fdc_id] is None]
+
+        size = self.client.MAX_IDS_PER_REQUEST
+        chunks = [missing[start:start + size] for start in range(0, len(missing), size)]
+        fetched = await asyncio.gather(*(self._upstream(self.client._fetch_details_chunk, chunk) for chunk in chunks),
+                                       return_exceptions=True)
+        for found in fetched:
+            if isinstance(found, Exception):
+                self.logger.error(f"Error in get_food_details_many: {str(found)}")
+                continue
+            results.update(found)
+        return results
+
+    async def get_nutrition_info(self, food_name: str) -> List[Dict[str, Any]]:
+        """Async USDAApiClient.get_nutrition_info: search, then details of the top match."""
+        if self.client.local_index is not None:
+            return self.client.get_nutrition_info(food_name)
+        try:
+            cache_key = f"nutrition_{food_name}"
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            return await self._inflight.do(cache_key, self._fetch_nutrition_info, food_name)
+
+        except Exception as e:
+            self.logger.error(f"Error getting nutrition info: {str(e)}")
+            return []
+
+    async def _fetch_nutrition_info(self, food_name: str) -> List[Dict[str, Any]]:
+        food_id = await asyncio.to_thread(self.client._resolve_food_id, food_name)
+        if food_id is None:
+            search_results = await self.search_food(food_name)
+            if not search_results:
+                return []
+            food_id = search_results[0]['fdcId']
+            await asyncio.to_thread(self.client._remember_food_id, food_name, food_id)
+
+        food_details = await self.get_food_details(food_id)
+        if not food_details:
+            return []
+
+        nutrition_info = self.client.format_nutrition_info(food_details)
+        await asyncio.to_thread(self.cache.set, f"nutrition_{food_name}", nutrition_info)
+        return nutrition_info
+
+    async def get_nutrition_info_many(self, food_names: Iterable[str],
+                                      cached_names: Optional[Set[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Look up many foods concurrently.
+        Names the client's name matcher cannot resolve are searched in parallel,
+        then the top matches' details are fetched together through the multi-id endpoint.
+
+        Args:
+            food_names (Iterable[str]): Food names; duplicates are looked up once
+            cached_names (Optional[Set[str]]): If given, names answered from the cache are added to it
+
+        Returns:
+            Dict[str, List[Dict]]: Nutrition info per name, in first-seen order
+        """
+        if self.client.local_index is not None:
+            return {name: self.client.get_nutrition_info(name) for name in dict.fromkeys(food_names)}
+
+        names = list(dict.fromkeys(food_names))
+        results = dict(zip(names, await self._cache_get_many([f"nutrition_{name}" for name in names])))
+        pending = [name for name in names if results[name] is None]
+        if cached_names is not None:
+            cached_names.update(name for name in names if results[name] is not None)
+
+        resolved = await asyncio.to_thread(lambda: [self.client._resolve_food_id(name) for name in pending])
+        top_ids = {name: str(food_id) for name, food_id in zip(pending, resolved) if food_id is not None}
+        unresolved = [name for name, food_id in zip(pending, resolved) if food_id is None]
+
+        searches = await asyncio.gather(*(self.search_food(name) for name in unresolved))
+        found_ids = {name: found[0]['fdcId'] for name, found in zip(unresolved, searches) if found}
+        top_ids.update((name, str(food_id)) for name, food_id in found_ids.items())
+        await asyncio.to_thread(lambda: [self.client._remember_food_id(name, food_id)
+                                         for name, food_id in found_ids.items()])
+        details = await self.get_food_details_many(top_ids.values())
+
+        for name in pending:
+            food_details = details.get(top_ids.get(name))
+            results[name] = self.client.format_nutrition_info(food_details) if food_details else []
+        await asyncio.to_thread(lambda: [self.cache.set(f"nutrition_{name}", results[name])
+                                         for name in pending if results[name]])
+        return results
+
+    def coalesce_stats(self) -> Dict[str, int]:
+        """Lookups that went upstream (executed) vs joined one already in flight (coalesced)."""
+        return self._inflight.get_stats()
+
+    def close(self):
+        """
+        Release worker threads and pooled connections. Fetches still waiting for a
+        rate-limit token (e.g. after the caller was cancelled) are abandoned.
+        """
+        with self._waiting_lock:
+            self._closing = True
+            for future in self._waiting:
+                future.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Off the loop: requests already on the wire finish without blocking it
+        await asyncio.to_thread(self.close)
+
+
+def get_nutrition_info_many(food_names: Iterable[str], **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+    """Blocking helper: run AsyncUSDAApiClient.get_nutrition_info_many in a fresh event loop."""
+    async def run():
+        async with AsyncUSDAApiClient(**kwargs) as client:
+            return await client.get_nutrition_info_many(food_names)
+    return asyncio.run(run())
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Default lifetimes: FoodData Central entries change rarely, empty searches may be fixed upstream
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 50_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_PATH = "data/usda_cache.db"
+# SQLite hits refresh last_access at most this often, so most reads do not write
+DEFAULT_TOUCH_INTERVAL_SECONDS = 60
+
+
+class CacheBackend(ABC):
+    """
+    Interface for USDAApiClient cache backends.
+    Values must be JSON-serializable; get() returns None on a miss.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'negative_hits': 0,
+            'expired': 0,
+            'sets': 0,
+            'evictions': 0
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, negative: bool = False):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def get_stats(self) -> Dict[str, int]:
+        """Snapshot of hit/miss/eviction counters for this process."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self,
+                 ttl: float = DEFAULT_TTL_SECONDS,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count('misses')
+                return None
+            value, expires_at, negative = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self._count('expired')
+                self._count('misses')
+                return None
+            self._entries.move_to_end(key)
+        self._count('negative_hits' if negative else 'hits')
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, negative: bool = False):
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl, negative)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self._count('sets')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Live entries; expired ones not yet dropped are not counted."""
+        now = time.time()
+        with self._lock:
+            return sum(1 for _, expires_at, _ in self._entries.values() if expires_at > now)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Persistent cache in a SQLite file, safe to share between threads and processes.
+    Entries expire after their TTL; once the file holds more than max_entries rows
+    or max_bytes of values, least recently used entries are evicted. Recency is
+    tracked to within touch_interval seconds.
+    """
+
+    def __init__(self,
+                 path: str = DEFAULT_CACHE_PATH,
+                 ttl: float = DEFAULT_TTL_SECONDS,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 evict_every: int = 100,
+                 touch_interval: float = DEFAULT_TOUCH_INTERVAL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.touch_interval = touch_interval
+        self.logger = logging.getLogger(__name__)
+
+        self._local = threading.local()
+        self._sets_since_evict = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " negative INTEGER NOT NULL DEFAULT 0,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread and process (connections must not cross a fork)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, negative, expires_at, last_access FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            value, negative, expires_at, last_access = row
+            now = time.time()
+            if expires_at <= now:
+                conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+                self._count('expired')
+                self._count('misses')
+                return None
+            if now - last_access >= self.touch_interval:
+                conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading USDA cache: {str(e)}")
+            self._count('misses')
+            return None
+
+        self._count('negative_hits' if negative else 'hits')
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, negative: bool = False):
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        payload = json.dumps(value)
+        now = time.time()
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, negative, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, payload, len(payload), int(negative), now + ttl, now)
+            )
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing USDA cache: {str(e)}")
+            return
+
+        self._count('sets')
+        self._sets_since_evict += 1
+        if self._sets_since_evict >= self.evict_every:
+            self._sets_since_evict = 0
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until within bounds."""
+        conn = self._connection()
+        evicted = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            evicted += conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                # Walk entries from least recently used until both limits hold
+                excess_rows = max(count - self.max_entries, 0)
+                excess_bytes = max(total_bytes - self.max_bytes, 0)
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM cache ORDER BY last_access"):
+                    if excess_rows <= 0 and excess_bytes <= 0:
+                        break
+                    victims.append((key,))
+                    excess_rows -= 1
+                    excess_bytes -= size
+                conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+                evicted += len(victims)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            # BEGIN itself fails when the database is locked, leaving nothing to roll back
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.logger.error(f"Error evicting USDA cache entries: {str(e)}")
+            return 0
+
+        if evicted:
+            self._count('evictions', evicted)
+        return evicted
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        """Live entries; expired rows awaiting eviction are not counted."""
+        return self._connection().execute("SELECT COUNT(*) FROM cache WHERE expires_at > ?",
+                                          (time.time(),)).fetchone()[0]
+
+
+def default_cache() -> CacheBackend:
+    """SQLite cache at $USDA_CACHE_PATH (default data/usda_cache.db)."""
+    return SQLiteCache(os.getenv("USDA_CACHE_PATH", DEFAULT_CACHE_PATH))
@@ -0,0 +1,100 @@
+# tests/test_batch_pipeline.py
+
+import os
+import sys
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.batch_pipeline import BatchBackend, BatchGenerationPipeline, LocalBatchBackend, result_content
+from tests.test_generation_engine import FakeChatClient, make_users, meal_plan
+
+class FailingBackend(LocalBatchBackend):
+    """Local backend whose batches fail outright."""
+
+    def status(self, batch_id):
+        return "failed"
+
+@pytest.mark.parametrize("mode, rounds", [("guided", 1), ("agentic", 2)])
+def test_batch_rounds_and_output_order(tmp_path, mode, rounds):
+    client = FakeChatClient()
+    backend = LocalBatchBackend(str(tmp_path / "batches"), client=client)
+    pipeline = BatchGenerationPipeline(mode, backend, work_dir=str(tmp_path / "work"), poll_interval=0)
+    output = tmp_path / "out.csv"
+    summary = pipeline.run(make_users(5), str(output))
+
+    assert summary == {'users': 5, 'succeeded': 5, 'failed': 0, 'rows': 25,
+                       'rounds': rounds, 'requests': 5 * rounds, 'failed_requests': 0, 'retries': 0}
+    assert len(client.prompts) == 5 * rounds
+    with open(output) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["user_id"] for row in rows] == [str(i) for i in range(5) for _ in range(5)]
+    assert rows[0]["meal_name"] == "20 Breakfast"
+
+    request_files = sorted(os.listdir(tmp_path / "work"))
+    assert len(request_files) == rounds
+    with open(tmp_path / "work" / request_files[0]) as f:
+        request = json.loads(f.readline())
+    assert request["url"] == "/v1/chat/completions"
+    assert request["body"]["model"] == "gpt-4"
+
+def test_identical_prompts_are_sent_once(tmp_path):
+    users = make_users(4)
+    users['age'] = 30
+    client = FakeChatClient()
+    backend = LocalBatchBackend(str(tmp_path / "batches"), client=client)
+    summary = BatchGenerationPipeline("unguided", backend, work_dir=str(tmp_path), poll_interval=0).run(
+        users, str(tmp_path / "out.csv"))
+
+    assert (summary['requests'], summary['succeeded']) == (1, 4)
+    assert len(client.prompts) == 1
+
+def test_failed_requests_and_batches(tmp_path):
+    client = FakeChatClient(replies={"21": "not a meal plan"})
+    original = client.create
+
+    def create(**kwargs):
+        if "Age: 22" in kwargs["messages"][0]["content"]:
+            raise RuntimeError("server error")
+        return original(**kwargs)
+    client.chat.completions.create = create
+
+    backend = LocalBatchBackend(str(tmp_path / "batches"), client=client)
+    summary = BatchGenerationPipeline("unguided", backend, work_dir=str(tmp_path), poll_interval=0).run(
+        make_users(4), str(tmp_path / "out.csv"))
+    # Both failing users are resubmitted until unguided's 3 attempts are used up
+    assert (summary['succeeded'], summary['failed'], summary['failed_requests']) == (2, 2, 3)
+    assert (summary['rounds'], summary['retries']) == (3, 4)
+    assert pd.read_csv(tmp_path / "out.csv")["user_id"].unique().tolist() == [0, 3]
+
+    failing = FailingBackend(str(tmp_path / "batches"), client=FakeChatClient())
+    summary = BatchGenerationPipeline("guided", failing, work_dir=str(tmp_path), poll_interval=0).run(
+        make_users(2), str(tmp_path / "out.csv"))
+    assert (summary['failed'], summary['rounds']) == (2, 1)
+
+def test_unusable_replies_are_resubmitted(tmp_path):
+    replies = iter(["not a meal plan", meal_plan("retry")])
+    client = FakeChatClient(replies={"21": lambda: next(replies)})
+    backend = LocalBatchBackend(str(tmp_path / "batches"), client=client)
+    summary = BatchGenerationPipeline("agentic", backend, work_dir=str(tmp_path), poll_interval=0).run(
+        make_users(2), str(tmp_path / "out.csv"))
+
+    assert (summary['succeeded'], summary['failed'], summary['retries']) == (2, 0, 1)
+    # Retry reruns both agentic steps for the one user under new keys
+    assert (summary['rounds'], summary['requests']) == (4, 6)
+    rows = pd.read_csv(tmp_path / "out.csv")
+    assert rows[rows["user_id"] == 1]["meal_name"].iloc[0] == "retry Breakfast"
+
+def test_result_content():
+    ok = {"custom_id": "a", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "hi"}}]}}}
+    assert result_content(ok) == "hi"
+    assert result_content({"custom_id": "a", "response": {"status_code": 429, "body": {}}}) is None
+    assert result_content({"custom_id": "a", "response": None, "error": {"message": "expired"}}) is None
+
+def test_backend_interface():
+    with pytest.raises(TypeError):
+        BatchBackend()
@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+import asyncio
+import threading
+import tempfile
+import pandas as pd
+from unittest.mock import patch, MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.cache_warmup import mine_food_names, split_ingredients, split_meal_name, warm_cache_async
+from services.usda_nutrition.usda_async import AsyncUSDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+
+def fake_response(url, params=None, timeout=None, remaining='900'):
+    response = MagicMock(status_code=200, headers={'X-RateLimit-Remaining': remaining})
+    if url.endswith('/foods/search'):
+        foods = [] if params['query'] == 'Mystery Stew' else [{'fdcId': 1000 + len(params['query'])}]
+        response.json.return_value = {'foods': foods}
+    else:
+        ids = params['fdcIds'].split(',')
+        response.json.return_value = [{'fdcId': int(fdc_id), 'foodNutrients': [
+            {'nutrient': {'id': 1003, 'unitName': 'g'}, 'amount': 1.0}]} for fdc_id in ids]
+    return response
+
+
+class TestCacheWarmup(unittest.TestCase):
+    """Test case for mining food names and pre-populating the USDA cache."""
+
+    def test_splitting(self):
+        """Test that meal names and ingredient lists split into plain food names."""
+        self.assertEqual(split_meal_name("Gluten-free Grilled Fish with Quinoa and Steamed Vegetables"),
+                         ["Grilled Fish", "Quinoa", "Steamed Vegetables"])
+        self.assertEqual(split_meal_name("Fried Rice w/ Egg"), ["Fried Rice", "Egg"])
+        self.assertEqual(split_meal_name("Taco Plate (3 tacos)"), ["Taco Plate"])
+        self.assertEqual(split_ingredients("chicken breast (150g), 1 cup brown rice; 2 tbsp olive oil"),
+                         ["chicken breast", "brown rice", "olive oil"])
+
+    def test_mining_ranks_by_frequency(self):
+        """Test that names from outputs and meal logs are counted together across spellings."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pd.DataFrame({
+                'meal_name': ["Salmon with Brown Rice", "Oatmeal and Berries"],
+                'ingredients': ["salmon fillet (150g), brown rice", "oats, berries, honey"],
+            }).to_csv(os.path.join(tmp_dir, "outputs_guided.csv"), index=False)
+            log_path = os.path.join(tmp_dir, "meal_logs.csv")
+            pd.DataFrame({'meal_name': ["brown rice", "Berries"]}).to_csv(log_path, index=False)
+
+            ranked = dict(mine_food_names(os.path.join(tmp_dir, "outputs_*.csv"), [log_path]))
+
+        # Each name is reported under its most common spelling
+        self.assertEqual(ranked["brown rice"], 3)
+        self.assertEqual(ranked["Berries"], 3)
+        self.assertEqual(ranked["salmon fillet"], 1)
+        self.assertEqual(sorted(list(ranked)[:2]), ["Berries", "brown rice"])
+
+    def test_default_sources(self):
+        """Test that the checked-in outputs and meal logs yield a ranked name list."""
+        ranked = mine_food_names()
+        self.assertGreater(len(ranked), 20)
+        counts = [count for _, count in ranked]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+    @patch('requests.Session.get')
+    def test_warm_up_fills_cache(self, mock_get):
+        """Test that warm-up caches found names and skips names already cached."""
+        mock_get.side_effect = fake_response
+        cache = MemoryCache()
+        cache.set("nutrition_Oats", [{'Nutrient': 'Protein', 'Value': 13.0, 'Unit': 'g'}])
+        reads = []
+        cache_get = cache.get
+        cache.get = lambda key: reads.append((key, threading.current_thread())) or cache_get(key)
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=cache, rate_per_second=None) as client:
+                return await warm_cache_async(["Brown Rice", "Oats", "Mystery Stew", "Berries"], client, batch_size=2)
+        summary = asyncio.run(run())
+
+        self.assertEqual(summary, {'requested': 4, 'already_cached': 1, 'warmed': 2, 'not_found': 1, 'skipped': 0})
+        nutrition_reads = [key for key, _ in reads if key.startswith("nutrition_")]
+        self.assertEqual(len(nutrition_reads), len(set(nutrition_reads)))
+        self.assertNotIn(threading.current_thread(), [thread for _, thread in reads])
+        self.assertIsNotNone(cache.get("nutrition_Brown Rice"))
+        self.assertIsNotNone(cache.get("nutrition_Berries"))
+
+    @patch('requests.Session.get')
+    def test_warm_up_stops_at_quota_reserve(self, mock_get):
+        """Test that warm-up leaves the reserved hourly quota for live traffic."""
+        mock_get.side_effect = lambda url, params=None, timeout=None: fake_response(url, params, timeout, remaining='40')
+        cache = MemoryCache()
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=cache, rate_per_second=None) as client:
+                return await warm_cache_async(["Brown Rice", "Oats", "Berries", "Salmon"], client,
+                                              batch_size=2, quota_reserve=50)
+        summary = asyncio.run(run())
+
+        self.assertEqual(summary['warmed'], 2)
+        self.assertEqual(summary['skipped'], 2)
+        self.assertIsNone(cache.get("nutrition_Salmon"))
+
+if __name__ == '__main__':
+    unittest.main()
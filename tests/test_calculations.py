@@ -2,12 +2,33 @@
 
 import os
 import sys
+import random
+import numpy as np
 import pandas as pd
 
 # Make sure the root project directory is in sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from services.nutrition_calculation.calculations import process_user_row
+from services.nutrition_calculation.calculations import (
+    process_user_row,
+    compute_nutrition_targets_batch,
+    load_merged_inputs,
+    TARGET_COLUMNS,
+    _round_like_python,
+    select_macro_split,
+    goal_calorie_multiplier,
+    MACRO_STRATEGIES,
+    DEFAULT_MACROS,
+)
+
+def _reference_targets(merged_df):
+    """Run the per-row reference implementation over a merged frame"""
+    results = []
+    for _, row in merged_df.iterrows():
+        result = process_user_row(row, row)
+        if result:
+            results.append(result)
+    return pd.DataFrame(results, columns=TARGET_COLUMNS)
 
 def test_nutrition_calculation_for_one_user():
     # Paths
@@ -47,5 +68,78 @@ def test_nutrition_calculation_for_one_user():
     else:
         print("\n⚠️ Failed to calculate nutrition targets for user.")
 
+def test_batch_engine_matches_per_row_on_dataset():
+    merged_df = load_merged_inputs("data/users.csv", "data/user_preferences.csv")
+
+    expected = _reference_targets(merged_df)
+    actual = compute_nutrition_targets_batch(merged_df)
+
+    assert actual.to_csv(index=False) == expected.to_csv(index=False)
+
+def test_batch_engine_matches_per_row_on_edge_cases():
+    merged_df = pd.DataFrame([
+        # DOB takes precedence over age
+        {'id': 1, 'sex': 'Female', 'weight_kg': 61.3, 'height_cm': 158.0, 'activity_level': 'Sedentary',
+         'exercise_frequency_per_week': 1, 'age': 30, 'date_of_birth': '1990-05-17', 'body_fat_percent': 31.5,
+         'health_conditions': "['Diabetes', 'hypertension']", 'goal_type': "['lose_weight']", 'motivation': 'health'},
+        # Unknown activity level, bare goal string, estimated body fat
+        {'id': 2, 'sex': 'male', 'weight_kg': 90.0, 'height_cm': 181.0, 'activity_level': 'Super Active',
+         'exercise_frequency_per_week': 6, 'age': 25, 'date_of_birth': '', 'body_fat_percent': 0,
+         'health_conditions': 'none', 'goal_type': 'muscle_gain', 'motivation': 'appearance'},
+        # Unparseable DOB -> skipped
+        {'id': 3, 'sex': 'male', 'weight_kg': 80.0, 'height_cm': 175.0, 'activity_level': 'Very Active',
+         'exercise_frequency_per_week': 4, 'age': 40, 'date_of_birth': 'not-a-date', 'body_fat_percent': None,
+         'health_conditions': "['heart_disease']", 'goal_type': "['longevity']", 'motivation': 'energy'},
+        # Missing sex -> skipped
+        {'id': 4, 'sex': '', 'weight_kg': 70.0, 'height_cm': 170.0, 'activity_level': 'Sedentary',
+         'exercise_frequency_per_week': 2, 'age': 35, 'date_of_birth': None, 'body_fat_percent': None,
+         'health_conditions': 'none', 'goal_type': 'longevity', 'motivation': 'energy'},
+        # Non-string goal -> skipped
+        {'id': 6, 'sex': 'male', 'weight_kg': 70.0, 'height_cm': 170.0, 'activity_level': 'Sedentary',
+         'exercise_frequency_per_week': 2, 'age': 35, 'date_of_birth': '', 'body_fat_percent': None,
+         'health_conditions': 'none', 'goal_type': '[1, 2]', 'motivation': 'energy'},
+        # Non-numeric weight -> skipped
+        {'id': 5, 'sex': 'female', 'weight_kg': 'heavy', 'height_cm': 165.0, 'activity_level': 'Sedentary',
+         'exercise_frequency_per_week': 2, 'age': 35, 'date_of_birth': None, 'body_fat_percent': None,
+         'health_conditions': 'none', 'goal_type': 'longevity', 'motivation': 'energy'},
+    ])
+
+    expected = _reference_targets(merged_df)
+    actual = compute_nutrition_targets_batch(merged_df)
+
+    assert list(actual['user_id']) == [1, 2]
+    assert actual.to_csv(index=False) == expected.to_csv(index=False)
+
+def test_strategy_lookup_matches_linear_scan():
+    def scan_macro_split(health_conditions, goals):
+        for value in list(health_conditions) + list(goals):
+            if value.lower() in MACRO_STRATEGIES:
+                return MACRO_STRATEGIES[value.lower()]
+        return DEFAULT_MACROS
+
+    def scan_multiplier(goals):
+        goals = [g.lower() for g in goals]
+        if 'lose_weight' in goals:
+            return 0.85
+        if 'gain_weight' in goals or 'muscle_gain' in goals:
+            return 1.15
+        return 1.0
+
+    values = list(MACRO_STRATEGIES) + ['none', 'Diabetes', 'LOSE_WEIGHT', 'longevity']
+    combos = [[]] + [[v] for v in values] + [[a, b] for a in values for b in values]
+    for conditions in combos:
+        for goals in combos:
+            assert dict(select_macro_split(conditions, goals)) == scan_macro_split(conditions, goals)
+            assert goal_calorie_multiplier(goals) == scan_multiplier(goals)
+
+def test_round_like_python_matches_builtin_round():
+    rng = random.Random(0)
+    values = [rng.uniform(0, 5000) for _ in range(20000)]
+    values += [k / 1000 for k in range(0, 100000, 5)]  # many exact .xx5 ties
+
+    rounded = _round_like_python(np.array(values))
+
+    assert [float(v) for v in rounded] == [round(v, 2) for v in values]
+
 if __name__ == "__main__":
     test_nutrition_calculation_for_one_user()
@@ -0,0 +1,90 @@
+# tests/test_checkpoint.py
+
+import os
+import sys
+import csv
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generate_meal_recommendations import generate_meal_recommendations
+from tests.test_generation_engine import FakeChatClient
+
+class Crash(BaseException):
+    """Stands in for a kill or an unrecoverable error mid-run."""
+
+class CrashingClient(FakeChatClient):
+    def __init__(self, crash_at):
+        super().__init__()
+        self.crash_at = crash_at
+
+    def create(self, **kwargs):
+        if len(self.prompts) == self.crash_at:
+            raise Crash()
+        return super().create(**kwargs)
+
+def write_inputs(tmp_path, n_users):
+    users_path, prefs_path = tmp_path / "users.csv", tmp_path / "prefs.csv"
+    with open(users_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "email", "age", "sex", "weight_kg", "height_cm",
+                         "activity_level", "exercise_frequency_per_week"])
+        for i in range(n_users):
+            writer.writerow([str(i), "x", "x@example.com", 20 + i, "female", 70, 170, "Moderately Active", 3])
+    with open(prefs_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "health_conditions", "goal_type", "motivation",
+                         "dietary_restrictions", "preferred_cuisines"])
+        for i in range(n_users):
+            writer.writerow([str(i), "none", "weight_loss", "energy", "none", "Italian"])
+    return dict(users_path=str(users_path), preferences_path=str(prefs_path),
+                meals_path=str(tmp_path / "meals.csv"), totals_path=str(tmp_path / "totals.csv"))
+
+def test_resume_skips_finished_users(tmp_path):
+    paths = write_inputs(tmp_path, 6)
+    with pytest.raises(Crash):
+        generate_meal_recommendations(client=CrashingClient(crash_at=4), **paths)
+
+    # Rows of an interrupted user that never reached the journal
+    with open(paths["meals_path"], 'a') as f:
+        f.write("4,breakfast,Half written")
+
+    client = FakeChatClient()
+    assert generate_meal_recommendations(resume=True, client=client, **paths) == 2
+    assert len(client.prompts) == 2
+
+    meals = pd.read_csv(paths["meals_path"])
+    totals = pd.read_csv(paths["totals_path"])
+    assert meals["user_id"].tolist() == [i for i in range(6) for _ in range(5)]
+    assert totals["user_id"].tolist() == list(range(6))
+    assert totals["total_calories"].tolist() == [2000.0] * 6
+
+def test_without_resume_starts_over(tmp_path):
+    paths = write_inputs(tmp_path, 3)
+    generate_meal_recommendations(client=FakeChatClient(), **paths)
+    client = FakeChatClient()
+    assert generate_meal_recommendations(client=client, **paths) == 3
+    assert len(client.prompts) == 3
+    assert pd.read_csv(paths["totals_path"])["user_id"].tolist() == [0, 1, 2]
+
+    # Resuming a finished run makes no calls
+    client = FakeChatClient()
+    assert generate_meal_recommendations(resume=True, client=client, **paths) == 0
+    assert client.prompts == []
+    assert len(pd.read_csv(paths["meals_path"])) == 15
+
+def test_resume_with_missing_output_starts_over(tmp_path):
+    paths = write_inputs(tmp_path, 3)
+    with pytest.raises(Crash):
+        generate_meal_recommendations(client=CrashingClient(crash_at=2), **paths)
+    os.remove(paths["totals_path"])
+
+    client = FakeChatClient()
+    assert generate_meal_recommendations(resume=True, client=client, **paths) == 3
+    assert len(client.prompts) == 3
+    meals = pd.read_csv(paths["meals_path"])
+    totals = pd.read_csv(paths["totals_path"])
+    assert meals["user_id"].tolist() == [i for i in range(3) for _ in range(5)]
+    assert totals["user_id"].tolist() == [0, 1, 2]
@@ -0,0 +1,87 @@
+# tests/test_cohorts.py
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.cohorts import assign_cohorts, cohort_representatives, cuisine_key, scale_portions
+from services.ai.cohorts import generate_cohort_plans
+from services.ai.generation_engine import GenerationEngine
+from tests.test_generation_engine import FakeChatClient, make_users
+
+def cohort_users():
+    users = make_users(6)
+    users['optimal_calories'] = [2010.0, 2090.0, 2240.0, 2610.0, 2030.0, 2060.0]
+    users['protein_g'] = users['optimal_calories'] * 0.30 / 4
+    users['carbs_g'] = users['optimal_calories'] * 0.45 / 4
+    users['fat_g'] = users['optimal_calories'] * 0.25 / 9
+    users['preferred_cuisines'] = ["Italian; Japanese", "Japanese; Italian", "Italian", "Italian; Japanese",
+                                   "Italian; Japanese", "Italian; Japanese"]
+    users.loc[4, 'dietary_restrictions'] = "vegan"
+    return users
+
+def test_cuisine_key():
+    assert cuisine_key("Japanese; Italian", "set") == cuisine_key(" italian;Japanese ", "set") == "italian;japanese"
+    assert cuisine_key("Japanese; Italian") == "japanese"
+    assert cuisine_key("Japanese; Italian", "any") == cuisine_key(float("nan")) == "any"
+    with pytest.raises(ValueError):
+        cuisine_key("Italian", "first")
+
+def test_assign_cohorts():
+    cohorts = assign_cohorts(cohort_users())
+    # Users 0, 2 and 5 share calories bucket, split, goals, restriction and first cuisine
+    assert cohorts['cohort_id'].tolist() == [0, 1, 0, 2, 3, 0]
+    # With full cuisine sets users 0, 1 and 5 group instead
+    assert assign_cohorts(cohort_users(), cuisines="set")['cohort_id'].tolist() == [0, 0, 1, 2, 3, 0]
+    assert cohorts.loc[0, 'calorie_bucket'] == 2125.0
+    assert cohorts.loc[0, ['protein_share', 'carbs_share', 'fat_share']].tolist() == [0.3, 0.45, 0.25]
+    assert assign_cohorts(cohort_users(), cuisines="any")['cohort_id'].nunique() == 3
+
+    users = cohort_users()
+    users.loc[5, ['goals', 'goal_type']] = ["['muscle_gain']", "muscle_gain"]
+    assert assign_cohorts(users)['cohort_id'].tolist() == [0, 1, 0, 2, 3, 4]
+
+    reps = cohort_representatives(cohorts)
+    assert len(reps) == 4
+    assert reps.loc[0, 'optimal_calories'] == 2125.0
+    assert reps.loc[0, 'protein_g'] == pytest.approx(2125.0 * 0.30 / 4, abs=0.1)
+    assert reps.loc[0, 'age'] == 25  # user 5 is closest to the cohort's mean calories
+
+def test_scale_portions_hits_reachable_targets():
+    meal_macros = np.array([
+        [400, 30, 45, 12],
+        [200, 10, 25, 7],
+        [600, 45, 60, 20],
+        [250, 8, 30, 11],
+        [550, 40, 50, 21],
+    ], dtype=float)
+    true_factors = np.array([[1.1, 0.9, 1.2, 1.0, 1.05], [0.8, 0.8, 0.8, 0.8, 0.8]])
+    targets = true_factors @ meal_macros
+
+    factors = scale_portions(meal_macros, targets, smoothing=1e-6)
+    np.testing.assert_allclose(factors @ meal_macros, targets, rtol=1e-3)
+
+    clipped = scale_portions(meal_macros, meal_macros.sum(axis=0) * 5)
+    assert clipped.max() == 2.0
+
+def test_pipeline_reports_avoided_calls_and_error(tmp_path):
+    client = FakeChatClient()
+    engine = GenerationEngine("guided", client=client, workers=2)
+    output = tmp_path / "cohorts.csv"
+    report = generate_cohort_plans(cohort_users(), engine, str(output))
+
+    assert (report['users'], report['cohorts'], report['llm_calls'], report['llm_calls_avoided']) == (6, 4, 4, 2)
+    assert len(client.prompts) == 4
+    assert report['scaled_calories_mean_error_pct'] < report['unscaled_calories_mean_error_pct']
+    assert report['scaled_calories_max_error_pct'] < 5.0
+
+    rows = pd.read_csv(output)
+    assert rows['user_id'].unique().tolist() == [0, 1, 2, 3, 4, 5]
+    assert set(rows['mode']) == {"cohort_guided"}
+    user_totals = rows.groupby('user_id')['calories'].sum()
+    assert user_totals[3] == pytest.approx(2610.0, rel=0.05)
@@ -0,0 +1,70 @@
+# tests/test_columnar.py
+
+import os
+import sys
+import time
+import pandas as pd
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.calculations import (
+    compute_nutrition_targets_batch,
+    generate_nutrition_targets,
+    load_merged_inputs,
+)
+from services.nutrition_calculation.columnar import (
+    write_columnar_targets,
+    read_columnar_targets,
+    load_nutrition_targets,
+)
+
+def _as_plain(df):
+    return df.astype({col: object for col in ['health_conditions', 'goals', 'motivation']})
+
+def test_columnar_round_trip_matches_csv(tmp_path):
+    targets = compute_nutrition_targets_batch(load_merged_inputs("data/users.csv", "data/user_preferences.csv"))
+    csv_path = tmp_path / "targets.csv"
+    npz_path = tmp_path / "targets.npz"
+    targets.to_csv(csv_path, index=False)
+    write_columnar_targets(targets, npz_path)
+
+    from_csv = pd.read_csv(csv_path, dtype={'user_id': str})
+    from_npz = read_columnar_targets(npz_path)
+
+    assert isinstance(from_npz['goals'].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(_as_plain(from_npz), _as_plain(from_csv), check_dtype=False)
+    assert list(from_npz['user_id']) == list(from_csv['user_id'])
+
+def test_loader_ignores_stale_columnar_copy(tmp_path):
+    csv_path = tmp_path / "targets.csv"
+    npz_path = tmp_path / "targets.npz"
+    targets = pd.read_csv("data/user_nutrition_targets.csv").head(3)
+    write_columnar_targets(targets, npz_path)
+    time.sleep(0.01)
+    targets.head(2).to_csv(csv_path, index=False)
+    os.utime(npz_path, (0, 0))
+
+    assert len(load_nutrition_targets(str(csv_path))) == 2
+
+    os.utime(npz_path, None)
+    assert len(load_nutrition_targets(str(csv_path))) == 3
+
+def test_driver_writes_csv_and_columnar_copy(tmp_path):
+    csv_path = tmp_path / "targets.csv"
+    generate_nutrition_targets(engine="batch", output_path=str(csv_path), columnar=True)
+
+    from_csv = pd.read_csv(csv_path, dtype={'user_id': str})
+    from_npz = read_columnar_targets(tmp_path / "targets.npz")
+    pd.testing.assert_frame_equal(_as_plain(from_npz), _as_plain(from_csv), check_dtype=False)
+
+def test_loader_uses_explicit_columnar_path(tmp_path):
+    csv_path = tmp_path / "targets.csv"
+    npz_path = tmp_path / "copies" / "custom.npz"
+    npz_path.parent.mkdir()
+    targets = pd.read_csv("data/user_nutrition_targets.csv").head(3)
+    targets.head(2).to_csv(csv_path, index=False)
+    write_columnar_targets(targets, npz_path)
+
+    assert len(load_nutrition_targets(str(csv_path))) == 2
+    assert len(load_nutrition_targets(str(csv_path), columnar_path=str(npz_path))) == 3
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+from unittest.mock import patch
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.fdc_index import LocalFDCIndex, build_fdc_index, tokenize
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+FIXTURE_DIR = os.path.join("data", "test data", "fdc_sample")
+FIXTURE_JSON = os.path.join(FIXTURE_DIR, "fdc_sample_foods.json")
+FIXTURE_CSV = os.path.join(FIXTURE_DIR, "csv")
+
+
+class TestLocalFDCIndex(unittest.TestCase):
+    """Test case for the offline FoodData Central index."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, "index")
+        build_fdc_index([FIXTURE_JSON], self.index_dir)
+        self.index = LocalFDCIndex(self.index_dir)
+
+        with open(FIXTURE_JSON) as f:
+            exports = json.load(f)
+        self.fixture_foods = {food['fdcId']: food for foods in exports.values() for food in foods}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_details_match_export(self):
+        """Test that every food round-trips with its nutrients, names and units."""
+        self.assertEqual(len(self.index), len(self.fixture_foods))
+        for fdc_id, food in self.fixture_foods.items():
+            details = self.index.food_details(str(fdc_id))
+            self.assertEqual(details['description'], food['description'])
+            self.assertEqual(details['dataType'], food['dataType'])
+            expected = {n['nutrient']['id']: (n['nutrient']['unitName'], n['amount']) for n in food['foodNutrients']}
+            actual = {n['nutrient']['id']: (n['nutrient']['unitName'], n['amount']) for n in details['foodNutrients']}
+            self.assertEqual(actual.keys(), expected.keys())
+            for nutrient_id, (unit, amount) in expected.items():
+                self.assertEqual(actual[nutrient_id][0], unit)
+                self.assertAlmostEqual(actual[nutrient_id][1], amount, places=4)
+        self.assertIsNone(self.index.food_details(999))
+
+    def test_csv_export_builds_the_same_index(self):
+        """Test that the CSV download and the JSON export produce identical indexes."""
+        csv_dir = os.path.join(self.tmp_dir.name, "csv_index")
+        build_fdc_index([FIXTURE_CSV], csv_dir)
+        for name in ['fdc_ids', 'descriptions', 'data_types', 'nutrient_ids', 'nutrient_units',
+                     'amounts', 'vocabulary', 'postings_offsets', 'postings']:
+            np.testing.assert_array_equal(np.load(os.path.join(csv_dir, f"{name}.npy")),
+                                          np.load(os.path.join(self.index_dir, f"{name}.npy")))
+
+    def test_search_ranking(self):
+        """Test that more matched tokens, then shorter descriptions, rank first."""
+        results = self.index.search('Chicken Breasts', page_size=3)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all({'chicken', 'breast'} <= set(tokenize(r['description'])) for r in results))
+        # "Chicken, breast, boneless, skinless, raw" is the most specific match
+        self.assertEqual(results[0]['fdcId'], 2346404)
+        self.assertEqual(self.index.search('brown rice')[0]['fdcId'], 168878)
+        self.assertEqual(self.index.search('eggs')[0]['fdcId'], 748967)
+        self.assertEqual(self.index.search('quinoa'), [])
+
+    @patch('requests.Session.get')
+    def test_client_offline_mode(self, mock_get):
+        """Test that the client answers from the index without touching the API or cache."""
+        cache = MemoryCache()
+        client = USDAApiClient(cache=cache, local_index=self.index)
+
+        info = {row['Nutrient']: row['Value'] for row in client.get_nutrition_info('broccoli')}
+        self.assertAlmostEqual(info['Protein'], 2.82, places=4)
+        self.assertAlmostEqual(info['Vitamin C'], 89.2, places=4)
+        self.assertEqual(client.search_food('salmon')[0]['fdcId'], 175167)
+        self.assertEqual(client.get_food_details_many([173944, 999])['999'], None)
+
+        mock_get.assert_not_called()
+        self.assertEqual(len(cache), 0)
+
+    @patch('services.usda_nutrition.usda_api.default_cache')
+    def test_offline_mode_skips_sqlite_cache(self, mock_default_cache):
+        """Test that a client with a local index does not open the shared SQLite cache."""
+        client = USDAApiClient(local_index=self.index)
+        mock_default_cache.assert_not_called()
+        self.assertIsInstance(client.cache, MemoryCache)
+
+if __name__ == '__main__':
+    unittest.main()
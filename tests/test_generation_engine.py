@@ -0,0 +1,119 @@
+# tests/test_generation_engine.py
+
+import os
+import sys
+import re
+import csv
+import time
+import random
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import GenerationEngine, GenerationMode, get_mode
+
+MEAL_TYPES = ["Breakfast", "Morning Snack", "Lunch", "Evening Snack", "Dinner"]
+
+def meal_plan(tag, n_meals=5):
+    return "\n\n".join(
+        f"{meal_type}:\nMeal Name: {tag} {meal_type}\nIngredients: oats, milk\n"
+        f"Macros: 400 kcal, 30g protein, 45g carbs, 12g fats\nShort Rationale: fits {tag}"
+        for meal_type in MEAL_TYPES[:n_meals]
+    )
+
+class FakeChatClient:
+    """Stands in for OpenAI: replies with a meal plan naming the user, after a random delay."""
+
+    def __init__(self, latency=0.0, replies=None):
+        self.latency = latency
+        self.replies = replies or {}
+        self.prompts = []
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature, max_tokens=None, **kwargs):
+        prompt = messages[0]["content"]
+        with self.lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(random.uniform(0, self.latency))
+        with self.lock:
+            self.active -= 1
+        age = re.search(r"(?:Age: |Targets for )(\d+)", prompt).group(1)
+        if "Dinner" not in prompt:
+            return reply_with(f"Targets for {age}")
+        reply = self.replies.get(age, meal_plan(age))
+        return reply_with(reply() if callable(reply) else reply)
+
+def reply_with(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def make_users(n):
+    return pd.DataFrame({
+        "user_id": [str(i) for i in range(n)],
+        "age": [20 + i for i in range(n)],
+        "sex": "female", "weight_kg": 70.0, "height_cm": 170.0,
+        "activity_level": "Moderately Active", "exercise_frequency_per_week": 3,
+        "health_conditions": "['none']", "goal_type": "weight_loss", "goals": "['weight_loss']",
+        "motivation": "energy", "dietary_restrictions": "None", "preferred_cuisines": "Any",
+        "optimal_calories": 2000.0, "protein_g": 150.0, "carbs_g": 200.0, "fat_g": 60.0, "ibw_kg": 65.0,
+    })
+
+@pytest.mark.parametrize("mode", ["guided", "unguided", "partial_guided", "agentic"])
+def test_rows_written_in_input_order(tmp_path, mode):
+    client = FakeChatClient(latency=0.02)
+    engine = GenerationEngine(mode, client=client, workers=8)
+    output = tmp_path / "out.csv"
+    summary = engine.run(make_users(20), str(output))
+
+    assert summary == {'users': 20, 'succeeded': 20, 'failed': 0, 'rows': 100}
+    with open(output) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["user_id"] for row in rows] == [str(i) for i in range(20) for _ in range(5)]
+    assert {row["mode"] for row in rows} == {mode}
+    assert rows[0]["meal_name"] == "20 Breakfast"
+    assert float(rows[0]["calories"]) == 400.0
+    assert client.max_active > 1
+
+def test_agentic_feeds_reasoning_into_meal_prompt():
+    client = FakeChatClient()
+    engine = GenerationEngine("agentic", client=client, workers=1)
+    rows = engine.generate_for_user(make_users(1).iloc[0])
+
+    assert len(rows) == 5
+    assert len(client.prompts) == 2
+    assert "Targets for 20" in client.prompts[1]
+
+def test_retries_until_enough_meals():
+    replies = iter([meal_plan("short", 3), meal_plan("full")])
+    client = FakeChatClient(replies={"20": lambda: next(replies)})
+    engine = GenerationEngine("unguided", client=client, workers=1)
+    rows = engine.generate_for_user(make_users(1).iloc[0])
+
+    assert len(client.prompts) == 2
+    assert rows[0]["meal_name"] == "full Breakfast"
+
+def test_failed_users_are_counted_and_skipped(tmp_path):
+    client = FakeChatClient(replies={"21": "not a meal plan"})
+    engine = GenerationEngine("unguided", client=client, workers=4)
+    output = tmp_path / "out.csv"
+    summary = engine.run(make_users(3), str(output))
+
+    assert summary == {'users': 3, 'succeeded': 2, 'failed': 1, 'rows': 10}
+    assert len(client.prompts) == 5  # 1 + 3 attempts + 1
+    assert pd.read_csv(output)["user_id"].unique().tolist() == [0, 2]
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        get_mode("freestyle")
+
+def test_generation_mode_is_abstract():
+    with pytest.raises(TypeError):
+        GenerationMode("custom")
@@ -0,0 +1,65 @@
+# tests/test_incremental.py
+
+import os
+import sys
+import pandas as pd
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.calculations import compute_nutrition_targets_batch, load_merged_inputs
+from services.nutrition_calculation.incremental import (
+    update_nutrition_targets_incremental,
+    default_fingerprints_path,
+)
+
+def _copy_inputs(tmp_path):
+    users_path = tmp_path / "users.csv"
+    preferences_path = tmp_path / "user_preferences.csv"
+    pd.read_csv("data/users.csv").to_csv(users_path, index=False)
+    pd.read_csv("data/user_preferences.csv").to_csv(preferences_path, index=False)
+    return users_path, preferences_path
+
+def test_only_changed_users_are_recomputed(tmp_path):
+    users_path, preferences_path = _copy_inputs(tmp_path)
+    output_path = tmp_path / "targets.csv"
+
+    first = update_nutrition_targets_incremental(users_path, preferences_path, output_path)
+    assert first['recomputed'] == first['total'] == 2000
+    assert os.path.exists(default_fingerprints_path(str(output_path)))
+
+    users_df = pd.read_csv(users_path)
+    prefs_df = pd.read_csv(preferences_path)
+    users_df.loc[users_df['id'] == 10, 'weight_kg'] += 5
+    prefs_df.loc[prefs_df['user_id'] == 20, 'goal_type'] = 'muscle_gain'
+    users_df = users_df[users_df['id'] != 30]
+    users_df.to_csv(users_path, index=False)
+    prefs_df.to_csv(preferences_path, index=False)
+
+    second = update_nutrition_targets_incremental(users_path, preferences_path, output_path)
+
+    assert second == {'total': 1999, 'recomputed': 2, 'unchanged': 1997, 'removed': 1}
+    expected = compute_nutrition_targets_batch(load_merged_inputs(users_path, preferences_path))
+    assert output_path.read_text() == expected.to_csv(index=False)
+
+    third = update_nutrition_targets_incremental(users_path, preferences_path, output_path)
+    assert third['recomputed'] == 0
+
+def test_age_rollover_triggers_recompute(tmp_path):
+    users_path, preferences_path = _copy_inputs(tmp_path)
+    users_df = pd.read_csv(users_path).head(5)
+    users_df['date_of_birth'] = '1990-01-01'
+    users_df.to_csv(users_path, index=False)
+    output_path = tmp_path / "targets.csv"
+
+    update_nutrition_targets_incremental(users_path, preferences_path, output_path)
+
+    # Pretend one user's targets were computed when they were a year younger
+    fingerprints_path = default_fingerprints_path(str(output_path))
+    stored = pd.read_csv(fingerprints_path, dtype={'fingerprint': 'uint64'})
+    stored.loc[stored['user_id'] == 3, 'age'] -= 1
+    stored.to_csv(fingerprints_path, index=False)
+
+    summary = update_nutrition_targets_incremental(users_path, preferences_path, output_path)
+
+    assert summary['recomputed'] == 1
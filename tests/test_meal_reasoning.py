@@ -3,6 +3,7 @@ import os
 import sys
 import pytest
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from services.ai.response_cache import LLMResponseCache
 from utils.meal_reasoning import reason_meal_components_and_servings
 
 def test_reasoning_response_format():
@@ -17,7 +18,9 @@ def test_reasoning_response_format():
     meal_name = "Grilled chicken with rice and salad"
     meal_type = "Lunch"
 
-    result = reason_meal_components_and_servings(meal_name, meal_type, user_profile)
+    # In-memory cache so the test never touches data/llm_cache.db
+    result = reason_meal_components_and_servings(meal_name, meal_type, user_profile,
+                                                response_cache=LLMResponseCache())
 
     assert isinstance(result, list)
     assert len(result) > 0
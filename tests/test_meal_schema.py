@@ -0,0 +1,111 @@
+# tests/test_meal_schema.py
+
+import os
+import sys
+import csv
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.batch_pipeline import BatchGenerationPipeline, LocalBatchBackend
+from services.ai.generate_meal_recommendations import generate_meal_recommendations
+from services.ai.generation_engine import GenerationEngine
+from services.ai.guardrails_manager import GuardrailsManager
+from services.ai.meal_schema import parse_meal_plan_json, response_format_for, structured_instructions
+from tests.test_checkpoint import write_inputs
+from tests.test_generation_engine import FakeChatClient, make_users
+
+MEAL_TYPES = ["breakfast", "morning_snack", "lunch", "evening_snack", "dinner"]
+
+def json_meal(tag, meal_type, calories=400):
+    return {
+        "meal_type": meal_type,
+        "meal_name": f"{tag} {meal_type}",
+        "ingredients": ["60 g oats", "200 ml milk"],
+        "macros": {"calories": calories, "protein_g": 30, "carbs_g": 45, "fats_g": 12},
+        "rationale": f"fits {tag}",
+    }
+
+def json_plan(tag, n_meals=5):
+    return json.dumps({"meals": [json_meal(tag, meal_type) for meal_type in MEAL_TYPES[:n_meals]]})
+
+def test_parse_valid_plan():
+    meals = parse_meal_plan_json(json_plan("a"))
+    assert [meal["meal_type"] for meal in meals] == MEAL_TYPES
+    assert meals[0] == {"meal_type": "breakfast", "meal_name": "a breakfast", "ingredients": "60 g oats, 200 ml milk",
+                        "calories": 400.0, "protein_g": 30.0, "carbs_g": 45.0, "fats_g": 12.0, "rationale": "fits a"}
+
+def test_parse_salvages_valid_meals_without_fallback_macros():
+    plan = json.loads(json_plan("a"))
+    plan["meals"][1]["macros"].pop("fats_g")
+    plan["meals"][2]["macros"]["calories"] = -50
+    plan["meals"][3]["meal_type"] = "brunch"
+    plan["meals"].insert(0, dict(json_meal("a", "breakfast"), meal_name="  "))
+    meals = parse_meal_plan_json(json.dumps(plan))
+    assert [meal["meal_type"] for meal in meals] == ["breakfast", "dinner"]
+    assert all(meal["calories"] == 400.0 for meal in meals)
+
+def test_parse_code_fence_and_garbage():
+    assert len(parse_meal_plan_json("```json\n" + json_plan("a") + "\n```")) == 5
+    assert parse_meal_plan_json("Breakfast:\nMeal Name: oats") == []
+    assert parse_meal_plan_json('{"meals": "none"}') == []
+    assert parse_meal_plan_json("") == []
+
+def test_guardrails_redact_structured_fields():
+    plan = json.loads(json_plan("a", 1))
+    plan["meals"][0]["rationale"] = "password: hunter2hunter2"
+    meals = GuardrailsManager().sanitize_and_validate_structured_output(json.dumps(plan))
+    assert meals[0]["rationale"] == "[REDACTED]"
+
+def test_response_format_by_model():
+    strict = response_format_for("gpt-4o-mini")
+    assert strict["type"] == "json_schema" and strict["json_schema"]["strict"]
+    assert strict["json_schema"]["schema"]["additionalProperties"] is False
+    schema_text = json.dumps(strict["json_schema"]["schema"])
+    assert "minLength" not in schema_text and "minimum" not in schema_text
+    assert response_format_for("gpt-4-turbo", "targets") == {"type": "json_object"}
+    assert response_format_for("gpt-4") is None
+    assert '"reasoning"' in structured_instructions("targets")
+
+def test_engine_structured_mode():
+    users = make_users(3)
+    client = FakeChatClient(replies={"20": json_plan("x")[:-2], "21": json_plan("y"), "22": json_plan("z", 2)})
+    engine = GenerationEngine("unguided", client=client, workers=2, structured=True)
+    results = [engine.generate_for_user(user) for _, user in users.iterrows()]
+
+    assert results[0] is None  # truncated JSON on every attempt
+    assert results[1][0]["meal_type"] == "breakfast" and len(results[1]) == 5
+    assert results[2] is None  # valid JSON, but too few meals
+    assert all(prompt.endswith(structured_instructions("meal_plan")) for prompt in client.prompts)
+
+def test_agentic_requests_targets_schema():
+    captured = []
+    client = FakeChatClient(replies={"20": json_plan("a")})
+    create = client.create
+    client.chat.completions.create = lambda **request: captured.append(request) or create(**request)
+    engine = GenerationEngine("agentic", client=client, workers=1, model="gpt-4o", structured=True)
+    rows = engine.generate_for_user(make_users(1).iloc[0])
+
+    assert len(rows) == 5
+    names = [request["response_format"]["json_schema"]["name"] for request in captured]
+    assert names == ["targets", "meal_plan"]
+
+def test_batch_pipeline_structured(tmp_path):
+    users = make_users(2)
+    client = FakeChatClient(replies={"20": json_plan("a"), "21": json_plan("b")})
+    pipeline = BatchGenerationPipeline("unguided", LocalBatchBackend(str(tmp_path / "batches"), client), model="gpt-4o",
+                                       work_dir=str(tmp_path), poll_interval=0, structured=True)
+    summary = pipeline.run(users, str(tmp_path / "out.csv"))
+    assert (summary['succeeded'], summary['rows']) == (2, 10)
+
+def test_full_day_structured(tmp_path):
+    paths = write_inputs(tmp_path, 2)
+    plan = json.loads(json_plan("a"))
+    plan["meals"].reverse()
+    client = FakeChatClient(replies={"20": json.dumps(plan), "21": json_plan("b", 3)})
+    assert generate_meal_recommendations(client=client, structured=True, **paths) == 2
+
+    with open(paths["meals_path"]) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["meal_type"] for row in rows[:5]] == MEAL_TYPES[::-1]
+    assert len(rows) == 8
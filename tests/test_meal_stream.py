@@ -0,0 +1,120 @@
+# tests/test_meal_stream.py
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import GenerationEngine
+from services.ai.meal_stream import IncrementalMealParser, InvalidMealBlock, StreamingChatClient
+from services.ai.rate_limiter import LLMRateLimiter
+from tests.test_generation_engine import FakeChatClient, make_users, meal_plan
+
+BAD_BLOCK = "Lunch:\nMeal Name: Mystery\nMacros: 400 kcal"
+
+class FakeStream:
+    def __init__(self, text, chunk_size=7):
+        self.pieces = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        self.sent = 0
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            self.sent += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))], usage=None)
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=len(self.pieces)))
+
+    def close(self):
+        self.closed = True
+
+class StreamingFakeClient:
+    """Streams queued replies in small chunks."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        assert request["stream"] is True
+        stream = FakeStream(self.replies.pop(0))
+        self.streams.append(stream)
+        return stream
+
+def test_parser_matches_split():
+    text = "Here is your plan:\n\n" + meal_plan("a") + "\n\nEnjoy!"
+    parser = IncrementalMealParser()
+    blocks = []
+    for i in range(0, len(text), 5):
+        blocks.extend(parser.feed(text[i:i + 5]))
+    blocks.extend(parser.finish())
+    assert blocks == text.split('\n\n')
+
+def test_meals_emitted_as_blocks_complete():
+    emitted = []
+    client = StreamingFakeClient(["Here is your plan:\n\n" + meal_plan("a")])
+    streaming = StreamingChatClient(client, on_meal=emitted.append)
+    response = streaming.chat.completions.create(model="gpt-4", messages=[], temperature=0.7, max_tokens=1200)
+
+    assert response.choices[0].message.content.endswith("fits a")
+    assert response.usage.total_tokens == len(client.streams[0].pieces)
+    assert [meal["meal_name"] for meal in emitted] == [f"a {t}" for t in
+                                                       ["Breakfast", "Morning Snack", "Lunch", "Evening Snack", "Dinner"]]
+    stats = streaming.get_stats()
+    assert (stats['streams'], stats['meals'], stats['aborted']) == (1, 5, 0)
+    assert client.streams[0].closed
+
+def test_invalid_block_aborts_stream():
+    reply = meal_plan("a", 2) + "\n\n" + BAD_BLOCK + "\n\n" + meal_plan("b", 2)
+    client = StreamingFakeClient([reply])
+    streaming = StreamingChatClient(client)
+    with pytest.raises(InvalidMealBlock):
+        streaming.chat.completions.create(model="gpt-4", messages=[], temperature=0.7)
+
+    stream = client.streams[0]
+    assert stream.closed
+    assert stream.sent < len(stream.pieces)
+    assert streaming.get_stats()['chars_received'] < len(reply)
+
+def test_engine_retries_after_early_abort():
+    users = make_users(1)
+    bad = meal_plan("bad", 1) + "\n\n" + BAD_BLOCK + "\n\n" + meal_plan("bad", 4)
+    client = StreamingFakeClient([bad, meal_plan("good")])
+    engine = GenerationEngine("unguided", client=client, workers=1, stream=True,
+                              rate_limiter=LLMRateLimiter(rpm=1000, tpm=1_000_000))
+    rows = engine.generate_for_user(users.iloc[0])
+
+    assert [row["meal_name"] for row in rows][:2] == ["good Breakfast", "good Morning Snack"]
+    assert len(client.streams) == 2
+    assert engine.stream_client.get_stats()['aborted'] == 1
+
+def test_agentic_reasoning_streams_without_meals():
+    client = StreamingFakeClient(["Calories: 2000\n\nProtein: 150 g", meal_plan("a")])
+    engine = GenerationEngine("agentic", client=client, workers=1, stream=True)
+    rows = engine.generate_for_user(make_users(1).iloc[0])
+    assert len(rows) == 5
+    assert engine.stream_client.get_stats()['streams_with_meals'] == 1
+
+def test_agentic_reasoning_mentioning_macros_is_not_checked():
+    reasoning = "Calories: 2000\n\nMacros: protein 150 g, carbs 200 g, fats 60 g"
+    client = StreamingFakeClient([reasoning, meal_plan("a")])
+    engine = GenerationEngine("agentic", client=client, workers=1, stream=True)
+    rows = engine.generate_for_user(make_users(1).iloc[0])
+
+    assert len(rows) == 5
+    assert len(client.streams) == 2
+    assert engine.stream_client.get_stats()['aborted'] == 0
+
+def test_guided_keeps_partial_plan_when_streaming():
+    reply = meal_plan("a", 2) + "\n\n" + BAD_BLOCK + "\n\n" + meal_plan("b", 2)
+    streamed = GenerationEngine("guided", client=StreamingFakeClient([reply]), workers=1, stream=True)
+    plain = GenerationEngine("guided", client=FakeChatClient(replies={"20": reply}), workers=1)
+    user = make_users(1).iloc[0]
+
+    streamed_rows = streamed.generate_for_user(user)
+    assert streamed_rows == plain.generate_for_user(user)
+    assert len(streamed_rows) == 4
+    assert streamed.stream_client.get_stats()['aborted'] == 0
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.name_matching import FoodNameMatcher, normalize_food_name
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+
+def fake_response(url, params=None, timeout=None):
+    response = MagicMock(status_code=200, headers={})
+    if url.endswith('/foods/search'):
+        response.json.return_value = {'foods': [{'fdcId': 1000 + len(params['query'])}]}
+    else:
+        fdc_id = int(url.rsplit('/', 1)[1])
+        response.json.return_value = {
+            'fdcId': fdc_id,
+            'foodNutrients': [{'nutrient': {'id': 1003, 'unitName': 'g'}, 'amount': fdc_id / 100}]
+        }
+    return response
+
+
+class TestFoodNameMatcher(unittest.TestCase):
+    """Test case for food-name normalization and approximate matching."""
+
+    def test_normalization(self):
+        """Test that case, order, punctuation, plurals and stop words do not matter."""
+        key = normalize_food_name("Grilled Chicken Breast")
+        self.assertEqual(key, "breast chicken grilled")
+        for variant in ["grilled chicken breast ", "chicken breast, grilled",
+                        "Grilled chicken breasts", "1 piece of grilled chicken breast"]:
+            self.assertEqual(normalize_food_name(variant), key)
+
+    def test_fuzzy_matches_respect_threshold(self):
+        """Test that spelling variants match and different foods do not."""
+        matcher = FoodNameMatcher()
+        matcher.add("broccoli", 170379)
+        matcher.add("salmon fillet", 175167)
+        matcher.add("sweet potato", 168482)
+        matcher.add("whole milk", 171265)
+
+        self.assertEqual(matcher.resolve("Brocoli"), 170379)
+        self.assertEqual(matcher.resolve("salmon filet"), 175167)
+        self.assertIsNone(matcher.resolve("potato"))
+        self.assertIsNone(matcher.resolve("skim milk"))
+        self.assertIsNone(matcher.resolve(""))
+
+        strict = FoodNameMatcher(threshold=1.0)
+        strict.add("broccoli", 170379)
+        self.assertIsNone(strict.resolve("brocoli"))
+
+        stats = matcher.get_stats()
+        self.assertEqual((stats['lookups'], stats['fuzzy_hits'], stats['misses']), (5, 2, 3))
+        self.assertAlmostEqual(stats['hit_rate'], 0.4)
+
+    def test_added_or_missing_word_never_matches(self):
+        """Test that a dish differing by one word is not taken for the same food."""
+        for known, query in [("black bean soup", "black beans"), ("black bean dip", "black beans"),
+                             ("kidney bean chili", "kidney beans"), ("mixed vegetable soup", "mixed vegetables"),
+                             ("lean ground beef", "ground beef"), ("black beans", "black bean soup"),
+                             ("black bean soup", "black bear soup")]:
+            matcher = FoodNameMatcher()
+            matcher.add(known, 1)
+            self.assertIsNone(matcher.match(query), f"{query!r} matched {known!r}")
+
+        matcher = FoodNameMatcher()
+        matcher.add("kidney bean chili", 1)
+        self.assertEqual(matcher.resolve("Chili, kidny beans"), 1)
+
+    @patch('requests.Session.get')
+    def test_client_skips_search_for_near_duplicates(self, mock_get):
+        """Test that near-duplicate names reuse the first search result."""
+        mock_get.side_effect = fake_response
+        client = USDAApiClient(cache=MemoryCache())
+
+        first = client.get_nutrition_info("Grilled Chicken Breast")
+        for name in ["grilled chicken breast ", "chicken breast, grilled", "Grilled chiken breast"]:
+            self.assertEqual(client.get_nutrition_info(name), first)
+
+        searches = [call for call in mock_get.call_args_list if call.args[0].endswith('/foods/search')]
+        self.assertEqual(len(searches), 1)
+        stats = client.match_stats()
+        self.assertEqual((stats['exact_hits'], stats['fuzzy_hits'], stats['misses']), (2, 1, 1))
+
+    @patch('requests.Session.get')
+    def test_resolutions_persist_in_cache(self, mock_get):
+        """Test that a new client finds names resolved by an earlier one through the cache."""
+        mock_get.side_effect = fake_response
+        cache = MemoryCache()
+        USDAApiClient(cache=cache).get_nutrition_info("brown rice")
+
+        client = USDAApiClient(cache=cache)
+        client.get_nutrition_info("Rice, brown")
+
+        searches = [call for call in mock_get.call_args_list if call.args[0].endswith('/foods/search')]
+        self.assertEqual(len(searches), 1)
+        self.assertEqual(client.match_stats()['exact_hits'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
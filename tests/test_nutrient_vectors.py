@@ -0,0 +1,106 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.fdc_index import LocalFDCIndex, build_fdc_index
+from services.usda_nutrition.nutrient_vectors import (
+    NUTRIENT_INDEX,
+    food_vector,
+    meal_vector,
+    scale_vectors,
+    sum_by_group,
+    unit_factor,
+    vector_to_nutrients,
+)
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
+
+FIXTURE_JSON = os.path.join("data", "test data", "fdc_sample", "fdc_sample_foods.json")
+
+
+class TestNutrientVectors(unittest.TestCase):
+    """Test case for the dense nutrient-vector representation."""
+
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE_JSON) as f:
+            exports = json.load(f)
+        cls.foods = [food for foods in exports.values() for food in foods]
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        build_fdc_index([FIXTURE_JSON], cls.tmp_dir.name)
+        cls.index = LocalFDCIndex(cls.tmp_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_vector_matches_extract_nutrients(self):
+        """Test that vectors hold the same values extract_nutrients reports."""
+        client = USDAApiClient(cache=MemoryCache())
+        for food in self.foods:
+            expected = {name: data['value'] for name, data in client.extract_nutrients(food).items() if data['value']}
+            actual = {name: data['value'] for name, data in vector_to_nutrients(food_vector(food)).items()}
+            self.assertEqual(actual.keys(), expected.keys())
+            for name, value in expected.items():
+                self.assertAlmostEqual(actual[name], value, places=4)
+
+    def test_units_are_normalized(self):
+        """Test that amounts in other units are converted to the canonical unit."""
+        food = {'foodNutrients': [
+            {'nutrient': {'id': 1093, 'unitName': 'g'}, 'amount': 0.5},
+            {'nutrient': {'id': 1114, 'unitName': 'IU'}, 'amount': 40},
+            {'nutrient': {'id': 1008, 'unitName': 'kJ'}, 'amount': 418.4},
+            {'nutrient': {'id': 1106, 'unitName': 'IU'}, 'amount': 100},
+        ]}
+        vector = food_vector(food)
+        self.assertAlmostEqual(vector[NUTRIENT_INDEX[1093]], 500.0, places=3)
+        self.assertAlmostEqual(vector[NUTRIENT_INDEX[1114]], 1.0, places=5)
+        self.assertAlmostEqual(vector[NUTRIENT_INDEX[1008]], 100.0, places=3)
+        # Vitamin A IU has no fixed conversion and is left out
+        self.assertEqual(vector[NUTRIENT_INDEX[1106]], 0.0)
+        self.assertIsNone(unit_factor('IU', 'µg', 1106))
+
+    def test_index_vectors_match_details(self):
+        """Test that the index's gathered vectors equal vectors built from its details."""
+        fdc_ids = [food['fdcId'] for food in self.foods]
+        vectors = self.index.food_vectors(fdc_ids + [999])
+        for row, fdc_id in enumerate(fdc_ids):
+            np.testing.assert_allclose(vectors[row], food_vector(self.index.food_details(fdc_id)), rtol=1e-6)
+        self.assertTrue(np.isnan(vectors[-1]).all())
+
+    def test_local_lookups_leave_cache_alone(self):
+        """Test that local-index vector lookups do not record resolved names in the cache."""
+        cache = MemoryCache()
+        client = USDAApiClient(cache=cache, local_index=self.index)
+        self.assertIsNotNone(client.get_nutrient_vector('brown rice'))
+        self.assertEqual(len(cache), 0)
+
+    def test_meal_and_day_aggregation(self):
+        """Test portion scaling and grouped sums against per-nutrient arithmetic."""
+        client = USDAApiClient(cache=MemoryCache(), local_index=self.index)
+        chicken = client.get_nutrient_vector('chicken breast roasted')
+        rice = client.get_nutrient_vector('brown rice')
+        broccoli = client.get_nutrient_vector('broccoli')
+        ingredients = np.vstack([chicken, rice, broccoli, rice, broccoli])
+        grams = np.array([150, 200, 80, 100, 120])
+
+        portions = scale_vectors(ingredients, grams)
+        protein = NUTRIENT_INDEX[1003]
+        self.assertAlmostEqual(portions[0, protein], 31.02 * 1.5, places=3)
+
+        meals, meal_totals = sum_by_group(portions, ['lunch', 'lunch', 'lunch', 'dinner', 'dinner'])
+        self.assertEqual(list(meals), ['lunch', 'dinner'])
+        np.testing.assert_allclose(meal_totals[0], meal_vector(ingredients[:3], grams[:3]), rtol=1e-5)
+        self.assertAlmostEqual(meal_totals[1, protein], 2.74 + 2.82 * 1.2, places=3)
+
+        days, day_totals = sum_by_group(meal_totals, ['2024-01-01', '2024-01-01'])
+        np.testing.assert_allclose(day_totals[0], portions.sum(axis=0), rtol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+# tests/test_parallel.py
+
+import os
+import sys
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.calculations import compute_nutrition_targets_batch, load_merged_inputs
+from services.nutrition_calculation.parallel import (
+    compute_nutrition_targets_parallel,
+    generate_nutrition_targets_parallel,
+)
+
+users_path = "data/users.csv"
+preferences_path = "data/user_preferences.csv"
+
+def test_parallel_results_keep_user_order():
+    merged_df = load_merged_inputs(users_path, preferences_path)
+    expected = compute_nutrition_targets_batch(merged_df).to_csv(index=False)
+
+    for engine in ("batch", "rows"):
+        actual = compute_nutrition_targets_parallel(merged_df, workers=2, engine=engine, shards=5)
+        assert actual.to_csv(index=False) == expected
+
+def test_parallel_pipeline_writes_same_file_as_single_process(tmp_path):
+    output_path = tmp_path / "targets.csv"
+    merged_df = load_merged_inputs(users_path, preferences_path)
+
+    total = generate_nutrition_targets_parallel(users_path, preferences_path, output_path,
+                                                workers=2, chunksize=300)
+
+    expected = compute_nutrition_targets_batch(merged_df)
+    assert total == len(expected)
+    assert output_path.read_text() == expected.to_csv(index=False)
@@ -0,0 +1,29 @@
+# tests/test_parsers.py
+
+import os
+import sys
+import pytest
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.parsers import legacy_parse_list_field, parse_list_literal
+
+@pytest.mark.parametrize("raw_value", [
+    "none", "heart disease", "pre-diabetes", "weight_loss", "True", "None",
+    "['none']", "['diabetes', 'hypertension']", '["a", \'b\']', "['a',]", "[]", "[ ]",
+    "[\"it's\"]", "['a' 'b']", "['a\\nb']", "[1, 2]", "5", "1.5", "'quoted'",
+    " none", "none ", "('a', 'b')", "", "[", float("nan"), None, 3,
+])
+def test_fast_parser_matches_literal_eval(raw_value):
+    expected = legacy_parse_list_field(raw_value)
+    actual = parse_list_literal(raw_value)
+
+    assert actual == expected
+    assert [type(item) for item in actual] == [type(item) for item in expected]
+
+def test_memoized_results_are_independent_lists():
+    first = parse_list_literal("['diabetes', 'hypertension']")
+    first.append('mutated')
+
+    assert parse_list_literal("['diabetes', 'hypertension']") == ['diabetes', 'hypertension']
@@ -0,0 +1,84 @@
+# tests/test_profile_store.py
+
+import os
+import sys
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import FIXED_USER_IDS, load_generation_users
+from services.profile_store.profile_store import ProfileStore, compile_profile_store
+
+def _lookup_in_worker(args):
+    store_dir, user_id = args
+    return ProfileStore(store_dir).get(user_id)['email']
+
+def test_profile_lookup_matches_source_files(tmp_path):
+    store_dir = str(tmp_path / "store")
+    count = compile_profile_store(store_dir=store_dir)
+    store = ProfileStore(store_dir)
+
+    users_df = pd.read_csv("data/users.csv", dtype={'id': str}).set_index('id')
+    prefs_df = pd.read_csv("data/user_preferences.csv", dtype={'user_id': str}).set_index('user_id')
+    targets_df = pd.read_csv("data/user_nutrition_targets.csv", dtype={'user_id': str}).set_index('user_id')
+
+    assert count == len(store) == len(users_df)
+    for user_id in ['1', '66', '1324', '2000']:
+        profile = store.get(user_id)
+        assert profile['name'] == users_df.loc[user_id, 'name']
+        assert profile['weight_kg'] == users_df.loc[user_id, 'weight_kg']
+        assert profile['preferred_cuisines'] == prefs_df.loc[user_id, 'preferred_cuisines']
+        assert profile['optimal_calories'] == targets_df.loc[user_id, 'optimal_calories']
+
+    assert store.get(66) == store.get('66')
+    assert store.get('not-a-user') is None
+    assert '2001' not in store
+
+def test_store_is_readable_from_worker_processes(tmp_path):
+    store_dir = str(tmp_path / "store")
+    compile_profile_store(store_dir=store_dir)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        emails = list(executor.map(_lookup_in_worker, [(store_dir, '1'), (store_dir, '2')]))
+
+    assert emails == ['johnsonjames@example.com', 'tuckertiffany@example.net']
+
+def test_profile_fills_meal_recommendation_prompt(tmp_path):
+    store_dir = str(tmp_path / "store")
+    compile_profile_store(store_dir=store_dir)
+    profile = ProfileStore(store_dir).get('1')
+
+    users_df = pd.read_csv("data/users.csv", dtype={'id': str}).set_index('id')
+    prefs_df = pd.read_csv("data/user_preferences.csv", dtype={'user_id': str}).set_index('user_id')
+    with open("services/prompts/meal_recommendation_prompt.txt") as f:
+        prompt = f.read().format(**profile)
+
+    assert f"{users_df.loc['1', 'weight_kg']}" in prompt
+    assert prefs_df.loc['1', 'dietary_restrictions'] in prompt
+    assert prefs_df.loc['1', 'preferred_cuisines'] in prompt
+
+def test_generation_users_from_store_match_csv(tmp_path):
+    store_dir = str(tmp_path / "store")
+    compile_profile_store(store_dir=store_dir)
+
+    for user_ids in (FIXED_USER_IDS, None):
+        from_csv = load_generation_users(user_ids=user_ids, profile_store_dir=None)
+        from_store = load_generation_users(user_ids=user_ids, profile_store_dir=store_dir)
+        pd.testing.assert_frame_equal(from_store, from_csv, check_like=True)
+
+def test_generation_users_fall_back_to_csv_when_store_is_stale(tmp_path):
+    store_dir = str(tmp_path / "store")
+    users_path = str(tmp_path / "users.csv")
+    shutil.copy("data/users.csv", users_path)
+    compile_profile_store(users_path=users_path, store_dir=store_dir)
+
+    users_df = pd.read_csv(users_path)
+    users_df.loc[users_df['id'] == 66, 'age'] = 99
+    users_df.to_csv(users_path, index=False)
+    os.utime(os.path.join(store_dir, "meta.json"), (0, 0))
+
+    users = load_generation_users(users_path=users_path, user_ids=['66'], profile_store_dir=store_dir)
+    assert users.loc[0, 'age'] == 99
@@ -0,0 +1,129 @@
+# tests/test_rate_limiter.py
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import GenerationEngine
+from services.ai.rate_limiter import (
+    LLMRateLimiter,
+    RateLimitedClient,
+    estimate_request_tokens,
+    parse_duration,
+)
+from tests.test_generation_engine import FakeChatClient, make_users
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    with patch('services.ai.rate_limiter.sleep', clock.sleep):
+        yield clock
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, headers):
+        super().__init__("Rate limit reached")
+        self.response = SimpleNamespace(headers=headers)
+
+class HeaderClient:
+    """Fake OpenAI client exposing with_raw_response, failing with 429s first."""
+
+    def __init__(self, headers, failures=0, total_tokens=100):
+        self.headers = headers
+        self.failures = failures
+        self.total_tokens = total_tokens
+        self.calls = 0
+        raw = SimpleNamespace(create=self.raw_create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=raw, create=None))
+
+    def raw_create(self, **request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimitError({"retry-after": "7"})
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))],
+                                   usage=SimpleNamespace(total_tokens=self.total_tokens))
+        return SimpleNamespace(headers=self.headers, parse=lambda: response)
+
+def test_token_estimates_and_durations():
+    request = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 500}
+    assert estimate_request_tokens(request) == 101 + 4 + 500
+    assert estimate_request_tokens({"messages": []}) == 1000
+    assert parse_duration("6m0s") == 360.0
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("2") == 2.0
+    assert parse_duration(None) is None
+
+def test_request_and_token_budgets(clock):
+    limiter = LLMRateLimiter(rpm=2, tpm=1000, clock=clock)
+    limiter.acquire(10)
+    limiter.acquire(10)
+    assert clock.sleeps == []
+    limiter.acquire(10)
+    assert sum(clock.sleeps) == pytest.approx(30.0)
+
+    limiter = LLMRateLimiter(rpm=100, tpm=1000, clock=clock)
+    clock.sleeps.clear()
+    limiter.acquire(600)
+    limiter.acquire(600)
+    assert sum(clock.sleeps) == pytest.approx(12.0)
+
+    # Unused reservation goes back to the budget
+    limiter.record_usage(600, 100)
+    limiter.acquire(500)
+    assert sum(clock.sleeps) == pytest.approx(12.0)
+
+def test_headers_lower_budgets(clock):
+    limiter = LLMRateLimiter(rpm=500, tpm=10_000, clock=clock)
+    limiter.update_from_headers({"x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0",
+                                 "x-ratelimit-limit-tokens": "40000", "x-ratelimit-remaining-tokens": "39000"})
+    assert (limiter.requests.per_minute, limiter.tokens.per_minute) == (60.0, 40000.0)
+    assert limiter.tokens.level == 10_000
+    limiter.acquire(10)
+    assert sum(clock.sleeps) == pytest.approx(1.0)
+
+def test_rate_limited_client_retries_429(clock):
+    limiter = LLMRateLimiter(rpm=500, tpm=10_000, clock=clock)
+    client = HeaderClient({"x-ratelimit-remaining-requests": "499"}, failures=2)
+    limited = RateLimitedClient(client, limiter)
+
+    response = limited.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "hi"}],
+                                               temperature=0.7, max_tokens=100)
+    assert response.choices[0].message.content == "ok"
+    assert client.calls == 3
+    assert sum(clock.sleeps) == pytest.approx(14.0)
+    stats = limiter.get_stats()
+    assert (stats['requests'], stats['rate_limited'], stats['tokens_used']) == (3, 2, 100)
+
+    with pytest.raises(RateLimitError):
+        RateLimitedClient(HeaderClient({}, failures=10), limiter, max_rate_limit_retries=1).chat.completions.create(
+            model="gpt-4", messages=[], temperature=0.7)
+
+def test_engine_paces_all_workers(clock):
+    limiter = LLMRateLimiter(rpm=5, tpm=1_000_000, clock=clock)
+    client = FakeChatClient()
+    engine = GenerationEngine("guided", client=client, workers=4, rate_limiter=limiter)
+    summary = engine.run(make_users(8), os.devnull)
+
+    assert summary['succeeded'] == 8
+    assert limiter.get_stats()['requests'] == 8
+    # 5 requests fit the first minute, the other 3 are spaced 12s apart
+    assert sum(clock.sleeps) == pytest.approx(36.0)
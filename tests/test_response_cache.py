@@ -0,0 +1,151 @@
+# tests/test_response_cache.py
+
+import os
+import sys
+import json
+import time
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.generation_engine import GenerationEngine
+from services.ai.response_cache import LLMResponseCache, default_response_cache, response_key
+from services.usda_nutrition.usda_cache import MemoryCache, SQLiteCache
+from tests.test_generation_engine import FakeChatClient, make_users, meal_plan
+
+class CountingClient:
+    """Returns a numbered reply per call so cached and fresh replies can be told apart."""
+
+    def __init__(self, content=None, latency=0.0):
+        self.content = content
+        self.latency = latency
+        self.requests = []
+        self.lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        with self.lock:
+            self.requests.append(request)
+            number = len(self.requests)
+        time.sleep(self.latency)
+        content = self.content if self.content is not None else f"reply {number}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def ask(cache, client, prompt="Plan my meals", temperature=0.7, **kwargs):
+    return cache.complete(client, "gpt-4", [{"role": "user", "content": prompt}], temperature, 1200, **kwargs)
+
+def test_key_covers_model_temperature_and_prompt():
+    messages = [{"role": "user", "content": "Plan my meals"}]
+    key = response_key("gpt-4", messages, 0.7, 1200)
+    assert key == response_key("gpt-4", [{"role": "user", "content": "  Plan my meals   \n"}], 0.7, 1200)
+    assert key != response_key("gpt-4o", messages, 0.7, 1200)
+    assert key != response_key("gpt-4", messages, 0.5, 1200)
+    assert key != response_key("gpt-4", [{"role": "user", "content": "Plan my day"}], 0.7, 1200)
+    assert key != response_key("gpt-4", [{"role": "system", "content": "Plan my meals"}], 0.7, 1200)
+
+def test_replay_reuses_replies(tmp_path):
+    client = CountingClient()
+    cache = LLMResponseCache(SQLiteCache(str(tmp_path / "llm.db")))
+    assert ask(cache, client) == "reply 1"
+    assert ask(cache, client) == "reply 1"
+    assert ask(cache, client, temperature=0.5) == "reply 2"
+
+    # Persisted for the next process
+    assert ask(LLMResponseCache(SQLiteCache(str(tmp_path / "llm.db"))), client) == "reply 1"
+    assert len(client.requests) == 2
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['api_calls']) == (1, 2, 2)
+
+def test_modes():
+    client = CountingClient()
+    deterministic = LLMResponseCache(mode="deterministic", seed=7)
+    ask(deterministic, client)
+    assert (client.requests[-1]["temperature"], client.requests[-1]["seed"]) == (0, 7)
+    assert ask(deterministic, client, temperature=0.9) == "reply 1"
+
+    off = LLMResponseCache(mode="off")
+    assert [ask(off, client), ask(off, client)] == ["reply 2", "reply 3"]
+
+    backend = MemoryCache()
+    ask(LLMResponseCache(backend), client)
+    assert ask(LLMResponseCache(backend, mode="refresh"), client) == "reply 5"
+    assert ask(LLMResponseCache(backend), client) == "reply 5"
+
+    with pytest.raises(ValueError):
+        LLMResponseCache(mode="sometimes")
+
+def test_default_cache_is_opt_in(tmp_path, monkeypatch):
+    path = tmp_path / "llm_cache.db"
+    monkeypatch.setenv("LLM_CACHE_PATH", str(path))
+    monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+    client = CountingClient()
+    off = default_response_cache()
+    assert off.mode == "off"
+    assert [ask(off, client), ask(off, client)] == ["reply 1", "reply 2"]
+    assert not path.exists()
+
+    monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+    assert default_response_cache().mode == "replay"
+    assert path.exists()
+
+def test_ttl_and_validation():
+    client = CountingClient()
+    cache = LLMResponseCache(MemoryCache(), ttl=60)
+    ask(cache, client)
+    with patch('time.time', return_value=time.time() + 61):
+        assert ask(cache, client) == "reply 2"
+
+    strict = LLMResponseCache(MemoryCache())
+    assert ask(strict, client, validate=lambda text: text.startswith("[")) == "reply 3"
+    assert ask(strict, client, validate=lambda text: text.startswith("[")) == "reply 4"
+
+def test_concurrent_identical_prompts_share_one_call():
+    client = CountingClient(latency=0.1)
+    cache = LLMResponseCache()
+    threads = [threading.Thread(target=ask, args=(cache, client)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(client.requests) == 1
+    assert cache.get_stats()['coalesced'] == 7
+
+@pytest.mark.parametrize("mode, calls_per_user", [("guided", 1), ("agentic", 2)])
+def test_engine_second_run_is_free(tmp_path, mode, calls_per_user):
+    client = FakeChatClient()
+    cache = LLMResponseCache()
+    users = make_users(4)
+    first = GenerationEngine(mode, client=client, workers=2, response_cache=cache).run(users, str(tmp_path / "a.csv"))
+    second = GenerationEngine(mode, client=client, workers=2, response_cache=cache).run(users, str(tmp_path / "b.csv"))
+
+    assert first == second
+    assert len(client.prompts) == 4 * calls_per_user
+    assert (tmp_path / "a.csv").read_text() == (tmp_path / "b.csv").read_text()
+
+def test_engine_retry_bypasses_cached_bad_reply():
+    replies = iter([meal_plan("short", 3), meal_plan("full")])
+    client = FakeChatClient(replies={"20": lambda: next(replies)})
+    cache = LLMResponseCache()
+    engine = GenerationEngine("unguided", client=client, workers=1, response_cache=cache)
+    user = make_users(1).iloc[0]
+
+    assert engine.generate_for_user(user)[0]["meal_name"] == "full Breakfast"
+    assert engine.generate_for_user(user)[0]["meal_name"] == "full Breakfast"
+    assert len(client.prompts) == 2
+
+def test_meal_reasoning_uses_cache():
+    from utils.meal_reasoning import reason_meal_components_and_servings
+
+    breakdown = [{"component": "rice", "estimated_serving_qty": 1.0, "serving_unit": "cup"}]
+    client = CountingClient(content=json.dumps(breakdown))
+    cache = LLMResponseCache()
+    profile = {"age": 28, "sex": "male", "weight_kg": 72, "height_cm": 178, "activity_level": "Moderately Active"}
+    with patch('utils.meal_reasoning.client', client):
+        for _ in range(3):
+            assert reason_meal_components_and_servings("Rice bowl", "Lunch", profile, response_cache=cache) == breakdown
+    assert len(client.requests) == 1
+    assert client.requests[0]["temperature"] == 0.3
@@ -0,0 +1,59 @@
+# tests/test_streaming.py
+
+import os
+import sys
+import pandas as pd
+
+# Make sure the root project directory is in sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nutrition_calculation.calculations import compute_nutrition_targets_batch, load_merged_inputs
+from services.nutrition_calculation.streaming import generate_nutrition_targets_streaming, ids_are_sorted
+
+users_path = "data/users.csv"
+preferences_path = "data/user_preferences.csv"
+
+def _in_memory_targets():
+    return compute_nutrition_targets_batch(load_merged_inputs(users_path, preferences_path))
+
+def test_sorted_merge_join_matches_in_memory_output(tmp_path):
+    output_path = tmp_path / "targets.csv"
+
+    total = generate_nutrition_targets_streaming(users_path, preferences_path, output_path,
+                                                 chunksize=137, join="sorted")
+
+    expected = _in_memory_targets()
+    assert total == len(expected)
+    assert output_path.read_text() == expected.to_csv(index=False)
+
+def test_hash_join_handles_unsorted_inputs(tmp_path):
+    users_df = pd.read_csv(users_path).sample(frac=1.0, random_state=7)
+    prefs_df = pd.read_csv(preferences_path).sample(frac=1.0, random_state=11)
+    shuffled_users = tmp_path / "users.csv"
+    shuffled_prefs = tmp_path / "prefs.csv"
+    users_df.to_csv(shuffled_users, index=False)
+    prefs_df.to_csv(shuffled_prefs, index=False)
+    output_path = tmp_path / "targets.csv"
+
+    assert not ids_are_sorted(shuffled_users, 'id', chunksize=100)
+
+    total = generate_nutrition_targets_streaming(shuffled_users, shuffled_prefs, output_path,
+                                                 chunksize=250, join="auto", partitions=4)
+
+    expected = _in_memory_targets().sort_values('user_id').reset_index(drop=True)
+    actual = pd.read_csv(output_path).sort_values('user_id').reset_index(drop=True)
+    assert total == len(expected)
+    assert actual.to_csv(index=False) == expected.to_csv(index=False)
+
+def test_hash_join_matches_ids_spelled_differently(tmp_path):
+    users_df = pd.read_csv(users_path).head(50)
+    prefs_df = pd.read_csv(preferences_path).head(50)
+    prefs_df['user_id'] = prefs_df['user_id'].astype(float)  # written as 1.0, 2.0, ...
+    users_csv = tmp_path / "users.csv"
+    prefs_csv = tmp_path / "prefs.csv"
+    users_df.to_csv(users_csv, index=False)
+    prefs_df.to_csv(prefs_csv, index=False)
+
+    total = generate_nutrition_targets_streaming(users_csv, prefs_csv, tmp_path / "targets.csv",
+                                                 chunksize=7, join="hash", partitions=4)
+    assert total == 50
@@ -2,20 +2,23 @@ import unittest
 import sys
 import os
 import json
+import time
+import threading
 from unittest.mock import patch, MagicMock
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from modules.usda_api import USDAApiClient
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import MemoryCache
 
 class TestUSDAApiClient(unittest.TestCase):
     """Test case for the USDAApiClient module."""
     
     def setUp(self):
         """Set up test environment."""
-        # Initialize the API client
-        self.api_client = USDAApiClient()
+        # Initialize the API client with a private in-memory cache
+        self.api_client = USDAApiClient(cache=MemoryCache())
         
         # Define sample response data for mocking
         self.sample_search_response = {
@@ -73,7 +76,7 @@ class TestUSDAApiClient(unittest.TestCase):
             ]
         }
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_search_food(self, mock_get):
         """Test food search functionality."""
         # Set up the mock response
@@ -97,7 +100,7 @@ class TestUSDAApiClient(unittest.TestCase):
         self.assertIn('query', kwargs['params'])
         self.assertEqual(kwargs['params']['query'], 'chicken breast')
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_search_food_error(self, mock_get):
         """Test handling of search errors."""
         # Set up the mock response
@@ -112,7 +115,7 @@ class TestUSDAApiClient(unittest.TestCase):
         # Check that an empty list is returned on error
         self.assertEqual(results, [])
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_food_details(self, mock_get):
         """Test food details retrieval."""
         # Set up the mock response
@@ -134,7 +137,7 @@ class TestUSDAApiClient(unittest.TestCase):
         self.assertIn('123456', args[0])
         self.assertIn('api_key', kwargs['params'])
     
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_food_details_error(self, mock_get):
         """Test handling of food details errors."""
         # Set up the mock response
@@ -211,6 +214,113 @@ class TestUSDAApiClient(unittest.TestCase):
         
         # Check that an empty list is returned
         self.assertEqual(nutrition_info, [])
+    
+    @patch('requests.Session.get')
+    def test_get_food_details_many(self, mock_get):
+        """Test that uncached ids are fetched in chunks and cached per id."""
+        def multi_id_response(url, params=None, timeout=None):
+            response = MagicMock(status_code=200, headers={})
+            # Id 99 does not exist upstream and is left out of the response
+            response.json.return_value = [
+                {'fdcId': int(fdc_id), 'foodNutrients': []}
+                for fdc_id in params['fdcIds'].split(',') if fdc_id != '99'
+            ]
+            return response
+        mock_get.side_effect = multi_id_response
+        self.api_client.cache.set('details_5', {'fdcId': 5, 'foodNutrients': [], 'cached': True})
+        
+        fdc_ids = list(range(1, 46))
+        details = self.api_client.get_food_details_many(fdc_ids + [99, 1])
+        
+        # 44 uncached ids plus 99: three requests of at most 20 ids
+        self.assertEqual(mock_get.call_count, 3)
+        for call in mock_get.call_args_list:
+            self.assertTrue(call.args[0].endswith('/foods'))
+            self.assertNotIn('5', call.kwargs['params']['fdcIds'].split(','))
+            self.assertLessEqual(len(call.kwargs['params']['fdcIds'].split(',')), USDAApiClient.MAX_IDS_PER_REQUEST)
+        self.assertEqual(list(details), [str(fdc_id) for fdc_id in fdc_ids + [99]])
+        self.assertTrue(details['5']['cached'])
+        self.assertIsNone(details['99'])
+        
+        # Each fetched food is now served by get_food_details from the cache
+        self.assertEqual(self.api_client.get_food_details(12)['fdcId'], 12)
+        self.assertEqual(mock_get.call_count, 3)
+    
+    @patch('requests.Session.get')
+    def test_concurrent_duplicate_lookups_are_coalesced(self, mock_get):
+        """Test that threads looking up the same food share one upstream request each."""
+        def slow_response(url, params=None, timeout=None):
+            time.sleep(0.05)
+            response = MagicMock(status_code=200, headers={})
+            if url.endswith('/foods/search'):
+                response.json.return_value = self.sample_search_response
+            else:
+                response.json.return_value = self.sample_food_details
+            return response
+        mock_get.side_effect = slow_response
+        
+        barrier = threading.Barrier(8)
+        results = []
+        
+        def lookup():
+            barrier.wait()
+            results.append(self.api_client.get_nutrition_info('chicken breast'))
+        
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # One search and one details request for all eight callers
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result == results[0] and len(result) == 3 for result in results))
+        stats = self.api_client.coalesce_stats()
+        self.assertEqual(stats['executed'] + stats['coalesced'], 8 + 2)
+        self.assertGreaterEqual(stats['coalesced'], 1)
+    
+    @patch('services.usda_nutrition.usda_api.sleep')
+    @patch('requests.Session.get')
+    def test_retries_rate_limit_and_server_errors(self, mock_get, mock_sleep):
+        """Test that 429 and 5xx responses are retried, honoring Retry-After."""
+        rate_limited = MagicMock(status_code=429, headers={'Retry-After': '2'})
+        unavailable = MagicMock(status_code=503, headers={})
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = self.sample_food_details
+        mock_get.side_effect = [rate_limited, unavailable, ok]
+        
+        details = self.api_client.get_food_details('123456')
+        
+        self.assertEqual(details['fdcId'], 123456)
+        self.assertEqual(mock_get.call_count, 3)
+        # First wait comes from Retry-After, the second from the jittered backoff window
+        self.assertEqual(mock_sleep.call_args_list[0].args[0], 2.0)
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], self.api_client.backoff_base * 2)
+        self.assertIn('timeout', mock_get.call_args.kwargs)
+    
+    @patch('services.usda_nutrition.usda_api.sleep')
+    @patch('requests.Session.get')
+    def test_retries_are_bounded(self, mock_get, mock_sleep):
+        """Test that a persistently failing endpoint gives up after max_retries."""
+        mock_get.return_value = MagicMock(status_code=500, headers={}, text='Server Error')
+        
+        results = self.api_client.search_food('chicken breast')
+        
+        self.assertEqual(results, [])
+        self.assertEqual(mock_get.call_count, self.api_client.max_retries + 1)
+    
+    @patch('services.usda_nutrition.usda_api.sleep')
+    @patch('requests.Session.get')
+    def test_long_retry_after_is_not_waited_out(self, mock_get, mock_sleep):
+        """Test that a Retry-After beyond max_retry_after is not slept through."""
+        mock_get.return_value = MagicMock(status_code=429, headers={'Retry-After': '3600'}, text='Too Many Requests')
+        
+        results = self.api_client.search_food('chicken breast')
+        
+        self.assertEqual(results, [])
+        mock_get.assert_called_once()
+        mock_sleep.assert_not_called()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,206 @@
+import unittest
+import sys
+import os
+import time
+import asyncio
+import threading
+from unittest.mock import patch, MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_async import AsyncUSDAApiClient, TokenBucket
+from services.usda_nutrition.usda_cache import MemoryCache
+
+
+def fake_response(url, params=None, timeout=None):
+    """Search returns an id derived from the query; details return fixed nutrients."""
+    response = MagicMock(status_code=200, headers={})
+    if url.endswith('/foods/search'):
+        response.json.return_value = {'foods': [{'fdcId': 1000 + len(params['query'])}]}
+    elif url.endswith('/foods'):
+        response.json.return_value = [fake_food(int(fdc_id)) for fdc_id in params['fdcIds'].split(',')]
+    else:
+        response.json.return_value = fake_food(int(url.rsplit('/', 1)[1]))
+    return response
+
+
+def fake_food(fdc_id):
+    return {
+        'fdcId': fdc_id,
+        'foodNutrients': [{'nutrient': {'id': 1003, 'unitName': 'g'}, 'amount': fdc_id / 100}]
+    }
+
+
+class TestAsyncUSDAApiClient(unittest.TestCase):
+    """Test case for the AsyncUSDAApiClient module."""
+
+    def setUp(self):
+        self.cache = MemoryCache()
+        self.names = ['chicken breast', 'brown rice', 'broccoli', 'salmon', 'oats', 'chicken breast']
+
+    @patch('requests.Session.get')
+    def test_matches_sync_client(self, mock_get):
+        """Test that bulk async lookups return what the sync client returns."""
+        mock_get.side_effect = fake_response
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=None) as client:
+                return await client.get_nutrition_info_many(self.names)
+        results = asyncio.run(run())
+
+        sync_client = USDAApiClient(cache=MemoryCache())
+        self.assertEqual(list(results), list(dict.fromkeys(self.names)))
+        for name, info in results.items():
+            self.assertEqual(info, sync_client.get_nutrition_info(name))
+    
+    @patch('requests.Session.get')
+    def test_bulk_lookup_fetches_details_in_one_request(self, mock_get):
+        """Test that top-match details for a batch of names share multi-id requests."""
+        mock_get.side_effect = fake_response
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=None) as client:
+                return await client.get_nutrition_info_many(self.names)
+        results = asyncio.run(run())
+
+        urls = [call.args[0] for call in mock_get.call_args_list]
+        self.assertEqual(sum(url.endswith('/foods/search') for url in urls), 5)
+        self.assertEqual(sum(url.endswith('/foods') for url in urls), 1)
+        self.assertTrue(all(results.values()))
+
+    @patch('requests.Session.get')
+    def test_shares_cache_with_sync_client(self, mock_get):
+        """Test that results cached by the async client are served to the sync client."""
+        mock_get.side_effect = fake_response
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=None) as client:
+                return await client.get_nutrition_info_many(['oats'])
+        results = asyncio.run(run())
+        calls = mock_get.call_count
+
+        self.assertEqual(USDAApiClient(cache=self.cache).get_nutrition_info('oats'), results['oats'])
+        self.assertEqual(mock_get.call_count, calls)
+
+    @patch('requests.Session.get')
+    def test_concurrency_limit(self, mock_get):
+        """Test that no more than `concurrency` upstream requests are in flight."""
+        lock = threading.Lock()
+        in_flight = {'now': 0, 'max': 0}
+
+        def slow_response(url, params=None, timeout=None):
+            with lock:
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            time.sleep(0.02)
+            with lock:
+                in_flight['now'] -= 1
+            return fake_response(url, params, timeout)
+        mock_get.side_effect = slow_response
+
+        names = [f"food {i}" for i in range(20)]
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, concurrency=3, rate_per_second=None) as client:
+                return await client.get_nutrition_info_many(names)
+        results = asyncio.run(run())
+
+        self.assertEqual(len(results), 20)
+        self.assertGreater(in_flight['max'], 1)
+        self.assertLessEqual(in_flight['max'], 3)
+
+    @patch('requests.Session.get')
+    def test_concurrent_duplicate_lookups_are_coalesced(self, mock_get):
+        """Test that tasks looking up the same food at once share upstream requests."""
+        mock_get.side_effect = fake_response
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=None) as client:
+                results = await asyncio.gather(*(client.get_nutrition_info('brown rice') for _ in range(10)))
+                return results, client.coalesce_stats()
+        results, stats = asyncio.run(run())
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertTrue(all(result == results[0] and result for result in results))
+        self.assertEqual(stats['coalesced'], 9)
+
+    @patch('requests.Session.get')
+    def test_every_retry_takes_a_token(self, mock_get):
+        """Test that retried requests go through the token bucket again."""
+        unavailable = MagicMock(status_code=503, headers={})
+        replies = [unavailable, unavailable]
+        mock_get.side_effect = lambda url, params=None, timeout=None: (
+            replies.pop(0) if replies else fake_response(url, params, timeout))
+        acquired = []
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=1000, backoff_base=0.0) as client:
+                original = client.rate_limiter.acquire
+
+                async def counting_acquire(tokens=1.0):
+                    acquired.append(tokens)
+                    await original(tokens)
+                client.rate_limiter.acquire = counting_acquire
+                return await client.search_food('oats')
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(len(acquired), 3)
+
+    @patch('requests.Session.get')
+    def test_cache_io_stays_off_the_event_loop(self, mock_get):
+        """Test that cache reads and writes never run on the event loop thread."""
+        mock_get.side_effect = fake_response
+        threads = set()
+
+        class RecordingCache(MemoryCache):
+            def get(self, key):
+                threads.add(threading.get_ident())
+                return super().get(key)
+
+            def set(self, key, value, ttl=None, negative=False):
+                threads.add(threading.get_ident())
+                return super().set(key, value, ttl, negative)
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=RecordingCache(), rate_per_second=None) as client:
+                await client.get_nutrition_info_many(self.names)
+                await client.get_nutrition_info('kale')
+                return threading.get_ident()
+        loop_thread = asyncio.run(run())
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    @patch('requests.Session.get')
+    def test_cancelled_lookup_while_rate_limited_exits(self, mock_get):
+        """Test that leaving the client after a timeout does not wait for rate-limit tokens."""
+        mock_get.side_effect = fake_response
+        names = [f"food {i}" for i in range(8)]
+
+        async def run():
+            async with AsyncUSDAApiClient(cache=self.cache, rate_per_second=0.5) as client:
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.get_nutrition_info_many(names), 0.5)
+
+        runner = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+        started = time.monotonic()
+        runner.start()
+        runner.join(timeout=5)
+        self.assertFalse(runner.is_alive())
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertLessEqual(mock_get.call_count, 2)
+
+    def test_token_bucket_limits_rate(self):
+        """Test that the token bucket spaces calls beyond the burst at 1/rate."""
+        async def run():
+            bucket = TokenBucket(rate=50, burst=2)
+            start = time.monotonic()
+            for _ in range(7):
+                await bucket.acquire()
+            return time.monotonic() - start
+        # 2 calls from the burst, 5 more at 50/s
+        self.assertGreaterEqual(asyncio.run(run()), 5 / 50 - 0.01)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import time
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch, MagicMock
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.usda_nutrition.usda_api import USDAApiClient
+from services.usda_nutrition.usda_cache import CacheBackend, MemoryCache, SQLiteCache
+
+
+def _write_from_process(args):
+    path, key = args
+    cache = SQLiteCache(path)
+    cache.set(key, {'writer': os.getpid()})
+    return key
+
+
+class TestUSDACacheBackends(unittest.TestCase):
+    """Test case for the USDA cache backends."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'usda_cache.db')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_sqlite_cache_persists_across_instances(self):
+        SQLiteCache(self.db_path).set('details_123', {'fdcId': 123})
+
+        cache = SQLiteCache(self.db_path)
+        self.assertEqual(cache.get('details_123'), {'fdcId': 123})
+        self.assertIsNone(cache.get('details_456'))
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        self.assertEqual(cache.get_stats()['misses'], 1)
+
+    def test_entries_expire_after_ttl(self):
+        for cache in (MemoryCache(), SQLiteCache(self.db_path)):
+            cache.set('search_kale_5', [{'fdcId': 1}], ttl=0.05)
+            self.assertIsNotNone(cache.get('search_kale_5'))
+            time.sleep(0.1)
+            self.assertIsNone(cache.get('search_kale_5'))
+            self.assertEqual(cache.get_stats()['expired'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for cache in (MemoryCache(max_entries=3), SQLiteCache(self.db_path, max_entries=3, evict_every=1, touch_interval=0)):
+            for key in ('a', 'b', 'c'):
+                cache.set(key, key)
+                time.sleep(0.01)
+            cache.get('a')  # 'b' is now least recently used
+            cache.set('d', 'd')
+
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual([cache.get(k) for k in ('a', 'c', 'd')], ['a', 'c', 'd'])
+            self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_sqlite_hits_refresh_recency_sparingly(self):
+        cache = SQLiteCache(self.db_path, touch_interval=60)
+        cache.set('a', 'a')
+        statements = []
+        cache._connection().set_trace_callback(statements.append)
+        for _ in range(5):
+            self.assertEqual(cache.get('a'), 'a')
+        self.assertFalse([sql for sql in statements if sql.startswith("UPDATE")])
+
+    def test_len_counts_live_entries(self):
+        for cache in (MemoryCache(), SQLiteCache(self.db_path)):
+            cache.set('fresh', 1)
+            cache.set('stale', 2, ttl=0.01)
+            time.sleep(0.05)
+            self.assertEqual(len(cache), 1)
+
+    def test_set_survives_locked_eviction(self):
+        cache = SQLiteCache(self.db_path, max_entries=1, evict_every=1)
+        cache._connection().execute("PRAGMA busy_timeout = 50")
+        writer = sqlite3.connect(self.db_path, isolation_level=None)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            self.assertEqual(cache.evict(), 0)
+        finally:
+            writer.execute("ROLLBACK")
+            writer.close()
+        self.assertFalse(cache._connection().in_transaction)
+        cache.set('a', 'a')
+        self.assertEqual(cache.get('a'), 'a')
+
+    def test_cache_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CacheBackend()
+
+    def test_sqlite_cache_evicts_by_size(self):
+        cache = SQLiteCache(self.db_path, max_bytes=50, evict_every=1)
+        cache.set('first', 'x' * 30)
+        time.sleep(0.01)
+        cache.set('second', 'y' * 30)
+
+        self.assertIsNone(cache.get('first'))
+        self.assertEqual(cache.get('second'), 'y' * 30)
+
+    def test_sqlite_cache_is_shared_between_processes(self):
+        keys = [f'details_{i}' for i in range(8)]
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(_write_from_process, [(self.db_path, key) for key in keys]))
+
+        cache = SQLiteCache(self.db_path)
+        self.assertEqual(len(cache), 8)
+        self.assertTrue(all(cache.get(key) for key in keys))
+
+
+class TestUSDAApiClientCaching(unittest.TestCase):
+    """Test case for USDAApiClient cache usage."""
+
+    @patch('requests.Session.get')
+    def test_empty_search_is_negatively_cached(self, mock_get):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'foods': []}
+        mock_get.return_value = mock_response
+
+        client = USDAApiClient(cache=MemoryCache())
+        self.assertEqual(client.search_food('unobtainium'), [])
+        self.assertEqual(client.search_food('unobtainium'), [])
+
+        mock_get.assert_called_once()
+        self.assertEqual(client.cache_stats()['negative_hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
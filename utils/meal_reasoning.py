@@ -1,13 +1,36 @@
 from openai import OpenAI
 import os
+import sys
+import json
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai.response_cache import default_response_cache
+
 # Load API key
 env_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.env'))
 load_dotenv(env_path, override=True)
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def reason_meal_components_and_servings(meal_name: str, meal_type: str, user_profile: dict) -> list:
+# With $LLM_CACHE_MODE=replay, identical meal logs for identical profiles reuse the first breakdown
+# (see services/ai/response_cache.py); caching is off by default
+_response_cache = None
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = default_response_cache()
+    return _response_cache
+
+def _is_json_list(content: str) -> bool:
+    try:
+        return isinstance(json.loads(content), list)
+    except ValueError:
+        return False
+
+def reason_meal_components_and_servings(meal_name: str, meal_type: str, user_profile: dict,
+                                        response_cache=None) -> list:
     """
     Use LLM to reason about meal components and their likely serving sizes.
 
@@ -15,6 +38,7 @@ def reason_meal_components_and_servings(meal_name: str, meal_type: str, user_pro
         meal_name (str): Name of the meal (e.g., "Kebab and 3 rotis")
         meal_type (str): Type of meal (e.g., "Lunch", "Dinner")
         user_profile (dict): Info like weight, height, sex, age, activity level, etc.
+        response_cache (LLMResponseCache): Reply cache; defaults to the one chosen by $LLM_CACHE_MODE
 
     Returns:
         List[dict]: Each dict contains `component`, `estimated_serving_qty`, and `serving_unit`
@@ -40,16 +64,18 @@ Respond with a JSON array where each entry contains:
     """
 
     try:
-        response = client.chat.completions.create(
+        cache = response_cache or get_response_cache()
+        content = cache.complete(
+            client,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": system_msg},
                 {"role": "user", "content": user_msg}
             ],
-            temperature=0.3
+            temperature=0.3,
+            validate=_is_json_list
         )
-        import json
-        return json.loads(response.choices[0].message.content)
+        return json.loads(content)
     except Exception as e:
         print(f"❌ LLM reasoning failed: {e}")
         return []